@@ -1,11 +1,19 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, g
 from flask_cors import CORS
-import sqlite3
-from chatbot_backend import get_chat_response
+from storage import connect
+from chatbot_backend import (
+    get_chat_response, stream_chat_response, start_warm_up, readiness, service_stats,
+    startup_timings, NotReadyError,
+)
+import metrics
+import json
 import os
 
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=["Server-Timing"])
+
+# Load the embedding model + PDF index in the background; see /ready
+start_warm_up()
 
 # ===============================================================
 # Database setup
@@ -13,7 +21,7 @@ CORS(app)
 DB_FILE = os.path.join(os.path.dirname(__file__), "users.db")
 
 def init_db():
-    with sqlite3.connect(DB_FILE) as conn:
+    with connect(DB_FILE) as conn:
         conn.execute("""
             CREATE TABLE IF NOT EXISTS users (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -22,10 +30,25 @@ def init_db():
                 password TEXT NOT NULL
             )
         """)
-        conn.commit()
 
 init_db()
 
+# ===============================================================
+# Per-request timings (Server-Timing header, METRICS_TIMING_HEADER=1)
+# ===============================================================
+@app.before_request
+def start_timing():
+    g.metrics_token = metrics.track_request()
+
+
+@app.after_request
+def add_timing_header(response):
+    header = metrics.end_request(g.pop("metrics_token", None))
+    if header:
+        response.headers["Server-Timing"] = header
+        response.headers["Timing-Allow-Origin"] = "*"
+    return response
+
 # ===============================================================
 # Routes
 # ===============================================================
@@ -35,6 +58,25 @@ def home():
     return jsonify({"message": "Welcome to the SCCSE Chatbot API!"}), 200
 
 
+@app.route("/ready", methods=["GET"])
+def ready():
+    state = readiness()
+    return jsonify(state), 200 if state["status"] == "ready" else 503
+
+
+@app.route("/stats", methods=["GET"])
+def stats():
+    return jsonify(service_stats()), 200
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics_page():
+    if not metrics.registry.enabled:
+        return jsonify({"error": "Metrics are disabled (METRICS_ENABLED=0)"}), 404
+    body = metrics.registry.render({"startup_seconds": startup_timings, **service_stats()})
+    return Response(body, content_type=metrics.CONTENT_TYPE)
+
+
 # ================================
 # REGISTER
 # ================================
@@ -49,7 +91,7 @@ def register():
         if not name or not email or not password:
             return jsonify({"error": "Name, Email and Password required"}), 400
 
-        with sqlite3.connect(DB_FILE) as conn:
+        with connect(DB_FILE) as conn:
             cur = conn.cursor()
 
             # Check if user exists
@@ -62,7 +104,6 @@ def register():
                 "INSERT INTO users (name, email, password) VALUES (?, ?, ?)",
                 (name, email, password)
             )
-            conn.commit()
 
         return jsonify({"message": "User registered successfully!"}), 201
 
@@ -81,7 +122,7 @@ def login():
         email = data.get("email", "").strip().lower()
         password = data.get("password", "").strip()
 
-        with sqlite3.connect(DB_FILE) as conn:
+        with connect(DB_FILE) as conn:
             cur = conn.cursor()
             cur.execute(
                 "SELECT id, name FROM users WHERE email = ? AND password = ?",
@@ -126,9 +167,46 @@ def chat():
 
         return jsonify({"reply": reply}), 200
 
+    except NotReadyError as e:
+        return jsonify({"error": str(e)}), 503
+
     except Exception as e:
         print("Chat Error:", e)
+        metrics.inc("chat_errors_total", route="chat")
         return jsonify({"error": str(e)}), 500
 
+
+# ================================
+# CHAT (STREAMING, Server-Sent Events)
+# ================================
+@app.route("/chat/stream", methods=["POST"])
+def chat_stream():
+    data = request.get_json()
+
+    message = data.get("message", "").strip()
+    name = data.get("name", None)
+    user_id = data.get("user_id", None)
+
+    if not message:
+        return jsonify({"error": "Message missing"}), 400
+
+    def events():
+        try:
+            for token in stream_chat_response(message, user_name=name, user_id=user_id):
+                yield f"data: {json.dumps({'token': token})}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except NotReadyError as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+        except Exception as e:
+            print("Chat Stream Error:", e)
+            metrics.inc("chat_errors_total", route="chat_stream")
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 if __name__ == "__main__":
     app.run(port=5000, debug=True)
@@ -0,0 +1,196 @@
+# ===============================================================
+# asgi_app.py – Async (ASGI) entry point for the SCCSE Chatbot API
+#
+#   uvicorn asgi_app:app --port 5000
+#
+# Same routes as app.py, but /chat awaits Groq instead of parking a
+# worker thread on it, so one process can hold many chats in flight.
+# ===============================================================
+
+import json
+from contextlib import asynccontextmanager
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, StreamingResponse, Response
+from starlette.routing import Route
+
+import database
+import metrics
+from chatbot_backend import (
+    aget_chat_response, astream_chat_response, run_blocking,
+    start_warm_up, readiness, service_stats, startup_timings, NotReadyError
+)
+
+database.init_db()
+
+
+async def home(request):
+    return JSONResponse({"message": "Welcome to the SCCSE Chatbot API!"}, 200)
+
+
+async def ready(request):
+    state = readiness()
+    return JSONResponse(state, 200 if state["status"] == "ready" else 503)
+
+
+async def stats(request):
+    return JSONResponse(service_stats(), 200)
+
+
+async def metrics_page(request):
+    if not metrics.registry.enabled:
+        return JSONResponse({"error": "Metrics are disabled (METRICS_ENABLED=0)"}, 404)
+    body = metrics.registry.render({"startup_seconds": startup_timings, **service_stats()})
+    return Response(body, media_type=metrics.CONTENT_TYPE)
+
+
+# Per-request timings (Server-Timing header, METRICS_TIMING_HEADER=1).
+# Streams only report what ran before the first byte.
+class TimingHeaderMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        token = metrics.track_request()
+        response = await call_next(request)
+        header = metrics.end_request(token)
+        if header:
+            response.headers["Server-Timing"] = header
+            response.headers["Timing-Allow-Origin"] = "*"
+        return response
+
+
+# ================================
+# REGISTER
+# ================================
+async def register(request):
+    try:
+        data = await request.json()
+        name = data.get("name", "").strip()
+        email = data.get("email", "").strip().lower()
+        password = data.get("password", "").strip()
+
+        if not name or not email or not password:
+            return JSONResponse({"error": "Name, Email and Password required"}, 400)
+
+        if await run_blocking(database.user_exists, email):
+            return JSONResponse({"error": "User already exists"}, 400)
+
+        await run_blocking(database.add_user, name, email, password)
+        return JSONResponse({"message": "User registered successfully!"}, 201)
+
+    except Exception as e:
+        print("Register Error:", e)
+        return JSONResponse({"error": str(e)}, 500)
+
+
+# ================================
+# LOGIN
+# ================================
+async def login(request):
+    try:
+        data = await request.json()
+        email = data.get("email", "").strip().lower()
+        password = data.get("password", "").strip()
+
+        user = await run_blocking(database.get_user, email, password)
+        if not user:
+            return JSONResponse({"error": "Invalid credentials"}, 401)
+
+        user_id, name = user
+
+        return JSONResponse({
+            "message": "Login successful",
+            "email": email,
+            "name": name,
+            "user_id": user_id
+        }, 200)
+
+    except Exception as e:
+        print("Login Error:", e)
+        return JSONResponse({"error": str(e)}, 500)
+
+
+# ================================
+# CHAT
+# ================================
+async def chat(request):
+    try:
+        data = await request.json()
+
+        message = data.get("message", "").strip()
+        name = data.get("name", None)
+        user_id = data.get("user_id", None)
+
+        if not message:
+            return JSONResponse({"error": "Message missing"}, 400)
+
+        reply = await aget_chat_response(message, user_name=name, user_id=user_id)
+        return JSONResponse({"reply": reply}, 200)
+
+    except NotReadyError as e:
+        return JSONResponse({"error": str(e)}, 503)
+
+    except Exception as e:
+        print("Chat Error:", e)
+        metrics.inc("chat_errors_total", route="chat")
+        return JSONResponse({"error": str(e)}, 500)
+
+
+async def chat_stream(request):
+    data = await request.json()
+
+    message = data.get("message", "").strip()
+    name = data.get("name", None)
+    user_id = data.get("user_id", None)
+
+    if not message:
+        return JSONResponse({"error": "Message missing"}, 400)
+
+    async def events():
+        try:
+            async for token in astream_chat_response(message, user_name=name, user_id=user_id):
+                yield f"data: {json.dumps({'token': token})}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except NotReadyError as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+        except Exception as e:
+            print("Chat Stream Error:", e)
+            metrics.inc("chat_errors_total", route="chat_stream")
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Load the embedding model + PDF index in the background; see /ready
+    start_warm_up()
+    yield
+
+
+app = Starlette(
+    routes=[
+        Route("/", home, methods=["GET"]),
+        Route("/ready", ready, methods=["GET"]),
+        Route("/stats", stats, methods=["GET"]),
+        Route("/metrics", metrics_page, methods=["GET"]),
+        Route("/register", register, methods=["POST"]),
+        Route("/login", login, methods=["POST"]),
+        Route("/chat", chat, methods=["POST"]),
+        Route("/chat/stream", chat_stream, methods=["POST"]),
+    ],
+    middleware=[
+        Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"],
+                   expose_headers=["Server-Timing"]),
+        Middleware(TimingHeaderMiddleware),
+    ],
+    lifespan=lifespan,
+)
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, port=5000)
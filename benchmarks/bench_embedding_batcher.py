@@ -0,0 +1,93 @@
+# ===============================================================
+# bench_embedding_batcher.py – Query embedding latency, batching on/off
+#
+#   python benchmarks/bench_embedding_batcher.py --clients 32 --rounds 8
+#
+# Loads the same MiniLM model as chatbot_backend and fires bursts of
+# concurrent, all-distinct queries (so no embedding cache hits), once
+# with one forward pass per caller and once through EmbeddingBatcher.
+# ===============================================================
+
+import os
+import sys
+import time
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+from embedding_batcher import EmbeddingBatcher
+from timing import percentile
+
+TEMPLATES = [
+    "what does the {} team do",
+    "who leads the {} team at sccse",
+    "how can i join the {} team",
+    "tell me about {} activities in the chapter",
+]
+TOPICS = ["tech", "design", "pr", "media", "content", "core", "associate", "convenor"]
+
+
+def burst(embed, clients, rounds):
+    latencies = []
+    lock = threading.Lock()
+
+    for r in range(rounds):
+        barrier = threading.Barrier(clients)
+
+        def client(i):
+            query = f"{TEMPLATES[i % len(TEMPLATES)].format(TOPICS[i % len(TOPICS)])} #{r}-{i}"
+            barrier.wait()
+            start = time.perf_counter()
+            embed(query)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    return latencies
+
+
+def report(label, latencies, wall):
+    print(f"{label:<12} p50 {percentile(latencies, 50) * 1000:7.1f} ms   "
+          f"p99 {percentile(latencies, 99) * 1000:7.1f} ms   "
+          f"{len(latencies) / wall:8.1f} queries/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding micro-batching benchmark")
+    parser.add_argument("--clients", type=int, default=32, help="concurrent callers per burst")
+    parser.add_argument("--rounds", type=int, default=8, help="number of bursts")
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    embed_model = HuggingFaceEmbedding(
+        model_name="sentence-transformers/all-MiniLM-L6-v2",
+        cache_folder="./embedding_cache",
+        embed_batch_size=args.max_batch,
+    )
+    embed_model.get_query_embedding("warm up")
+
+    start = time.perf_counter()
+    off = burst(embed_model.get_query_embedding, args.clients, args.rounds)
+    report("batching off", off, time.perf_counter() - start)
+
+    batcher = EmbeddingBatcher(embed_model.get_text_embedding_batch,
+                               max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
+    start = time.perf_counter()
+    on = burst(batcher.embed, args.clients, args.rounds)
+    report("batching on", on, time.perf_counter() - start)
+
+    print(f"\navg batch size: {batcher.stats()['avg_batch_size']:.1f}")
+    batcher.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# ===============================================================
+# bench_history_queries.py – Per-user history query latency at scale
+#
+#   python benchmarks/bench_history_queries.py --rows 1000000 --users 10000
+#
+# Builds a throwaway chat database through chat_db.init_db (so every
+# migration runs), fills it with `--rows` messages and prints the time
+# per query next to its EXPLAIN QUERY PLAN. That every plan is an index
+# search is asserted in tests/test_query_plans.py.
+# ===============================================================
+
+import os
+import time
+import random
+import argparse
+import tempfile
+
+import stubs    # noqa: F401 – puts the repo root on sys.path
+import chat_db
+from storage import connect
+
+
+# (name, sql, params) for every per-user history query; the plans
+# tests/test_query_plans.py asserts are these same queries.
+# SELECT_FREQUENT_QUESTIONS scans by design (offline FAQ build) and is
+# not listed
+def hot_queries(user_id, cursor):
+    return [
+        ("get_messages_since", chat_db.SELECT_MESSAGES_SINCE, (user_id, cursor, 50)),
+        ("get_last_summary_record", chat_db.SELECT_LAST_SUMMARY, (user_id,)),
+    ]
+
+
+def fill(rows, users):
+    random.seed(0)
+    messages = [
+        (f"user-{random.randrange(users)}", "user" if i % 2 == 0 else "assistant", f"message {i}")
+        for i in range(rows)
+    ]
+    summaries = [(f"user-{u}", f"summary of user {u}", rows) for u in range(users)]
+    with connect(chat_db.DB_PATH) as conn:
+        conn.executemany(chat_db.INSERT_MESSAGE, messages)
+        conn.executemany(chat_db.INSERT_SUMMARY, summaries)
+        conn.execute("ANALYZE")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat history query latency")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    chat_db.DB_PATH = os.path.join(tempfile.mkdtemp(), "history.db")
+    chat_db.NOTES_LEGACY_FILE = os.devnull
+    chat_db.init_db()
+
+    start = time.perf_counter()
+    fill(args.rows, args.users)
+    print(f"📦 {args.rows} messages for {args.users} users in {time.perf_counter() - start:.1f}s\n")
+
+    user_id, cursor = "user-7", args.rows // 2
+    with connect(chat_db.DB_PATH) as conn:
+        for name, sql, params in hot_queries(user_id, cursor):
+            details = [row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                conn.execute(sql, params).fetchall()
+            per_query_us = (time.perf_counter() - start) / args.repeat * 1e6
+
+            print(f"{name:<30} {per_query_us:8.1f} us   {' | '.join(details)}")
+
+
+if __name__ == "__main__":
+    main()
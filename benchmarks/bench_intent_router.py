@@ -0,0 +1,104 @@
+# ===============================================================
+# bench_intent_router.py – Per-message classification cost
+#
+#   python benchmarks/bench_intent_router.py --repeat 2000
+#
+# Compares the old cascade of `any(x in msg ...)` scans (reproduced
+# below, in its original order) with one IntentRouter pass, over a
+# realistic mix of student queries. Both must route identically.
+# ===============================================================
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intent_router import (
+    build_sccse_router, GREETINGS, SCCSE_KEYWORDS, OFF_TOPIC_PATTERNS,
+    SINGLE_WORD_TECH, EVENT_KEYWORDS, TEAM_TRIGGERS,
+)
+
+CORPUS = [
+    "hi", "hello there", "thanks a lot!", "good morning", "ok",
+    "what teams does sccse have", "how do i join sccse", "who is the convenor of sccse",
+    "tell me about the design team", "what does the pr team do",
+    "who is the faculty advisor of the chapter", "how many members are in the club",
+    "are there any upcoming events", "when is the next hackathon",
+    "is there a coding competition this month", "what is the schedule for the tech fest",
+    "which team should i join", "i am good at figma and canva, what team suits me",
+    "suggest a team for someone who likes public speaking",
+    "how do you know my skills", "what is my name",
+    "note that the orientation is on 12th august at 3pm in room 204",
+    "clear notes", "admin123",
+    "what is python", "who is the founder of nasa", "how to learn dsa",
+    "explain recursion with an example please", "write a program to reverse a list",
+    "what is the capital of france", "python", "malloc vs calloc",
+    "can you help me debug this segmentation fault in my c code",
+    "who invented the telephone",
+    "what are the activities of students chapter cse at academy of technology and how can a "
+    "first year student who is interested in web development and design contribute to them",
+]
+
+
+def legacy_route(message):
+    """The pre-router cascade: one linear scan per keyword list."""
+    msg = message.lower().strip()
+    intents = set()
+    if any(g == msg or msg.startswith(g + ' ') for g in GREETINGS):
+        intents.add("greeting")
+    if any(k in msg for k in SCCSE_KEYWORDS):
+        intents.add("sccse")
+    if any(p in msg for p in OFF_TOPIC_PATTERNS):
+        intents.add("off_topic")
+    if any(t in msg for t in SINGLE_WORD_TECH):
+        intents.add("tech_word")
+    if "what is my name" in msg:
+        intents.add("ask_name")
+    if msg.startswith("note that"):
+        intents.add("save_note")
+    if "delete notes.txt" in msg or "clear notes" in msg:
+        intents.add("delete_notes")
+    if "how do you know" in msg or "how did you know" in msg:
+        intents.add("skill_origin")
+    if any(k in msg for k in EVENT_KEYWORDS):
+        intents.add("event")
+    if any(t in msg for t in TEAM_TRIGGERS):
+        intents.add("team_recommend")
+    return intents
+
+
+def time_per_message(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for message in CORPUS:
+            fn(message)
+    return (time.perf_counter() - start) / (repeat * len(CORPUS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Intent classification microbenchmark")
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    router = build_sccse_router()
+    build_ms = (time.perf_counter() - start) * 1000
+
+    def routed(message):
+        return router.route(message.lower().strip())
+
+    for message in CORPUS:
+        assert routed(message) == legacy_route(message), message
+
+    legacy = time_per_message(legacy_route, args.repeat)
+    new = time_per_message(routed, args.repeat)
+
+    print(f"corpus: {len(CORPUS)} messages x {args.repeat}   (router build {build_ms:.2f} ms)")
+    print(f"legacy cascade   {legacy * 1e6:8.2f} µs/message")
+    print(f"intent router    {new * 1e6:8.2f} µs/message")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# ===============================================================
+# bench_singleflight.py – N identical concurrent turns, with and without coalescing
+#
+#   python benchmarks/bench_singleflight.py --clients 20 --latency 0.3
+#
+# Fires --clients identical questions at once (different users) through
+# every chat entry point: get_chat_response and stream_chat_response on
+# threads, aget_chat_response and astream_chat_response on one event
+# loop. Groq is a StubLLM that counts calls; prints upstream calls and
+# wall time with single-flight on and off. That coalescing is correct
+# (one call, same answer, errors shared) is asserted in
+# tests/test_singleflight.py.
+# ===============================================================
+
+import time
+import asyncio
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from stubs import StubLLM, offline_backend
+
+QUESTION = "tell me about the design team"
+
+
+def sync_turns(cb, clients, stream):
+    barrier = threading.Barrier(clients)
+
+    def ask(i):
+        user_id = f"sf-{time.monotonic_ns()}-{i}"
+        barrier.wait()
+        if stream:
+            return "".join(cb.stream_chat_response(QUESTION, user_id=user_id))
+        return cb.get_chat_response(QUESTION, user_id=user_id)
+
+    with ThreadPoolExecutor(clients) as pool:
+        return list(pool.map(ask, range(clients)))
+
+
+def async_turns(cb, clients, stream):
+    async def ask(i):
+        user_id = f"sf-{time.monotonic_ns()}-{i}"
+        if stream:
+            return "".join([c async for c in cb.astream_chat_response(QUESTION, user_id=user_id)])
+        return await cb.aget_chat_response(QUESTION, user_id=user_id)
+
+    async def run():
+        return await asyncio.gather(*(ask(i) for i in range(clients)))
+
+    return asyncio.run(run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM single-flight timing")
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.3, help="StubLLM seconds per call")
+    args = parser.parse_args()
+
+    cb = offline_backend(tempfile.mkdtemp(prefix="sccse-singleflight-"))
+    runs = [
+        ("get_chat_response", lambda: sync_turns(cb, args.clients, stream=False)),
+        ("stream_chat_response", lambda: sync_turns(cb, args.clients, stream=True)),
+        ("aget_chat_response", lambda: async_turns(cb, args.clients, stream=False)),
+        ("astream_chat_response", lambda: async_turns(cb, args.clients, stream=True)),
+    ]
+
+    print(f"{args.clients} identical concurrent turns, {args.latency:.2f}s per Groq call\n")
+    for enabled in (True, False):
+        cb.llm_flights.enabled = cb.llm_aflights.enabled = enabled
+        for name, run in runs:
+            cb.response_cache.invalidate()
+            cb.llm = StubLLM(latency=args.latency)
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+            print(f"{name:<22} single-flight {'on ' if enabled else 'off'}: "
+                  f"{cb.llm.calls:3d} upstream call(s), {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+# ===============================================================
+# bench_suite.py – Component microbenchmarks for the chat hot path
+#
+#   python benchmarks/bench_suite.py --output bench.json
+#   python benchmarks/bench_suite.py --baseline bench.json --threshold 0.2
+#   python benchmarks/bench_suite.py --only db. --only turn.
+#
+# Runs offline: Groq is a StubLLM with no latency and MiniLM is a
+# HashEmbedding, so the numbers measure our code, not the model or the
+# network. Chat history, notes and the PDF index live in a throwaway
+# directory; data/*.pdf is only read.
+#
+# Every benchmark reports median / p95 / mean microseconds per call.
+# --output writes them (plus the per-stage metrics of the turn runs)
+# as JSON; --baseline compares against such a file, flags every
+# median more than --threshold slower and exits with status 1.
+# ===============================================================
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+
+from stubs import ROOT, offline_backend
+from timing import percentile
+
+WORK_DIR = tempfile.mkdtemp(prefix="sccse-bench-")
+chatbot_backend = offline_backend(WORK_DIR)
+
+import chat_db
+import metrics
+from llama_index.core import QueryBundle
+from notes_store import NotesStore
+from pdf import get_index
+
+QUERIES = [
+    "what teams does sccse have",
+    "who is the convenor of sccse",
+    "tell me about the design team",
+    "what does the pr team do",
+    "how do i join the chapter",
+    "are there any upcoming events",
+    "who is the faculty advisor",
+    "what activities does the club organise",
+]
+
+OFF_TOPIC = ["what is python", "who is the founder of nasa", "how to learn dsa"]
+
+# A repeat is a response cache hit
+CACHED_QUERY = "who is the convenor of sccse"
+
+SKILL_MESSAGES = [
+    "i am good at figma and canva",
+    "i know python, c++ and some machine learning",
+    "public speaking and event management are my strengths",
+]
+
+NOTES = [f"Event {i}: workshop on topic {i % 7} in room {200 + i} at {i % 12 + 1}pm" for i in range(50)]
+
+
+def summarize(samples_ns):
+    n = len(samples_ns)
+    return {
+        "n": n,
+        "median_us": percentile(samples_ns, 50) / 1000,
+        "p95_us": percentile(samples_ns, 95) / 1000,
+        "mean_us": sum(samples_ns) / n / 1000,
+    }
+
+
+def measure(fn, inputs, repeat, warmup=3):
+    for x in inputs[:warmup]:
+        fn(x)
+    samples = []
+    for i in range(repeat):
+        x = inputs[i % len(inputs)]
+        start = time.perf_counter_ns()
+        fn(x)
+        samples.append(time.perf_counter_ns() - start)
+    return summarize(samples)
+
+
+# ---------------------------------------------------------------
+# Setup
+# ---------------------------------------------------------------
+def set_up():
+    for note in NOTES:
+        chatbot_backend.notes_store.append(note)
+
+    # 20 users x 100 messages of history
+    for u in range(20):
+        for i in range(50):
+            chat_db.save_message(f"history-{u}", "user", f"question {i} about sccse")
+            chat_db.save_message(f"history-{u}", "assistant", f"answer {i}")
+        chat_db.record_skills(f"history-{u}", SKILL_MESSAGES[u % len(SKILL_MESSAGES)])
+    chat_db.flush()
+
+
+# ---------------------------------------------------------------
+# Benchmarks: name -> (fn, inputs, repeat multiplier)
+# ---------------------------------------------------------------
+def benchmarks():
+    cb = chatbot_backend
+    vectors = {q: cb.query_embeddings.get(q) for q in QUERIES + OFF_TOPIC}
+    bundles = [QueryBundle(query_str=q, embedding=vectors[q].tolist()) for q in QUERIES]
+    nodes = {q: cb.sccse_retriever.retrieve(b) for q, b in zip(QUERIES, bundles)}
+    notes_text = cb.notes_store.render(cb.notes_store.select(vectors[QUERIES[0]]))
+    counter = iter(range(10 ** 9))
+
+    def reload_notes(_):
+        # A store that has not seen the table yet: one full read
+        NotesStore().entries()
+
+    def rag_turn(q):
+        cb.response_cache.invalidate()
+        cb.get_chat_response(q, user_id=f"bench-{next(counter)}")
+
+    return {
+        "route": (lambda q: cb.intent_router.route(q.lower()), QUERIES + OFF_TOPIC, 10),
+        "off_topic": (cb.is_off_topic, QUERIES + OFF_TOPIC, 10),
+        "topic_classifier": (
+            lambda q: cb.topic_classifier.is_off_topic(vectors[q]), QUERIES + OFF_TOPIC, 10),
+        "embed.cache_hit": (cb.query_embeddings.get, QUERIES, 10),
+        "db.save_message": (lambda q: chat_db.save_message("bench-writer", "user", q), QUERIES, 1),
+        "db.get_messages_since": (
+            lambda u: chat_db.get_messages_since(f"history-{u}", 0, 50), list(range(20)), 1),
+        "skills.match": (lambda q: chat_db.skill_matcher.count(q), QUERIES + SKILL_MESSAGES, 10),
+        "skills.detect": (lambda u: cb.detect_skill_origin(f"history-{u}"), list(range(20)), 1),
+        "notes.entries": (lambda _: cb.notes_store.entries(), [None], 10),
+        "notes.reload": (reload_notes, [None], 1),
+        "notes.select": (lambda q: cb.notes_store.select(vectors[q]), QUERIES, 1),
+        "retrieve.keyword": (cb.sccse_retriever.keyword_only, QUERIES, 1),
+        "retrieve.bm25": (cb.sccse_retriever.sparse, QUERIES, 1),
+        "retrieve.dense": (cb.sccse_retriever.dense, bundles, 1),
+        "retrieve.hybrid": (cb.sccse_retriever.retrieve, bundles, 1),
+        "prompt_build": (
+            lambda q: cb.prompt_builder.build(nodes[q], message=q, notes_text=notes_text),
+            QUERIES, 1),
+        "index.load": (lambda _: get_index(cb.DATA_DIR, "sccse"), [None], 0.05),
+        "turn.rule": (
+            lambda q: cb.get_chat_response(q, user_id=f"bench-{next(counter)}"), OFF_TOPIC, 0.5),
+        "turn.cached": (
+            lambda q: cb.get_chat_response(q, user_id=f"bench-{next(counter)}"), [CACHED_QUERY], 0.5),
+        "turn.rag": (rag_turn, QUERIES, 0.5),
+    }
+
+
+def run(repeat, only):
+    results = {}
+    for name, (fn, inputs, scale) in benchmarks().items():
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        results[name] = measure(fn, inputs, max(3, int(repeat * scale)))
+        print(f"{name:<22} {results[name]['median_us']:>11.1f} us   "
+              f"p95 {results[name]['p95_us']:>11.1f} us")
+
+    # Cold index build, timed once by warm_up()
+    if not only or any("index.build".startswith(prefix) for prefix in only):
+        seconds = chatbot_backend.startup_timings["index"]
+        results["index.build"] = {"n": 1, "median_us": seconds * 1e6,
+                                  "p95_us": seconds * 1e6, "mean_us": seconds * 1e6}
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Prints the comparison; returns the names that regressed."""
+    regressions = []
+    print(f"\n{'benchmark':<22} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name in sorted(set(results) | set(baseline)):
+        if name not in baseline or name not in results:
+            print(f"{name:<22} {'(only in ' + ('current' if name in results else 'baseline') + ')':>34}")
+            continue
+        before, after = baseline[name]["median_us"], results[name]["median_us"]
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  ⚠️ REGRESSION"
+            regressions.append(name)
+        elif change < -threshold:
+            flag = "  ✅ faster"
+        print(f"{name:<22} {before:>10.1f}us {after:>10.1f}us {change:>+7.0%}{flag}")
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat hot path microbenchmarks")
+    parser.add_argument("--repeat", type=int, default=200, help="calls per benchmark (scaled per stage)")
+    parser.add_argument("--only", action="append", default=[], help="run benchmarks with this name prefix")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="relative median slowdown that counts as a regression")
+    args = parser.parse_args()
+
+    set_up()
+    results = run(args.repeat, args.only)
+
+    if args.output:
+        with open(os.path.join(ROOT, args.output) if not os.path.isabs(args.output) else args.output,
+                  "w", encoding="utf-8") as f:
+            json.dump({
+                "meta": {
+                    "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "commit": git_commit(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "repeat": args.repeat,
+                },
+                "results": results,
+                "stages": metrics.registry.snapshot(),
+            }, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+    if args.baseline:
+        path = args.baseline if os.path.isabs(args.baseline) else os.path.join(ROOT, args.baseline)
+        with open(path, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\n✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
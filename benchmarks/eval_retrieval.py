@@ -0,0 +1,98 @@
+# ===============================================================
+# eval_retrieval.py – Dense vs BM25 vs hybrid retrieval quality
+#
+#   python benchmarks/eval_retrieval.py
+#   python benchmarks/eval_retrieval.py --top-k 3 --queries benchmarks/retrieval_eval.jsonl
+#
+# Run from the repo root: it loads (or builds) ./storage/sccse from
+# data/ with the real MiniLM model, exactly like warm-up does.
+#
+# Every labelled query names a string the answer depends on; a query
+# counts as recalled at k when that string occurs in one of the top k
+# retrieved nodes. Latency is per query and includes embedding it (no
+# cache) wherever the mode needs an embedding. "hybrid" behaves like
+# /chat: every query is embedded, confident keyword lookups skip the
+# dense search.
+# ===============================================================
+
+import os
+import sys
+import json
+import time
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from llama_index.core import Settings, QueryBundle
+from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+from pdf import get_index
+from hybrid_retriever import HybridRetriever
+from timing import percentile
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrieval evaluation")
+    parser.add_argument("--queries", default=os.path.join(ROOT, "benchmarks", "retrieval_eval.jsonl"))
+    parser.add_argument("--top-k", type=int, default=3)
+    args = parser.parse_args()
+
+    embed_model = HuggingFaceEmbedding(
+        model_name="sentence-transformers/all-MiniLM-L6-v2",
+        cache_folder="./embedding_cache"
+    )
+    Settings.embed_model = embed_model
+    index = get_index(os.path.join(ROOT, "data"), "sccse")
+    retriever = HybridRetriever(index, top_k=args.top_k)
+
+    with open(args.queries, "r", encoding="utf-8") as f:
+        items = [json.loads(line) for line in f if line.strip()]
+
+    def dense(q):
+        return retriever.dense(QueryBundle(query_str=q, embedding=embed_model.get_query_embedding(q)))
+
+    def sparse(q):
+        return retriever.sparse(q)
+
+    shortcuts = 0
+
+    def hybrid(q):
+        nonlocal shortcuts
+        embedding = embed_model.get_query_embedding(q)
+        nodes, confident = retriever.keyword_only(q)
+        if confident:
+            shortcuts += 1
+            return nodes
+        return retriever.retrieve_with(QueryBundle(query_str=q, embedding=embedding), nodes)
+
+    embed_model.get_query_embedding("warm up")
+    print(f"{len(items)} queries over {len(retriever.bm25)} nodes, "
+          f"{retriever.bm25.passages} lines\n")
+    print(f"{'mode':<8} {'recall@1':>8} {'recall@' + str(args.top_k):>9} "
+          f"{'mean ms':>8} {'p95 ms':>7}")
+
+    for name, run in (("dense", dense), ("sparse", sparse), ("hybrid", hybrid)):
+        at1 = atk = 0
+        latencies, misses = [], []
+        for item in items:
+            start = time.perf_counter()
+            nodes = run(item["query"])
+            latencies.append((time.perf_counter() - start) * 1000)
+
+            found = [item["expected"] in n.node.get_content() for n in nodes]
+            at1 += bool(found[:1] and found[0])
+            atk += any(found[:args.top_k])
+            if not any(found[:args.top_k]):
+                misses.append(item["query"])
+
+        n = len(items)
+        print(f"{name:<8} {at1 / n:>8.2f} {atk / n:>9.2f} "
+              f"{sum(latencies) / n:>8.2f} {percentile(latencies, 95):>7.2f}")
+        for q in misses:
+            print(f"         ✗ {q}")
+
+    print(f"\nhybrid answered {shortcuts}/{len(items)} queries from BM25 alone (no dense search)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# ===============================================================
+# eval_topic_classifier.py – Offline evaluation of the topic gate
+#
+#   python benchmarks/eval_topic_classifier.py
+#   python benchmarks/eval_topic_classifier.py --test benchmarks/topic_eval.jsonl
+#
+# Trains the classifier from data/topic_examples.json with the real
+# MiniLM model, then replays a held-out labelled set through the same
+# two gates /chat uses (keyword off_topic_by_rules, then the classifier
+# wherever topic_classifier.gate_applies). The keyword gate is applied
+# from intent_router directly, so the backend (database, Groq) is never
+# imported. Off-topic is the positive class. "LLM calls saved" counts
+# queries the keyword filter let through that the classifier now
+# rejects; wrongly rejected on-topic queries are reported next to it,
+# as is how many queries the classifier saw at all.
+# ===============================================================
+
+import os
+import sys
+import json
+import time
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+from intent_router import build_sccse_router, off_topic_by_rules
+from topic_classifier import TopicClassifier, load_examples, gate_applies
+
+
+intent_router = build_sccse_router()
+
+
+def is_off_topic(text):
+    msg = text.lower().strip()
+    return off_topic_by_rules(msg, intent_router.route(msg))
+
+
+def classifier_applies(text):
+    msg = text.lower().strip()
+    return gate_applies(msg, intent_router.route(msg))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Topic classifier evaluation")
+    parser.add_argument("--examples", default=os.path.join(ROOT, "data", "topic_examples.json"))
+    parser.add_argument("--test", default=os.path.join(ROOT, "benchmarks", "topic_eval.jsonl"))
+    parser.add_argument("--thresholds", default="-0.15,-0.1,-0.05,0,0.05")
+    args = parser.parse_args()
+
+    embed_model = HuggingFaceEmbedding(
+        model_name="sentence-transformers/all-MiniLM-L6-v2",
+        cache_folder="./embedding_cache"
+    )
+    classifier = TopicClassifier.train(
+        embed_model.get_text_embedding_batch, load_examples(args.examples)
+    )
+
+    with open(args.test, "r", encoding="utf-8") as f:
+        items = [json.loads(line) for line in f if line.strip()]
+    texts = [item["text"] for item in items]
+    labels = [item["label"] == "off" for item in items]
+    vectors = embed_model.get_text_embedding_batch(texts)
+
+    start = time.perf_counter()
+    scores = [classifier.score(v) for v in vectors]
+    per_query_us = (time.perf_counter() - start) / len(vectors) * 1e6
+
+    keyword = [is_off_topic(t) for t in texts]
+    gated = [classifier_applies(t) for t in texts]
+
+    print(f"{len(items)} test queries ({sum(labels)} off-topic), "
+          f"classification {per_query_us:.1f} µs/query after embedding\n")
+
+    kw_tp = sum(k and l for k, l in zip(keyword, labels))
+    print(f"keyword filter only   precision {kw_tp / max(1, sum(keyword)):.2f}   "
+          f"recall {kw_tp / max(1, sum(labels)):.2f}")
+    classified = sum(g and not k for k, g in zip(keyword, gated))
+    print(f"classifier consulted  {classified}/{len(items)} queries "
+          f"(the rest were rejected by keyword or whitelisted)\n")
+
+    print(f"{'threshold':>9}  {'precision':>9}  {'recall':>6}  {'LLM calls saved':>15}  {'wrong rejects':>13}")
+    for threshold in (float(t) for t in args.thresholds.split(",")):
+        rejected_by_clf = [
+            not k and g and s < threshold
+            for k, g, s in zip(keyword, gated, scores)
+        ]
+        predicted = [k or c for k, c in zip(keyword, rejected_by_clf)]
+
+        tp = sum(p and l for p, l in zip(predicted, labels))
+        precision = tp / max(1, sum(predicted))
+        recall = tp / max(1, sum(labels))
+        saved = sum(c and l for c, l in zip(rejected_by_clf, labels))
+        wrong = sum(c and not l for c, l in zip(rejected_by_clf, labels))
+        print(f"{threshold:>9.2f}  {precision:>9.2f}  {recall:>6.2f}  {saved:>15}  {wrong:>13}")
+
+
+if __name__ == "__main__":
+    main()
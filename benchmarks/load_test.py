@@ -0,0 +1,102 @@
+# ===============================================================
+# load_test.py – Threaded (Flask-style) vs async (ASGI) chat path
+#
+#   python benchmarks/load_test.py --requests 200 --threads 16 --latency 0.5
+#
+# Groq is replaced by a local StubLLM with a fixed latency, so the
+# numbers show how many chats each serving model keeps in flight,
+# not how fast Groq is. Chat history and the index go to a throwaway
+# directory.
+#
+# The response cache, the FAQ table and single-flight are switched
+# off: with a handful of repeated queries they would answer nearly
+# every chat without the LLM. The LLM call count is printed next to
+# the timings, so a run that skipped it shows.
+# ===============================================================
+
+import time
+import asyncio
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from stubs import StubLLM, offline_backend
+from timing import percentile
+
+# Warmed up in main() with the real MiniLM model
+chatbot_backend = offline_backend(tempfile.mkdtemp(prefix="sccse-load-"), warm=False)
+
+QUERIES = [
+    "what does the design team do",
+    "who is the convenor of sccse",
+    "tell me about the pr team",
+    "how many community members does sccse have",
+]
+
+
+def report(label, latencies, wall, llm_calls):
+    print(f"{label:<28} {len(latencies) / wall:8.1f} req/s   "
+          f"p50 {percentile(latencies, 50) * 1000:7.0f} ms   "
+          f"p99 {percentile(latencies, 99) * 1000:7.0f} ms   "
+          f"wall {wall:6.2f} s   "
+          f"LLM calls {llm_calls}")
+
+
+def counting_llm_calls(run):
+    """(latencies, wall, LLM calls made during `run()`)"""
+    before = chatbot_backend.llm.calls
+    latencies, wall = run()
+    return latencies, wall, chatbot_backend.llm.calls - before
+
+
+def run_threaded(n, threads):
+    def one(i):
+        start = time.perf_counter()
+        chatbot_backend.get_chat_response(QUERIES[i % len(QUERIES)], user_id=f"load-sync-{i}")
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = list(pool.map(one, range(n)))
+    return latencies, time.perf_counter() - start
+
+
+async def run_async(n):
+    async def one(i):
+        start = time.perf_counter()
+        await chatbot_backend.aget_chat_response(QUERIES[i % len(QUERIES)], user_id=f"load-async-{i}")
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(one(i) for i in range(n)))
+    return latencies, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Threaded vs async chat load test")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=16,
+                        help="worker threads for the sync path (Flask-style)")
+    parser.add_argument("--latency", type=float, default=0.5,
+                        help="stub LLM latency in seconds")
+    args = parser.parse_args()
+
+    chatbot_backend.llm = StubLLM(latency=args.latency)
+    # Every chat goes to the LLM: no cached, FAQ or coalesced answers
+    chatbot_backend.response_cache.threshold = float("inf")
+    chatbot_backend.faq_service.auto_rebuild = False
+    chatbot_backend.llm_flights.enabled = chatbot_backend.llm_aflights.enabled = False
+    chatbot_backend.warm_up()
+
+    # Warm the embedding model so neither run pays for first-call setup
+    chatbot_backend.get_chat_response(QUERIES[0], user_id="load-warmup")
+
+    print(f"{args.requests} chats, stub LLM latency {args.latency * 1000:.0f} ms\n")
+    report(f"sync, {args.threads} threads",
+           *counting_llm_calls(lambda: run_threaded(args.requests, args.threads)))
+    report("async (ASGI path)",
+           *counting_llm_calls(lambda: asyncio.run(run_async(args.requests))))
+
+
+if __name__ == "__main__":
+    main()
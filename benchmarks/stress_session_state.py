@@ -0,0 +1,103 @@
+# ===============================================================
+# stress_session_state.py – Passkey flow throughput under interleaved users
+#
+#   python benchmarks/stress_session_state.py --backend memory --threads 32
+#   python benchmarks/stress_session_state.py --backend sqlite --processes 4 --threads 16
+#
+# Every thread plays one user who repeatedly does
+#   "note that <unique text>" -> a wrong passkey -> the right passkey
+# while all the other users do the same, and reports turns per second.
+# With --processes > 1 the workers only share state through the SQLite
+# backend, like gunicorn workers would. Correctness (replies, notes,
+# compare-and-set) is asserted in tests/test_session_state.py.
+# ===============================================================
+
+import time
+import argparse
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+from stubs import offline_backend
+
+
+def setup(workdir, backend):
+    cb = offline_backend(workdir, warm=False)
+    from session_state import make_session_state
+    cb.session_state = make_session_state(backend)
+    return cb
+
+
+def play_user(cb, user_id, rounds):
+    for i in range(rounds):
+        for message in (f"note that {user_id}-round-{i}", "not the passkey", cb.PASS_KEY):
+            cb.get_chat_response(message, user_id=user_id)
+
+
+def worker(args):
+    workdir, backend, process_id, threads, rounds = args
+    cb = setup(workdir, backend)
+    users = [f"p{process_id}-u{t}" for t in range(threads)]
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(lambda u: play_user(cb, u, rounds), users))
+
+
+def race_cas(state, threads, rounds):
+    """Park a value, let every thread try to consume it; returns seconds per round."""
+    barrier = threading.Barrier(threads + 1)
+
+    def contender():
+        for i in range(rounds):
+            barrier.wait()
+            state.compare_and_set("racer", "pending_action", {"round": i}, None)
+            barrier.wait()
+
+    pool = [threading.Thread(target=contender) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    start = time.perf_counter()
+    for i in range(rounds):
+        state.set("racer", "pending_action", {"round": i})
+        barrier.wait()
+        barrier.wait()
+    elapsed = time.perf_counter() - start
+    for t in pool:
+        t.join()
+    return elapsed / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Session state throughput")
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.processes > 1 and args.backend != "sqlite":
+        parser.error("--processes > 1 needs --backend sqlite (memory state is per process)")
+
+    workdir = tempfile.mkdtemp()
+    jobs = [(workdir, args.backend, p, args.threads, args.rounds) for p in range(args.processes)]
+
+    start = time.perf_counter()
+    if args.processes == 1:
+        worker(jobs[0])
+    else:
+        with multiprocessing.get_context("spawn").Pool(args.processes) as pool:
+            pool.map(worker, jobs)
+    wall = time.perf_counter() - start
+
+    users = args.processes * args.threads
+    turns = users * args.rounds * 3
+    print(f"{users} users, {turns} turns on '{args.backend}' in {wall:.2f} s "
+          f"({turns / wall:.0f} turns/s)")
+
+    cb = setup(workdir, args.backend)
+    per_round = race_cas(cb.session_state, args.threads, args.rounds)
+    print(f"compare_and_set race, {args.threads} threads: {per_round * 1000:.2f} ms per round")
+
+
+if __name__ == "__main__":
+    main()
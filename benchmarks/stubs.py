@@ -0,0 +1,121 @@
+# ===============================================================
+# stubs.py – Deterministic stand-ins for Groq and MiniLM, used by
+# the benchmarks and tests/
+# ===============================================================
+
+import os
+import re
+import sys
+import time
+import asyncio
+import hashlib
+import logging
+import numpy as np
+from llama_index.core.embeddings import BaseEmbedding
+from llama_index.core.llms import CompletionResponse
+
+# Benchmarks run as scripts from benchmarks/; the app modules live one up
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+class StubLLM:
+    """
+    Minimal drop-in for the Groq LLM object used by chatbot_backend.
+    Every call "generates" a fixed answer after `latency` seconds,
+    blocking for the sync API and awaiting for the async one.
+    """
+
+    def __init__(self, latency=0.5, answer="SCCSE has Tech, Design and PR teams.", tokens=8):
+        self.latency = latency
+        self.answer = answer
+        self.tokens = tokens
+        self.calls = 0
+
+    def _deltas(self):
+        words = self.answer.split(" ")
+        step = max(1, len(words) // self.tokens)
+        for i in range(0, len(words), step):
+            yield " ".join(words[i:i + step]) + " "
+
+    def complete(self, prompt, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        return CompletionResponse(text=self.answer)
+
+    async def acomplete(self, prompt, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return CompletionResponse(text=self.answer)
+
+    def stream_complete(self, prompt, **kwargs):
+        self.calls += 1
+        for delta in self._deltas():
+            time.sleep(self.latency / self.tokens)
+            yield CompletionResponse(text="", delta=delta)
+
+    async def astream_complete(self, prompt, **kwargs):
+        self.calls += 1
+
+        async def gen():
+            for delta in self._deltas():
+                await asyncio.sleep(self.latency / self.tokens)
+                yield CompletionResponse(text="", delta=delta)
+
+        return gen()
+
+
+class HashEmbedding(BaseEmbedding):
+    """
+    Offline stand-in for all-MiniLM-L6-v2: a hashed bag of words,
+    L2-normalised. Same text, same vector, no model download; texts
+    that share words still land close together, so retrieval and the
+    caches behave roughly like the real thing.
+    """
+
+    dim: int = 384
+
+    def _vector(self, text):
+        v = np.zeros(self.dim, dtype=np.float32)
+        for token in re.findall(r"\w+", text.lower()):
+            v[int.from_bytes(hashlib.blake2b(token.encode(), digest_size=4).digest(), "little") % self.dim] += 1.0
+        norm = np.linalg.norm(v)
+        return (v / norm if norm else v).tolist()
+
+    def _get_query_embedding(self, query):
+        return self._vector(query)
+
+    def _get_text_embedding(self, text):
+        return self._vector(text)
+
+    async def _aget_query_embedding(self, query):
+        return self._vector(query)
+
+
+def offline_backend(work_dir, llm=None, warm=True):
+    """
+    Imports chatbot_backend wired to run offline: chat history, notes
+    and the PDF index in `work_dir`, `llm` (default a StubLLM with no
+    latency) for Groq and, with `warm`, HashEmbedding for MiniLM.
+
+    Must run before anything imports chatbot_backend, which sets
+    itself up (database, LLM, FAQ service) at import time.
+    """
+    os.environ.setdefault("GROQ_API_KEY", "stub")
+    os.environ.setdefault("FAQ_AUTO_REBUILD", "0")
+    os.chdir(work_dir)              # pdf.get_index persists to ./storage
+
+    # Module attributes, not env: a test module may have imported chat_db
+    # or faq already
+    import chat_db
+    chat_db.DB_PATH = os.path.join(work_dir, "chat_history.db")
+    chat_db.NOTES_LEGACY_FILE = os.devnull
+
+    import chatbot_backend
+    chatbot_backend.faq_service.auto_rebuild = os.environ["FAQ_AUTO_REBUILD"] == "1"
+    chatbot_backend.llm = llm if llm is not None else StubLLM(latency=0.0)
+    if warm:
+        chatbot_backend.warm_up(embed_model_override=HashEmbedding())
+    chatbot_backend.logger.setLevel(logging.WARNING)     # no per-prompt token lines
+    return chatbot_backend
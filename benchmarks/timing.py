@@ -0,0 +1,9 @@
+# ===============================================================
+# timing.py – Latency summaries shared by the benchmark scripts
+# ===============================================================
+
+
+def percentile(values, p):
+    """Nearest-rank `p`th percentile (0-100) of `values`."""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
@@ -1,94 +1,659 @@
-import sqlite3
 import os
+import time
+import queue
+import atexit
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from storage import connect
+from skill_profile import SkillMatcher, MEMORY, SUMMARY
+from intent_router import build_sccse_router, off_topic_by_rules
+import metrics
 
 DB_PATH = "chat_history.db"
 
-def get_connection():
-    return sqlite3.connect(DB_PATH)
+# Where notes lived before the notes table; imported once by migration 4
+NOTES_LEGACY_FILE = os.getenv(
+    "NOTES_LEGACY_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "notes.txt")
+)
 
+# Write-behind mode: persist messages/summaries from a background writer
+WRITE_BEHIND = os.getenv("CHAT_DB_WRITE_BEHIND", "0") == "1"
+WRITE_BEHIND_MAX_QUEUE = int(os.getenv("CHAT_DB_WRITE_BEHIND_MAX_QUEUE", "10000"))
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("CHAT_DB_WRITE_BEHIND_BATCH", "500"))
+WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv("CHAT_DB_WRITE_BEHIND_INTERVAL", "0.2"))
+# Failed writes of a batch retried before it is dropped (disk full, schema locked...)
+WRITE_BEHIND_MAX_RETRIES = int(os.getenv("CHAT_DB_WRITE_BEHIND_RETRIES", "5"))
 
-def init_db():
-    conn = get_connection()
-    cur = conn.cursor()
+# Messages matched per transaction by the skill_profiles backfill, so
+# it never holds the write lock for long
+SKILL_BACKFILL_CHUNK = int(os.getenv("CHAT_DB_SKILL_BACKFILL_CHUNK", "2000"))
 
-    # User message history
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS messages (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id TEXT,
-            role TEXT,
-            message TEXT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+INSERT_MESSAGE = "INSERT INTO messages (user_id, role, message) VALUES (?, ?, ?)"
+INSERT_SUMMARY = "INSERT INTO summaries (user_id, summary, last_message_id) VALUES (?, ?, ?)"
+
+# Most frequent user messages (case/whitespace-insensitive), for the FAQ build
+SELECT_FREQUENT_QUESTIONS = """
+    SELECT lower(trim(message)) AS question, COUNT(*) AS n
+    FROM messages
+    WHERE role = 'user'
+    GROUP BY question
+    HAVING n >= ?
+    ORDER BY n DESC
+    LIMIT ?
+"""
+
+SELECT_LAST_SUMMARY = """
+    SELECT summary, last_message_id FROM summaries
+    WHERE user_id = ?
+    ORDER BY id DESC LIMIT 1
+"""
+
+# Oldest `limit` messages after `id`, so a backlog is read in order
+SELECT_MESSAGES_SINCE = """
+    SELECT id, role, message
+    FROM messages
+    WHERE user_id = ? AND id > ?
+    ORDER BY id
+    LIMIT ?
+"""
+
+
+# Per-user skill evidence (see skill_profile.py); the primary key is
+# the lookup index
+UPSERT_SKILL_COUNT = """
+    INSERT INTO skill_profiles (user_id, team, source, count) VALUES (?, ?, ?, ?)
+    ON CONFLICT (user_id, team, source) DO UPDATE SET count = count + excluded.count
+"""
+
+DELETE_SKILL_SOURCE = "DELETE FROM skill_profiles WHERE user_id = ? AND source = ?"
+
+SELECT_SKILL_PROFILE = "SELECT team, source, count FROM skill_profiles WHERE user_id = ?"
+
+skill_matcher = SkillMatcher()
+
+# Admin notes, oldest first. AUTOINCREMENT ids are never reused, so
+# (count, max id) changes on every insert and every delete.
+INSERT_NOTE = "INSERT INTO notes (user_id, text) VALUES (?, ?)"
+SELECT_NOTES = "SELECT id, user_id, text, created_at FROM notes ORDER BY id"
+SELECT_NOTES_VERSION = "SELECT COUNT(*), COALESCE(MAX(id), 0) FROM notes"
+DELETE_NOTES = "DELETE FROM notes"
+
+
+# ---------------------------------------------------------------
+# Schema migrations
+# ---------------------------------------------------------------
+# Applied in order, each once; the number applied is PRAGMA
+# user_version. Append new ones at the end and never edit one that
+# has shipped. Each must also be safe on a database that already has
+# the change (tables created before versioning).
+def _migrate_summary_cursor(conn):
+    """summaries.last_message_id"""
+    # Id of the newest message folded into the summary, so the next
+    # summary only needs the messages after it
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(summaries)")]
+    if "last_message_id" not in columns:
+        conn.execute("ALTER TABLE summaries ADD COLUMN last_message_id INTEGER")
+
+
+def _migrate_user_indexes(conn):
+    """(user_id, id) indexes on messages and summaries"""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_user_id ON messages (user_id, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_summaries_user_id ON summaries (user_id, id)")
+
+
+def _migrate_skill_profiles(conn):
+    """skill_profiles, backfilled afterwards by backfill_skill_profiles()"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS skill_profiles (
+            user_id TEXT NOT NULL,
+            team TEXT NOT NULL,
+            source TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (user_id, team, source)
+        ) WITHOUT ROWID
+    """)
+
+    # Matching the whole history here would hold the migration's write
+    # lock for longer than another worker's busy timeout. Only the
+    # high-water marks are recorded: older rows are the backfill's,
+    # newer ones are counted by the chat path as they are saved.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS skill_profiles_backfill (
+            done_message_id INTEGER NOT NULL,
+            last_message_id INTEGER NOT NULL,
+            last_summary_id INTEGER NOT NULL
         )
     """)
+    conn.execute("""
+        INSERT INTO skill_profiles_backfill
+        SELECT 0, COALESCE((SELECT MAX(id) FROM messages), 0),
+               COALESCE((SELECT MAX(id) FROM summaries), 0)
+    """)
+
+
+def _parse_legacy_notes(content):
+    """[(text, created_at or None)] from notes.txt lines "- [2026-10-18T11:09:00] text"."""
+    notes = []
+    for line in content.splitlines():
+        line = line.strip()
+        if not line.startswith("- "):
+            continue
+        text, created_at = line[2:].strip(), None
+        if text.startswith("[") and "]" in text:
+            stamp, rest = text[1:].split("]", 1)
+            try:
+                # Local time in the file, UTC like every other timestamp here
+                created_at = datetime.fromisoformat(stamp).astimezone(timezone.utc)
+                created_at = created_at.strftime("%Y-%m-%d %H:%M:%S")
+                text = rest.strip()
+            except ValueError:
+                pass
+        if text:
+            notes.append((text, created_at))
+    return notes
+
 
-    # Conversation summaries
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS summaries (
+def _migrate_notes(conn):
+    """notes, imported from notes.txt"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS notes (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             user_id TEXT,
-            summary TEXT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+            text TEXT NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
         )
     """)
 
-    conn.commit()
-    conn.close()
+    # The file is left in place; it is simply no longer read
+    try:
+        with open(NOTES_LEGACY_FILE, "r", encoding="utf-8") as f:
+            legacy = _parse_legacy_notes(f.read())
+    except OSError:
+        return
+    # Undated lines (older than the timestamped format) keep a NULL created_at
+    conn.executemany("INSERT INTO notes (text, created_at) VALUES (?, ?)", legacy)
 
 
+MIGRATIONS = [
+    _migrate_summary_cursor,
+    _migrate_user_indexes,
+    _migrate_skill_profiles,
+    _migrate_notes,
+]
+
+
+def migrate(conn):
+    # The write lock makes concurrent workers apply each migration once
+    conn.execute("BEGIN IMMEDIATE")
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        migration(conn)
+        conn.execute(f"PRAGMA user_version = {number}")
+        print(f"🗄️ chat_db migration {number}: {migration.__doc__}")
+
+
+def backfill_skill_profiles(chunk=None):
+    """
+    Count the skills in messages and summaries saved before migration 3,
+    one short transaction per `chunk` messages. Safe to run from every
+    worker at once: each chunk claims its range under the write lock.
+    """
+    chunk = chunk or SKILL_BACKFILL_CHUNK
+    # Messages the chat path refused as off-topic never counted there
+    # ("what is python" is a question, not a skill), so not here either
+    router = build_sccse_router()
+    while True:
+        with connect(DB_PATH) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            state = conn.execute(
+                "SELECT done_message_id, last_message_id, last_summary_id FROM skill_profiles_backfill"
+            ).fetchone()
+            if state is None:
+                return
+            done, last_message_id, last_summary_id = state
+
+            if done < last_message_id:
+                rows = conn.execute("""
+                    SELECT id, user_id, role, message FROM messages
+                    WHERE id > ? AND id <= ? ORDER BY id LIMIT ?
+                """, (done, last_message_id, chunk)).fetchall()
+                counts = {}
+                for _, user_id, role, message in rows:
+                    if role != "user" or user_id is None:
+                        continue
+                    text = (message or "").lower().strip()
+                    if off_topic_by_rules(text, router.route(text)):
+                        continue
+                    for team, n in skill_matcher.count(text).items():
+                        key = (user_id, team, MEMORY)
+                        counts[key] = counts.get(key, 0) + n
+                conn.executemany(UPSERT_SKILL_COUNT, [key + (n,) for key, n in counts.items()])
+                done = rows[-1][0] if len(rows) == chunk else last_message_id
+                conn.execute("UPDATE skill_profiles_backfill SET done_message_id = ?", (done,))
+                continue
+
+            # Users whose latest summary predates the migration; a newer
+            # one has already replaced their summary counts
+            latest_summaries = conn.execute("""
+                SELECT user_id, summary FROM summaries
+                WHERE id IN (SELECT MAX(id) FROM summaries WHERE user_id IS NOT NULL GROUP BY user_id)
+                  AND id <= ?
+            """, (last_summary_id,)).fetchall()
+            conn.executemany(UPSERT_SKILL_COUNT, [
+                (user_id, team, SUMMARY, n)
+                for user_id, summary in latest_summaries
+                for team, n in skill_matcher.count((summary or "").lower()).items()
+            ])
+            conn.execute("DELETE FROM skill_profiles_backfill")
+            print("🗄️ chat_db: skill_profiles backfill done")
+            return
+
+
+def init_db():
+    with connect(DB_PATH) as conn:
+        # User message history
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT,
+                role TEXT,
+                message TEXT,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        # Conversation summaries
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS summaries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT,
+                summary TEXT,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+    with connect(DB_PATH) as conn:
+        migrate(conn)
+    backfill_skill_profiles()
+
+    if WRITE_BEHIND:
+        enable_write_behind()
+
+
+@metrics.timed("db.save_message")
 def save_message(user_id, role, message):
-    conn = get_connection()
-    cur = conn.cursor()
+    if _writer is not None:
+        _writer.put("message", user_id, role, message)
+        return
 
-    cur.execute(
-        "INSERT INTO messages (user_id, role, message) VALUES (?, ?, ?)",
-        (user_id, role, message)
-    )
+    with connect(DB_PATH) as conn:
+        conn.execute(INSERT_MESSAGE, (user_id, role, message))
+
+
+@metrics.timed("db.get_messages_since")
+def get_messages_since(user_id, after_id, limit=100):
+    """
+    The first `limit` committed messages with id > `after_id`, as
+    (id, role, message) oldest first; pass the last id back for the
+    ones after. Unflushed write-behind messages have no id yet; they
+    are picked up by the next call.
+    """
+    with connect(DB_PATH) as conn:
+        return conn.execute(SELECT_MESSAGES_SINCE, (user_id, after_id or 0, limit)).fetchall()
+
+
+@metrics.timed("db.get_frequent_questions")
+def get_frequent_questions(limit=30, min_count=3):
+    """[(question, count), ...] most asked first."""
+    with connect(DB_PATH) as conn:
+        return conn.execute(SELECT_FREQUENT_QUESTIONS, (min_count, limit)).fetchall()
+
+
+@metrics.timed("db.save_summary")
+def save_summary(user_id, summary, last_message_id=None):
+    if _writer is not None:
+        # Summaries have no role; that slot carries last_message_id
+        _writer.put("summary", user_id, last_message_id, summary)
+        return
+
+    with connect(DB_PATH) as conn:
+        conn.execute(INSERT_SUMMARY, (user_id, summary, last_message_id))
+
+
+def _read_last_summary(user_id):
+    with connect(DB_PATH) as conn:
+        return conn.execute(SELECT_LAST_SUMMARY, (user_id,)).fetchone()
 
-    conn.commit()
-    conn.close()
 
+@metrics.timed("db.get_last_summary_record")
+def get_last_summary_record(user_id):
+    """(summary, last_message_id) of the newest summary, or (None, None)."""
+    if _writer is None:
+        row = _read_last_summary(user_id)
+        return tuple(row) if row else (None, None)
 
-def get_user_messages(user_id, limit=50):
-    conn = get_connection()
-    cur = conn.cursor()
+    row, pending = _writer.read_through(user_id, lambda: _read_last_summary(user_id))
+    for kind, last_message_id, summary in reversed(pending):
+        if kind == "summary":
+            return summary, last_message_id
+    return tuple(row) if row else (None, None)
 
-    cur.execute("""
-        SELECT role, message 
-        FROM messages 
-        WHERE user_id = ? 
-        ORDER BY id DESC 
-        LIMIT ?
-    """, (user_id, limit))
 
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+# ---------------------------------------------------------------
+# Skill profiles
+# ---------------------------------------------------------------
+@metrics.timed("db.record_skills")
+def record_skills(user_id, text, source=MEMORY):
+    """
+    Match `text` once and store its skill counts. A user message adds
+    to the "memory" counts; a new summary replaces the "summary" ones.
+    """
+    if user_id is None:
+        return
+    counts = skill_matcher.count(text.lower())
+    if not counts and source == MEMORY:
+        return
 
+    if _writer is not None:
+        # The role slot carries the source, the text slot the counts
+        _writer.put("skills", user_id, source, counts)
+        return
 
-def save_summary(user_id, summary):
-    conn = get_connection()
-    cur = conn.cursor()
+    with connect(DB_PATH) as conn:
+        _write_skills(conn, user_id, source, counts)
 
-    cur.execute(
-        "INSERT INTO summaries (user_id, summary) VALUES (?, ?)",
-        (user_id, summary)
+
+def _write_skills(conn, user_id, source, counts):
+    if source == SUMMARY:
+        conn.execute(DELETE_SKILL_SOURCE, (user_id, SUMMARY))
+    conn.executemany(
+        UPSERT_SKILL_COUNT, [(user_id, team, source, n) for team, n in counts.items()]
     )
 
-    conn.commit()
-    conn.close()
+
+def _read_skill_profile(user_id):
+    with connect(DB_PATH) as conn:
+        return conn.execute(SELECT_SKILL_PROFILE, (user_id,)).fetchall()
+
+
+@metrics.timed("db.get_skill_profile")
+def get_skill_profile(user_id):
+    """{team: {source: count}} for the user, unflushed counts included."""
+    if user_id is None:
+        return {}
+    if _writer is None:
+        rows, pending = _read_skill_profile(user_id), []
+    else:
+        rows, pending = _writer.read_through(user_id, lambda: _read_skill_profile(user_id))
+
+    profile = {}
+    for team, source, count in rows:
+        profile.setdefault(team, {})[source] = count
+
+    # Applied in write order, the same way _write_skills will
+    for kind, source, counts in pending:
+        if kind != "skills":
+            continue
+        if source == SUMMARY:
+            for sources in profile.values():
+                sources.pop(SUMMARY, None)
+        for team, n in counts.items():
+            sources = profile.setdefault(team, {})
+            sources[source] = sources.get(source, 0) + n
+    return {team: sources for team, sources in profile.items() if sources}
+
+
+# ---------------------------------------------------------------
+# Notes
+# ---------------------------------------------------------------
+# Admin writes, rare: always synchronous, so every worker sees a note
+# as soon as the passkey reply has been sent
+@metrics.timed("db.save_note")
+def save_note(user_id, text):
+    with connect(DB_PATH) as conn:
+        conn.execute(INSERT_NOTE, (user_id, text))
+
+
+@metrics.timed("db.get_notes")
+def get_notes():
+    """[(id, user_id, text, created_at)] oldest first."""
+    with connect(DB_PATH) as conn:
+        return conn.execute(SELECT_NOTES).fetchall()
+
+
+def get_notes_version():
+    """Changes whenever a note is added or deleted, by any process."""
+    with connect(DB_PATH) as conn:
+        return tuple(conn.execute(SELECT_NOTES_VERSION).fetchone())
+
+
+def delete_notes():
+    with connect(DB_PATH) as conn:
+        conn.execute(DELETE_NOTES)
+
+
+# ---------------------------------------------------------------
+# Write-behind queue
+# ---------------------------------------------------------------
+class WriteBehindQueue:
+    """
+    Bounded in-process queue drained by one background writer thread.
+
+    Items are written in batched `executemany` transactions every
+    `flush_interval` seconds (or as soon as `batch_size` items are
+    waiting). Until an item is committed it stays in a per-user pending
+    list, so readers can merge their own unflushed writes. A full queue
+    blocks the caller rather than dropping or reordering writes.
+
+    A batch that still fails after `max_retries` retries is logged and
+    dropped (counted in stats), so a broken database can't wedge the
+    writer or the shutdown flush.
+    """
+
+    def __init__(self, max_queue=WRITE_BEHIND_MAX_QUEUE,
+                 batch_size=WRITE_BEHIND_BATCH_SIZE,
+                 flush_interval=WRITE_BEHIND_FLUSH_INTERVAL,
+                 max_retries=WRITE_BEHIND_MAX_RETRIES):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._pending = {}          # user_id -> deque[(kind, role, text)]
+        self._put_lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._flushing = False
+        self._generation = 0
+        self._stop = threading.Event()
+
+        self._stats = {
+            "max_queue_depth": 0,
+            "blocked_puts": 0,
+            "flushes": 0,
+            "rows_flushed": 0,
+            "flush_errors": 0,
+            "dropped_batches": 0,
+            "rows_dropped": 0,
+            "last_batch_size": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+        }
+
+        self._thread = threading.Thread(
+            target=self._run, name="chat-db-writer", daemon=True
+        )
+        self._thread.start()
+
+    # -----------------------------------------------------------
+    # Producer side
+    # -----------------------------------------------------------
+    def put(self, kind, user_id, role, text):
+        item = (kind, user_id, role, text)
+
+        # Pending order must match queue order for the writer's popleft
+        with self._put_lock:
+            with self._cond:
+                self._pending.setdefault(user_id, deque()).append((kind, role, text))
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                self._stats["blocked_puts"] += 1
+                self._queue.put(item)
+
+        depth = self._queue.qsize()
+        if depth > self._stats["max_queue_depth"]:
+            self._stats["max_queue_depth"] = depth
+
+    def read_through(self, user_id, read_db):
+        """
+        Run `read_db()` and return (result, pending writes for user_id)
+        as one consistent snapshot: retried if a flush moved rows from
+        the pending list into the table while we were reading.
+        """
+        while True:
+            with self._cond:
+                while self._flushing:
+                    self._cond.wait()
+                generation = self._generation
+                pending = list(self._pending.get(user_id, ()))
+
+            result = read_db()
+
+            with self._cond:
+                if generation == self._generation and not self._flushing:
+                    return result, pending
+
+    def flush(self):
+        """Block until everything queued so far has been committed."""
+        self._queue.join()
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+
+    # -----------------------------------------------------------
+    # Writer thread
+    # -----------------------------------------------------------
+    def _collect(self):
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = 0 if self._stop.is_set() else deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        messages = [(u, r, t) for k, u, r, t in batch if k == "message"]
+        summaries = [(u, t, r) for k, u, r, t in batch if k == "summary"]
+        skills = [(u, r, t) for k, u, r, t in batch if k == "skills"]
+
+        with connect(DB_PATH) as conn:
+            if messages:
+                conn.executemany(INSERT_MESSAGE, messages)
+            if summaries:
+                conn.executemany(INSERT_SUMMARY, summaries)
+            # In order: a summary's counts replace the ones before it
+            for user_id, source, counts in skills:
+                _write_skills(conn, user_id, source, counts)
+
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._collect()
+            if not batch:
+                continue
+
+            with self._cond:
+                self._flushing = True
+                self._generation += 1
+
+            start = time.perf_counter()
+            written = self._write_with_retries(batch)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            with self._cond:
+                for kind, user_id, role, text in batch:
+                    pending = self._pending[user_id]
+                    pending.popleft()
+                    if not pending:
+                        del self._pending[user_id]
+                self._flushing = False
+                self._cond.notify_all()
+
+            stats = self._stats
+            if written:
+                stats["flushes"] += 1
+                stats["rows_flushed"] += len(batch)
+                stats["last_batch_size"] = len(batch)
+                stats["last_flush_ms"] = elapsed_ms
+                stats["total_flush_ms"] += elapsed_ms
+                stats["max_flush_ms"] = max(stats["max_flush_ms"], elapsed_ms)
+            else:
+                stats["dropped_batches"] += 1
+                stats["rows_dropped"] += len(batch)
+
+            for _ in batch:
+                self._queue.task_done()
+
+    def _write_with_retries(self, batch):
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._write(batch)
+                return True
+            except Exception as e:
+                self._stats["flush_errors"] += 1
+                print("Write-behind flush error:", e)
+                if attempt < self.max_retries:
+                    time.sleep(self.flush_interval)
+        print(f"Write-behind dropped {len(batch)} rows after {self.max_retries + 1} failed writes")
+        return False
+
+    def stats(self):
+        stats = dict(self._stats)
+        stats["queue_depth"] = self._queue.qsize()
+        with self._cond:
+            stats["pending_users"] = len(self._pending)
+        flushes = stats["flushes"]
+        stats["avg_flush_ms"] = stats["total_flush_ms"] / flushes if flushes else 0.0
+        return stats
+
+
+_writer = None
+
+
+def enable_write_behind(**kwargs):
+    global _writer
+    if _writer is None:
+        _writer = WriteBehindQueue(**kwargs)
+    return _writer
+
+
+@atexit.register
+def disable_write_behind():
+    """Flush outstanding writes and fall back to synchronous mode."""
+    global _writer
+    # Readers keep merging the pending rows until they are committed
+    if _writer is not None:
+        _writer.close()
+    _writer = None
 
 
-def get_last_summary(user_id):
-    conn = get_connection()
-    cur = conn.cursor()
+def flush():
+    if _writer is not None:
+        _writer.flush()
 
-    cur.execute("""
-        SELECT summary FROM summaries 
-        WHERE user_id = ? 
-        ORDER BY id DESC LIMIT 1
-    """, (user_id,))
 
-    row = cur.fetchone()
-    conn.close()
-    return row[0] if row else None
+def write_behind_stats():
+    if _writer is None:
+        return {"enabled": False}
+    return {"enabled": True, **_writer.stats()}
@@ -1,84 +1,199 @@
 # ===============================================================
 # reader.py – View Chat History & Summaries
 # ===============================================================
+#
+#   python chat_db_reader.py                       # interactive, paged tables
+#   python chat_db_reader.py export messages --format jsonl --output history.jsonl
+#   python chat_db_reader.py export messages --user 42 --since 2026-01-01 --format csv -o -
+#   python chat_db_reader.py export summaries --format parquet -o summaries.parquet
+#
+# Exports stream rows from the cursor in --chunk-size batches straight
+# to the file, so memory stays flat however big the history is. The
+# tables are only for interactive use and show one page at a time.
 
+import os
+import sys
+import csv
+import json
+import time
 import sqlite3
+import argparse
 from tabulate import tabulate
 
 DB_PATH = "chat_history.db"   # ✅ FIXED
+PAGE_SIZE = 20
+CHUNK_SIZE = 5000
 
-def connect():
-    return sqlite3.connect(DB_PATH)
+TABLES = {
+    "messages": ["id", "user_id", "role", "message", "timestamp"],
+    "summaries": ["id", "user_id", "summary", "last_message_id", "timestamp"],
+}
 
-# ---------------------------------------------------------------
-# SHOW ALL MESSAGES
-# ---------------------------------------------------------------
-def show_all_messages():
-    conn = connect()
-    cur = conn.cursor()
+def connect(path=None):
+    # Read-only: never holds a write lock on the live database
+    return sqlite3.connect(f"file:{path or DB_PATH}?mode=ro", uri=True)
 
-    cur.execute("""
-        SELECT id, user_id, role, message, timestamp
-        FROM messages ORDER BY id ASC
-    """)
 
-    rows = cur.fetchall()
-    conn.close()
+def table_columns(conn, table):
+    """TABLES[table] minus what this database doesn't have yet.
 
-    if not rows:
-        print("\n(No messages found)\n")
-        return
+    A read-only connection can't run chat_db's migrations, so an older
+    database (e.g. summaries before last_message_id) is read as it is.
+    """
+    present = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    return [c for c in TABLES[table] if c in present]
 
-    print(tabulate(rows,
-                   headers=["ID", "User", "Role", "Message", "Time"],
-                   tablefmt="fancy_grid"))
+
+def _normalize_time(value):
+    """'2026-01-01' or '2026-01-01T10:00:00' -> SQLite's 'YYYY-MM-DD HH:MM:SS'."""
+    return value.replace("T", " ") if value else None
+
+
+def build_query(table, columns, user_id=None, since=None, until=None, after_id=0, limit=None):
+    where, params = ["id > ?"], [after_id]
+    if user_id is not None:
+        where.append("user_id = ?")
+        params.append(user_id)
+    if since:
+        where.append("timestamp >= ?")
+        params.append(_normalize_time(since))
+    if until:
+        where.append("timestamp < ?")
+        params.append(_normalize_time(until))
+
+    sql = f"SELECT {', '.join(columns)} FROM {table} WHERE {' AND '.join(where)} ORDER BY id ASC"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return sql, params
 
 # ---------------------------------------------------------------
-# SHOW MESSAGES FOR A SPECIFIC USER
+# PAGED TABLE VIEW (interactive)
 # ---------------------------------------------------------------
-def show_user_messages(user_id):
+def show_paged(table, user_id=None, page_size=PAGE_SIZE, empty_message="(No rows found)"):
+    """One `page_size` table at a time, fetched by keyset (id > last id seen)."""
     conn = connect()
-    cur = conn.cursor()
+    columns = table_columns(conn, table)
+    headers = [c.replace("_", " ").title() for c in columns]
+    after_id, shown = 0, 0
+
+    try:
+        while True:
+            sql, params = build_query(table, columns, user_id=user_id, after_id=after_id,
+                                      limit=page_size)
+            rows = conn.execute(sql, params).fetchall()
+
+            if not rows:
+                print(f"\n{empty_message}\n" if not shown else "\n(End)\n")
+                return
 
-    cur.execute("""
-        SELECT id, role, message, timestamp
-        FROM messages WHERE user_id = ?
-        ORDER BY id ASC
-    """, (user_id,))
+            print(tabulate(rows, headers=headers, tablefmt="fancy_grid"))
+            shown += len(rows)
+            after_id = rows[-1][0]
 
-    rows = cur.fetchall()
-    conn.close()
+            if len(rows) < page_size:
+                return
+            if input(f"-- {shown} rows shown. Enter for more, q to stop: ").strip().lower() == "q":
+                return
+    finally:
+        conn.close()
 
-    if not rows:
-        print("\n(No messages for this user)\n")
-        return
+# ---------------------------------------------------------------
+# SHOW ALL MESSAGES
+# ---------------------------------------------------------------
+def show_all_messages():
+    show_paged("messages", empty_message="(No messages found)")
 
-    print(tabulate(rows,
-                   headers=["ID", "Role", "Message", "Time"],
-                   tablefmt="fancy_grid"))
+# ---------------------------------------------------------------
+# SHOW MESSAGES FOR A SPECIFIC USER
+# ---------------------------------------------------------------
+def show_user_messages(user_id):
+    show_paged("messages", user_id=user_id, empty_message="(No messages for this user)")
 
 # ---------------------------------------------------------------
 # SHOW SUMMARIES
 # ---------------------------------------------------------------
 def show_summaries():
-    conn = connect()
-    cur = conn.cursor()
+    show_paged("summaries", empty_message="(No summaries found)")
+
+# ---------------------------------------------------------------
+# STREAMING EXPORT (non-interactive)
+# ---------------------------------------------------------------
+def iter_chunks(cursor, chunk_size=CHUNK_SIZE):
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        yield rows
+
+
+def write_jsonl(chunks, columns, out):
+    count = 0
+    for rows in chunks:
+        for row in rows:
+            out.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n")
+        count += len(rows)
+    return count
+
+
+def write_csv(chunks, columns, out):
+    writer = csv.writer(out)
+    writer.writerow(columns)
+    count = 0
+    for rows in chunks:
+        writer.writerows(rows)
+        count += len(rows)
+    return count
 
-    cur.execute("""
-        SELECT id, user_id, summary, timestamp
-        FROM summaries ORDER BY id ASC
-    """)
 
-    rows = cur.fetchall()
-    conn.close()
+def write_parquet(chunks, columns, path):
+    # Optional dependency, only needed for this format
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("❌ Parquet export needs pyarrow: pip install pyarrow")
 
-    if not rows:
-        print("\n(No summaries found)\n")
-        return
+    schema = pa.schema([
+        (c, pa.int64() if c in ("id", "last_message_id") else pa.string()) for c in columns
+    ])
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        # One row group per chunk
+        for rows in chunks:
+            writer.write_table(pa.Table.from_pylist([dict(zip(columns, row)) for row in rows], schema))
+            count += len(rows)
+    return count
 
-    print(tabulate(rows,
-                   headers=["ID", "User", "Summary", "Time"],
-                   tablefmt="fancy_grid"))
+
+def export(table, fmt, output, user_id=None, since=None, until=None,
+           chunk_size=CHUNK_SIZE, db_path=None):
+    conn = connect(db_path)
+    start = time.perf_counter()
+
+    try:
+        columns = table_columns(conn, table)
+        sql, params = build_query(table, columns, user_id=user_id, since=since, until=until)
+        cursor = conn.execute(sql, params)
+        chunks = iter_chunks(cursor, chunk_size)
+
+        if fmt == "parquet":
+            if output == "-":
+                raise SystemExit("❌ Parquet export needs a file (--output)")
+            count = write_parquet(chunks, columns, output)
+        else:
+            write = write_jsonl if fmt == "jsonl" else write_csv
+            if output == "-":
+                count = write(chunks, columns, sys.stdout)
+            else:
+                with open(output, "w", encoding="utf-8", newline="") as out:
+                    count = write(chunks, columns, out)
+    finally:
+        conn.close()
+
+    print(f"✅ Exported {count} {table} rows to {output} in {time.perf_counter() - start:.1f}s",
+          file=sys.stderr)
+    return count
 
 # ---------------------------------------------------------------
 # MAIN MENU
@@ -110,5 +225,32 @@ def main():
         else:
             print("Invalid option.\n")
 
+
+def cli(argv):
+    parser = argparse.ArgumentParser(description="Chat history reader")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    exp = sub.add_parser("export", help="stream a table to JSONL, CSV or Parquet")
+    exp.add_argument("table", choices=sorted(TABLES))
+    exp.add_argument("--format", choices=["jsonl", "csv", "parquet"], default="jsonl")
+    exp.add_argument("-o", "--output", default="-", help="file to write, - for stdout")
+    exp.add_argument("--user", help="only this user_id")
+    exp.add_argument("--since", help="timestamp >= this (UTC, e.g. 2026-01-01 or 2026-01-01T09:00:00)")
+    exp.add_argument("--until", help="timestamp < this (UTC)")
+    exp.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    exp.add_argument("--db", default=DB_PATH)
+
+    args = parser.parse_args(argv)
+    try:
+        export(args.table, args.format, args.output, user_id=args.user, since=args.since,
+               until=args.until, chunk_size=args.chunk_size, db_path=args.db)
+    except BrokenPipeError:
+        # Whatever read stdout stopped early (e.g. `| head`); not an error
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+
+
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1:
+        cli(sys.argv[1:])
+    else:
+        main()
@@ -3,18 +3,39 @@
 # ===============================================================
 
 import os
+import time
+import asyncio
+import functools
+import contextvars
 import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from llama_index.core import Settings
+from llama_index.core import Settings, QueryBundle
 from llama_index.llms.groq import Groq
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
-from llama_index.readers.file import PDFReader
-from llama_index.core.memory import ChatMemoryBuffer
-from llama_index.core.llms import ChatMessage
 
 from pdf import get_index
-from chat_db import init_db, save_message, get_user_messages, save_summary, get_last_summary
-from prompts import new_prompt, instruction_str  # Import your strict prompts
+from chat_db import (
+    init_db, save_message, get_messages_since,
+    save_summary, get_last_summary_record, write_behind_stats,
+    get_frequent_questions, record_skills, get_skill_profile,
+)
+from prompts import new_prompt, instruction_str, rag_system_prompt  # Import your strict prompts
+from response_cache import SemanticResponseCache
+from embedding_cache import QueryEmbeddingCache
+from embedding_batcher import EmbeddingBatcher, EMBED_BATCH_MAX_SIZE
+from intent_router import build_sccse_router, off_topic_by_rules
+from topic_classifier import TopicClassifier, load_examples, gate_applies
+from session_state import make_session_state
+from notes_store import NotesStore
+from summarizer import SummaryWorker
+from prompt_builder import PromptBuilder
+from hybrid_retriever import HybridRetriever
+from faq import FaqService, collect_questions, build_table, corpus_fingerprint
+from skill_profile import best_team, SUMMARY
+from singleflight import SingleFlight, AsyncSingleFlight, prompt_key
+import metrics
 
 # Initialize DB
 init_db()
@@ -25,15 +46,23 @@ init_db()
 logging.getLogger().setLevel(logging.ERROR)
 load_dotenv()
 
+logger = logging.getLogger("sccse")
+logger.setLevel(logging.INFO)
+logger.propagate = False
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+    logger.addHandler(_handler)
+
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "data")
-NOTES_FILE = os.path.join(BASE_DIR, "notes.txt")
 PASS_KEY = "admin123"
+OFF_TOPIC_RESPONSE = "I'm sorry, but I can only help with SCCSE-related information."
 
 os.makedirs(DATA_DIR, exist_ok=True)
-if not os.path.exists(NOTES_FILE):
-    with open(NOTES_FILE, "w", encoding="utf-8") as f:
-        f.write("🗒️ SCCSE Notes Log\n")
+
+# Notes from chat_db, re-read only when another note is added or cleared
+notes_store = NotesStore()
 
 # ---------------------------------------------------------------
 # LLM Setup
@@ -48,209 +77,411 @@ llm = Groq(
     temperature=0.0  # ⚠️ SET TO 0 FOR STRICT ADHERENCE
 )
 
-embed_model = HuggingFaceEmbedding(
-    model_name="sentence-transformers/all-MiniLM-L6-v2",
-    cache_folder="./embedding_cache"
-)
-
 Settings.llm = llm
-Settings.embed_model = embed_model
 
-# ---------------------------------------------------------------
-# Load PDF
-# ---------------------------------------------------------------
-pdf_path = os.path.join(DATA_DIR, "sccse.pdf")
-if not os.path.exists(pdf_path):
-    raise FileNotFoundError("❌ sccse.pdf missing inside /data folder")
+# Semantic cache for RAG answers (dropped whenever the notes change)
+response_cache = SemanticResponseCache(watch_fn=notes_store.version)
 
-sccse_pdf = PDFReader().load_data(file=pdf_path)
-sccse_index = get_index(sccse_pdf, "sccse")
-
-# Create a simple retriever for RAG
-sccse_retriever = sccse_index.as_retriever(similarity_top_k=3)
+# Concurrent turns with the same prompt share one Groq call (the cache
+# above only helps once the first of them has finished)
+llm_flights = SingleFlight()
+llm_aflights = AsyncSingleFlight()
 
 # ---------------------------------------------------------------
-# Memory System (Per-User)
+# Background Warm-up (embedding model + PDF index)
 # ---------------------------------------------------------------
-# Store separate memory for each user
-user_memories = {}
+# Loading MiniLM and the index takes seconds, so none of it happens at
+# import time: the server binds immediately and warm_up() runs on a
+# background thread. Only the RAG branch waits for it.
+WARMUP_WAIT_TIMEOUT = float(os.getenv("WARMUP_WAIT_TIMEOUT", "60"))
+EMBED_BATCHING = os.getenv("EMBED_BATCHING", "1") == "1"
+TOPIC_CLASSIFIER = os.getenv("TOPIC_CLASSIFIER", "1") == "1"
+TOPIC_EXAMPLES_FILE = os.path.join(DATA_DIR, "topic_examples.json")
+FAQ_QUESTIONS_FILE = os.path.join(DATA_DIR, "faq_questions.json")
+
+embed_model = None
+embedding_batcher = None
+query_embeddings = None
+sccse_index = None
+sccse_retriever = None
+topic_classifier = None
+
+startup_timings = {}
+_ready = threading.Event()
+_warmup_done = threading.Event()
+_warmup_lock = threading.Lock()
+_warmup_thread = None
+_warmup_error = None
+
+
+class NotReadyError(RuntimeError):
+    """Raised when the RAG branch is needed before warm-up finished."""
+
+
+def warm_up(embed_model_override=None):
+    """Loads the embedding model and the PDF index, timing each phase."""
+    global embed_model, embedding_batcher, query_embeddings
+    global sccse_index, sccse_retriever, topic_classifier, _warmup_error
+
+    _warmup_error = None
+    try:
+        total_start = time.perf_counter()
 
-def get_user_memory(user_id):
-    """Get or create memory buffer for a specific user"""
-    if user_id not in user_memories:
-        user_memories[user_id] = ChatMemoryBuffer.from_defaults(token_limit=50)
-    return user_memories[user_id]
+        start = time.perf_counter()
+        if embed_model_override is not None:
+            model = embed_model_override
+        else:
+            # Importing this pulls in torch/transformers, so it lives here
+            from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+            # A full micro-batch is one forward pass (the default splits at 10)
+            model = HuggingFaceEmbedding(
+                model_name="sentence-transformers/all-MiniLM-L6-v2",
+                cache_folder="./embedding_cache",
+                embed_batch_size=EMBED_BATCH_MAX_SIZE,
+            )
+        Settings.embed_model = model
+        startup_timings["embed_model"] = time.perf_counter() - start
+
+        # Only new or changed PDFs in /data are parsed and embedded
+        start = time.perf_counter()
+        if not any(f.lower().endswith(".pdf") for f in os.listdir(DATA_DIR)):
+            raise FileNotFoundError("❌ No PDFs inside /data folder")
+        index = get_index(DATA_DIR, "sccse")
+        startup_timings["index"] = time.perf_counter() - start
+
+        classifier = None
+        if TOPIC_CLASSIFIER and os.path.exists(TOPIC_EXAMPLES_FILE):
+            start = time.perf_counter()
+            classifier = TopicClassifier.train(
+                model.get_text_embedding_batch, load_examples(TOPIC_EXAMPLES_FILE)
+            )
+            startup_timings["topic_classifier"] = time.perf_counter() - start
+
+        # Concurrent cache misses are embedded together in one forward pass.
+        # all-MiniLM-L6-v2 has no query/text instructions, so the batched text
+        # embedding is identical to get_query_embedding. Started only once
+        # nothing above can fail, so a retried warm-up leaves no thread behind.
+        if EMBED_BATCHING:
+            batcher = EmbeddingBatcher(model.get_text_embedding_batch)
+            embed_query = batcher.embed
+        else:
+            batcher = None
+            embed_query = model.get_query_embedding
+
+        embed_model = model
+        # A previous warm-up's batcher; turns still holding it embed directly
+        previous_batcher, embedding_batcher = embedding_batcher, batcher
+        if previous_batcher is not None:
+            previous_batcher.close()
+        # Memoized query embeddings, shared by retrieval and the response cache
+        query_embeddings = QueryEmbeddingCache(embed_query)
+        sccse_index = index
+        # Dense + BM25 retriever over the same nodes (RETRIEVAL_MODE)
+        sccse_retriever = HybridRetriever(index)
+        topic_classifier = classifier
+        notes_store.embed_batch_fn = model.get_text_embedding_batch
+
+        startup_timings["total"] = time.perf_counter() - total_start
+        logger.info("🚀 Warm-up done: " + ", ".join(
+            f"{phase} {seconds:.2f}s" for phase, seconds in startup_timings.items()
+        ))
+        _ready.set()
+
+        # Precomputed answers; a stale table is rebuilt in the background
+        faq_service.load()
+
+    except Exception as e:
+        _warmup_error = e
+        logger.error(f"❌ Warm-up failed: {e}")
+        raise
+
+    finally:
+        _warmup_done.set()
+
+
+def start_warm_up():
+    """Starts warm_up() on a background thread (again, if it failed)."""
+    global _warmup_thread
+    with _warmup_lock:
+        if _warmup_thread is None or (_warmup_error is not None and not _warmup_thread.is_alive()):
+            _warmup_done.clear()
+            _warmup_thread = threading.Thread(
+                target=warm_up, name="warm-up", daemon=True
+            )
+            _warmup_thread.start()
+
+
+def readiness():
+    if _ready.is_set():
+        status = "ready"
+    elif _warmup_error is not None:
+        status = "failed"
+    else:
+        status = "warming_up"
+    return {
+        "status": status,
+        "timings": {phase: round(seconds, 3) for phase, seconds in startup_timings.items()},
+        "error": str(_warmup_error) if _warmup_error else None,
+    }
+
+
+def wait_until_ready(timeout=WARMUP_WAIT_TIMEOUT):
+    if _ready.is_set():
+        return
+    start_warm_up()
+    _warmup_done.wait(timeout)
+    if not _ready.is_set():
+        raise NotReadyError("The chatbot is still warming up, please try again shortly.")
 
-pending_note = None
-pending_delete = False
+# ---------------------------------------------------------------
+# Session state (Per-User)
+# ---------------------------------------------------------------
+# Admin actions waiting for the passkey, per user and shared by every
+# worker when SESSION_STATE_BACKEND=sqlite
+session_state = make_session_state()
+PENDING_ACTION = "pending_action"
 
 
 # ---------------------------------------------------------------
 # OFF-TOPIC DETECTION (Code-Level Safety Net)
 # ---------------------------------------------------------------
-def is_off_topic(query: str) -> bool:
+# Every keyword table is compiled into one automaton at startup;
+# see intent_router.SCCSE_INTENTS to add or change triggers.
+intent_router = build_sccse_router()
+
+
+@metrics.timed("off_topic")
+def is_off_topic(query: str, intents=None) -> bool:
     """
     Pre-filter off-topic queries before they reach the LLM.
     This is a safety net in case the LLM ignores prompts.
+
+    `intents` is the router output for this query, if already computed.
     """
     query_lower = query.lower().strip()
-    
-    # Allow greetings and casual chat
-    greetings = ['hi', 'hello', 'hey', 'good morning', 'good afternoon', 'good evening',
-                 'how are you', 'what\'s up', 'whats up', 'sup', 'yo', 'greetings',
-                 'thank you', 'thanks', 'bye', 'goodbye', 'see you', 'ok', 'okay',
-                 'yes', 'no', 'sure', 'alright', 'cool', 'nice', 'great']
-    
-    if any(greeting == query_lower or query_lower.startswith(greeting + ' ') for greeting in greetings):
-        return False
-    
-    # Allow very short queries (likely greetings or follow-ups)
-    if len(query_lower) <= 10 and '?' not in query_lower:
-        return False
-    
-    # Whitelist: If query mentions SCCSE, it's on-topic
-    sccse_keywords = ['sccse', 'team', 'teams', 'event', 'events', 'member', 'members', 
-                      'join', 'chapter', 'activity', 'activities', 'club']
-    has_sccse = any(keyword in query_lower for keyword in sccse_keywords)
-    
-    if has_sccse:
-        return False
-    
-    # Blacklist: Common off-topic patterns
-    off_topic_patterns = [
-        'what is python', 'what is dsa', 'what is java', 'what is ai',
-        'how to learn', 'explain', 'who is the founder', 'who founded',
-        'what is nasa', 'what is machine learning', 'what is programming',
-        'how do i code', 'teach me', 'tutorial', 'solve this problem',
-        'what is 2+2', 'calculate', 'what is the capital', 'who is president',
-        'what is variable', 'what is function', 'what is algorithm',
-        'debug this', 'fix my code', 'what is recursion', 'what is oop',
-        'write a program', 'write code', 'help me code'
-    ]
-    
-    has_off_topic = any(pattern in query_lower for pattern in off_topic_patterns)
-    
-    if has_off_topic:
-        return True
-    
-    # Additional check: Single-word technical queries (but not greetings)
-    single_word_tech = ['python', 'java', 'dsa', 'nasa', 'algorithm', 'variable', 
-                        'recursion', 'oop', 'debugging', 'malloc', 'pointer', 'coding']
-    words = query_lower.split()
-    if len(words) <= 2 and any(tech in query_lower for tech in single_word_tech):
-        return True
-    
-    return False
+    if intents is None:
+        intents = intent_router.route(query_lower)
+    return off_topic_by_rules(query_lower, intents)
 
 
 # ---------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------
-def read_notes():
-    try:
-        with open(NOTES_FILE, "r", encoding="utf-8") as f:
-            return f.read()
-    except:
-        return ""
+def append_note(text, user_id=None):
+    notes_store.append(text, user_id=user_id)
+    response_cache.invalidate()
+    faq_service.invalidate()
 
 
-def append_note(text):
-    try:
-        with open(NOTES_FILE, "a", encoding="utf-8") as f:
-            f.write(f"\n- {text.strip()}")
-    except:
-        pass
+def clear_notes():
+    notes_store.clear()
+    response_cache.invalidate()
+    faq_service.invalidate()
 
 
-def generate_summary_if_needed(user_id):
-    history = get_user_messages(user_id, limit=50)
+# ---------------------------------------------------------------
+# Conversation summaries (background)
+# ---------------------------------------------------------------
+# A summary is (re)built once SUMMARY_MIN_NEW_MESSAGES messages have
+# arrived since the last one, folding only those into the previous
+# summary, at most SUMMARY_MAX_MESSAGES per LLM call (a longer backlog
+# is folded in oldest first, one chunk after another). Runs on the
+# SummaryWorker pool, never inside a chat turn.
+SUMMARY_MIN_NEW_MESSAGES = int(os.getenv("SUMMARY_MIN_NEW_MESSAGES", "20"))
+SUMMARY_MAX_MESSAGES = int(os.getenv("SUMMARY_MAX_MESSAGES", "50"))
 
-    if len(history) < 20:
-        return
 
-    last_summary = get_last_summary(user_id)
-    if last_summary:
-        return
+def summarize_user(user_id):
+    previous, last_message_id = get_last_summary_record(user_id)
+
+    while True:
+        history = get_messages_since(user_id, last_message_id, SUMMARY_MAX_MESSAGES)
+        if len(history) < SUMMARY_MIN_NEW_MESSAGES:
+            return
 
-    convo_text = "\n".join([f"{r[0]}: {r[1]}" for r in history])
+        convo_text = "\n".join([f"{r[1]}: {r[2]}" for r in history])
 
-    prompt = f"""
+        if previous:
+            prompt = f"""
+    Update this summary of the user's skills and SCCSE-related preferences
+    with the new messages below. Keep everything that is still true.
+
+    Previous summary:
+    {previous}
+
+    New messages:
+    {convo_text}
+    """
+        else:
+            prompt = f"""
     Summarize the user's skills and SCCSE-related preferences.
 
     Conversation:
     {convo_text}
     """
 
-    result = llm.complete(prompt)
-    summary = result.text.strip()
+        with metrics.timer("summary.llm"):
+            result = llm.complete(prompt)
+        summary = result.text.strip()
+        _record_llm_usage("summary", None, summary, result.raw)
 
-    save_summary(user_id, summary)
+        # The cursor moves past exactly the messages folded in
+        previous, last_message_id = summary, history[-1][0]
+        save_summary(user_id, summary, last_message_id)
+        record_skills(user_id, summary, source=SUMMARY)
 
+        if len(history) < SUMMARY_MAX_MESSAGES:
+            return
 
-# ---------------------------------------------------------------
-# Extract skills from any text
-# ---------------------------------------------------------------
-skill_map = {
-    "tech": [
-        "python", "java", "c++", "coding", "programming",
-        "machine learning", "ml", "ai", "deeplearning",
-        "web dev", "web development", "backend", "frontend",
-        "data analysis", "data science", "algorithms",
-        "dsa", "problem solving", "cloud", "docker",
-    ],
-
-    "design": [
-        "figma", "ui", "ux", "graphic design", "illustration",
-        "photoshop", "canva", "poster", "banner", "logo",
-        "video editing", "editing", "premiere pro", "after effects",
-    ],
-
-    "pr": [
-        "communication", "public speaking", "convincing",
-        "talking to strangers", "teamwork", "leadership",
-        "event management", "content writing", "storytelling",
-        "social media", "marketing", "negotiation",
-        "presentation", "anchoring", "community building"
-    ]
-}
+
+summary_worker = SummaryWorker(summarize_user)
 
 
+# ---------------------------------------------------------------
+# Skills (matched when a message or summary is saved, see skill_profile.py)
+# ---------------------------------------------------------------
 def detect_skill_origin(user_id):
     """Determines whether skills came from MEMORY or SUMMARY."""
-    # Get this user's specific memory
-    memory = get_user_memory(user_id)
-    
-    memory_text = " ".join([
-        m.content.lower() for m in memory.get_all() if m.role == "user"
-    ])
-
-    # Check memory first
-    for team, words in skill_map.items():
-        if any(w in memory_text for w in words):
-            return "memory", team
+    return best_team(get_skill_profile(user_id))
 
-    # Check summary next
-    summary = get_last_summary(user_id)
-    if summary:
-        s = summary.lower()
-        for team, words in skill_map.items():
-            if any(w in s for w in words):
-                return "summary", team
 
-    return None, None
+# ---------------------------------------------------------------
+# MAIN CHAT FUNCTION
+# ---------------------------------------------------------------
+prompt_builder = PromptBuilder(rag_system_prompt)
+
+# What the RAG branch hands to the LLM step
+RagTurn = namedtuple("RagTurn", ["prompt", "cache_ticket", "prompt_tokens"])
+
+
+def _rag_prompt(message, intents, query_embedding, retrieved_nodes):
+    """(prompt, prompt tokens) for the RAG completion."""
+    # Only the notes relevant to this query (newest first for events),
+    # so the prompt doesn't grow with every note ever added
+    with metrics.timer("notes"):
+        notes = notes_store.select(
+            query_embedding, by="recency" if "event" in intents else "similarity"
+        )
+        notes_text = notes_store.render(notes)
+
+    # Build the prompt using our strict template, within the token budget
+    with metrics.timer("prompt_build"):
+        system_prompt, report = prompt_builder.build(
+            retrieved_nodes, message=message, notes_text=notes_text
+        )
+    return system_prompt, report["total"]
+
+
+def _llm_usage(raw):
+    """(prompt, completion) tokens as reported by Groq, if the response has them."""
+    usage = raw.get("usage") if isinstance(raw, dict) else getattr(raw, "usage", None)
+    if usage is None:
+        return None
+    get = usage.get if isinstance(usage, dict) else functools.partial(getattr, usage)
+    prompt_tokens, completion_tokens = get("prompt_tokens", None), get("completion_tokens", None)
+    if prompt_tokens is None or completion_tokens is None:
+        return None
+    return prompt_tokens, completion_tokens
+
+
+def _record_llm_usage(purpose, prompt_tokens, answer, raw=None):
+    if not metrics.registry.enabled:
+        return
+    usage = _llm_usage(raw)
+    if usage is not None:
+        prompt_tokens, completion_tokens = usage
+    else:
+        completion_tokens = len(Settings.tokenizer(answer))
+
+    metrics.inc("llm_calls_total", purpose=purpose)
+    if prompt_tokens is not None:
+        metrics.inc("llm_tokens_total", prompt_tokens, purpose=purpose, kind="prompt")
+    metrics.inc("llm_tokens_total", completion_tokens, purpose=purpose, kind="completion")
+
+
+def _record_chat_llm(turn, answer, raw, shared):
+    # A shared answer cost no extra Groq call; count it, not its tokens
+    if shared:
+        metrics.inc("llm_coalesced_total")
+    else:
+        _record_llm_usage("chat", turn.prompt_tokens, answer, raw)
+
+
+def _retrieve(message, query_embedding):
+    # Exact PDF terms (names, emails): BM25 alone is confident, so the
+    # dense search is skipped; otherwise its ranking is fused as is
+    sparse_hits, confident = sccse_retriever.keyword_only(message)
+    if confident:
+        return sparse_hits
+    return sccse_retriever.retrieve_with(
+        QueryBundle(query_str=message, embedding=query_embedding.tolist()), sparse_hits
+    )
+
+
+def rag_answer(message):
+    """The RAG answer to `message` alone: no user, memory, caches or DB."""
+    wait_until_ready()
+    intents = intent_router.route(message.lower().strip())
+    query_embedding = query_embeddings.get(message)
+    retrieved_nodes = _retrieve(message, query_embedding)
+    prompt, prompt_tokens = _rag_prompt(message, intents, query_embedding, retrieved_nodes)
+    response = llm.complete(prompt)
+    answer = response.text.strip()
+    _record_llm_usage("faq", prompt_tokens, answer, response.raw)
+    return answer
 
 
 # ---------------------------------------------------------------
-# MAIN CHAT FUNCTION
+# FAQ answer table (see faq.py; built offline or in the background)
 # ---------------------------------------------------------------
-def get_chat_response(message: str, user_name=None, user_id=None):
+# Intents whose reply depends on the user or on state, never cacheable
+FAQ_EXCLUDED_INTENTS = {"greeting", "ask_name", "save_note", "delete_notes",
+                        "skill_origin", "team_recommend"}
+
+
+def _faq_candidate(question):
+    q = question.lower().strip()
+    return (
+        len(q) > 10
+        and q != PASS_KEY
+        and not is_off_topic(q)
+        and not intent_router.route(q) & FAQ_EXCLUDED_INTENTS
+    )
+
+
+def build_faq_table(fingerprint=None, mine_limit=None, min_count=None):
+    kwargs = {}
+    if mine_limit is not None:
+        kwargs["mine_limit"] = mine_limit
+    if min_count is not None:
+        kwargs["min_count"] = min_count
+
+    questions = collect_questions(
+        FAQ_QUESTIONS_FILE, get_frequent_questions if mine_limit != 0 else None,
+        keep_fn=_faq_candidate, **kwargs
+    )
+    if fingerprint is None:
+        fingerprint = corpus_fingerprint(DATA_DIR, notes_store.digest())
+    return build_table(questions, rag_answer, embed_model.get_text_embedding_batch, fingerprint)
+
+
+faq_service = FaqService(
+    DATA_DIR, notes_store, lambda fingerprint: build_faq_table(fingerprint),
+    embed_fn=lambda text: query_embeddings.get(text),
+)
 
-    global pending_note, pending_delete
+
+def _prepare_turn(message: str, user_name=None, user_id=None):
+    """
+    Runs every step of a chat turn that happens before the LLM call.
+
+    Returns (reply, None) when the turn is answered without the LLM,
+    or (None, RagTurn) when the RAG branch needs a completion.
+    """
 
     msg_lower = message.lower().strip()
-    
-    # Get this user's specific memory
-    memory = get_user_memory(user_id)
+    with metrics.timer("route"):
+        intents = intent_router.route(msg_lower)
 
     # Save user message to DB
     save_message(user_id, "user", message)
@@ -258,112 +489,97 @@ def get_chat_response(message: str, user_name=None, user_id=None):
     # -----------------------------------------------------------
     # ⚠️ OFF-TOPIC FILTER (Applied FIRST, before anything else)
     # -----------------------------------------------------------
-    if is_off_topic(message):
-        off_topic_response = "I'm sorry, but I can only help with SCCSE-related information."
-        save_message(user_id, "assistant", off_topic_response)
-        return off_topic_response
+    if is_off_topic(message, intents):
+        metrics.inc("turns_total", path="off_topic")
+        save_message(user_id, "assistant", OFF_TOPIC_RESPONSE)
+        return OFF_TOPIC_RESPONSE, None
+
+    # Skills the user mentions, counted once here ("what is python"
+    # above is a question, not a skill)
+    record_skills(user_id, message)
 
     # -----------------------------------------------------------
     # If user asks "what is my name?"
     # -----------------------------------------------------------
-    if "what is my name" in msg_lower:
-        return f"Your name is {user_name}." if user_name else "I don't know your name."
+    if "ask_name" in intents:
+        return (f"Your name is {user_name}." if user_name else "I don't know your name."), None
 
     # -----------------------------------------------------------
     # Passkey responses
     # -----------------------------------------------------------
-    if pending_note:
-        if msg_lower == PASS_KEY:
-            append_note(pending_note)
-            text = pending_note
-            pending_note = None
-            return f"✅ Note saved: '{text}'"
-        return "🚫 Incorrect passkey. Try again."
-
-    if pending_delete:
-        if msg_lower == PASS_KEY:
-            with open(NOTES_FILE, "w", encoding="utf-8") as f:
-                f.write("🗒️ SCCSE Notes Log\n")
-            pending_delete = False
-            return "🗑️ All notes have been deleted successfully."
-        return "🚫 Incorrect passkey. Try again."
+    # Pending actions are per user; every anonymous turn has user_id
+    # None, so anonymous users never get one (see below)
+    pending = session_state.get(user_id, PENDING_ACTION) if user_id is not None else None
+    if pending:
+        if msg_lower != PASS_KEY:
+            return "🚫 Incorrect passkey. Try again.", None
+
+        # Only the request that consumes the pending action runs it
+        if not session_state.compare_and_set(user_id, PENDING_ACTION, pending, None):
+            return "That request has already been handled.", None
+
+        if pending["action"] == "note":
+            append_note(pending["text"], user_id)
+            return f"✅ Note saved: '{pending['text']}'", None
+        clear_notes()
+        return "🗑️ All notes have been deleted successfully.", None
+
+    if user_id is None and intents & {"save_note", "delete_notes"}:
+        return "🔐 Please log in to save or delete notes.", None
 
     # -----------------------------------------------------------
     # Note saving request
     # -----------------------------------------------------------
-    if msg_lower.startswith("note that"):
-        pending_note = message.split("note that", 1)[-1].strip()
-        return "🔐 This action requires the admin passkey. Please provide the passkey."
+    if "save_note" in intents:
+        text = message.split("note that", 1)[-1].strip()
+        session_state.set(user_id, PENDING_ACTION, {"action": "note", "text": text})
+        return "🔐 This action requires the admin passkey. Please provide the passkey.", None
 
     # -----------------------------------------------------------
     # Delete notes request
     # -----------------------------------------------------------
-    if "delete notes.txt" in msg_lower or "clear notes" in msg_lower:
-        pending_delete = True
-        return "🔐 This action requires the admin passkey. Please provide the passkey."
+    if "delete_notes" in intents:
+        session_state.set(user_id, PENDING_ACTION, {"action": "delete"})
+        return "🔐 This action requires the admin passkey. Please provide the passkey.", None
 
     # -----------------------------------------------------------
     # Handling "how do you know my skills?"
     # -----------------------------------------------------------
-    if "how do you know" in msg_lower or "how did you know" in msg_lower:
+    if "skill_origin" in intents:
         origin, team = detect_skill_origin(user_id)
 
         if origin == "memory":
-            return "You mentioned your skills earlier in the conversation."
+            return "You mentioned your skills earlier in the conversation.", None
         elif origin == "summary":
-            return "I remembered it from the summary of our earlier conversations."
+            return "I remembered it from the summary of our earlier conversations.", None
         else:
-            return "I can only rely on what you've shared during our chats."
+            return "I can only rely on what you've shared during our chats.", None
 
     # -----------------------------------------------------------
     # EVENT QUERY HANDLING (Special case - check notes first)
     # -----------------------------------------------------------
-    event_keywords = ['event', 'evnt', 'upcoming', 'schedule', 'when is', 'tournament', 'competition']
-    
-    if any(keyword in msg_lower for keyword in event_keywords):
-        notes_content = read_notes()
-        
-        # Check if there's actual event info in notes (not just the header)
-        notes_lines = [line.strip() for line in notes_content.split('\n') if line.strip() and not line.startswith('🗒️')]
-        
-        if not notes_lines:
+    if "event" in intents:
+        # Check if there's any event info in the notes
+        if not notes_store.entries():
             # No events in notes
             response = "There are no upcoming events at the moment."
             save_message(user_id, "assistant", response)
-            memory.put(ChatMessage(role="user", content=message))
-            memory.put(ChatMessage(role="assistant", content=response))
-            return response
+            return response, None
         
         # If we have notes, let the RAG handle it (it will use notes data)
     
     # -----------------------------------------------------------
     # TEAM RECOMMENDATION LOGIC
     # -----------------------------------------------------------
-    team_triggers = [
-        "which team should i join",
-        "what team should i join",
-        "suggest a team",
-        "which sccse team",
-        "best team for me",
-        "where should i join",
-        "team should i join",  # Catches typos like "wchisch team should i join"
-        "recommend a team",
-        "which team",
-        "what team"
-    ]
-
-    if any(t in msg_lower for t in team_triggers):
+    if "team_recommend" in intents:
 
-        origin, detected_team = detect_skill_origin(user_id)
+        _, detected_team = detect_skill_origin(user_id)
 
         # No skills known → ask user
         if not detected_team:
             response = "You haven't told me about your skills yet. What are you good at?"
             save_message(user_id, "assistant", response)
-            return response
-
-        # Skill origin tracking
-        memory.put(ChatMessage(role="assistant", content=f"[SKILL_ORIGIN:{origin}]"))
+            return response, None
 
         if detected_team == "tech":
             response = "Based on your skills, you would be a great fit for the Tech Team!"
@@ -373,71 +589,194 @@ def get_chat_response(message: str, user_name=None, user_id=None):
             response = "Your communication and soft skills make you a strong fit for the PR Team!"
         
         save_message(user_id, "assistant", response)
-        return response
+        return response, None
 
     # -----------------------------------------------------------
     # NORMAL SCCSE RAG RESPONSE (Direct LLM call with custom prompt)
     # -----------------------------------------------------------
     
-    # Retrieve relevant context from PDF
-    retrieved_nodes = sccse_retriever.retrieve(message)
-    pdf_context = "\n".join([node.text[:500] for node in retrieved_nodes])
-    
-    # Get notes
-    notes_text = read_notes()
-    
-    # Build the prompt using our strict template
-    system_prompt = f"""You are the SCCSE chatbot for the Students' Chapter of CSE at AOT.
+    wait_until_ready()
+
+    with metrics.timer("embed"):
+        query_embedding = query_embeddings.get(message)
+
+    # Embedding-level gate for off-topic queries the keyword filter
+    # missed (same whitelist: greetings, SCCSE words, short follow-ups)
+    if topic_classifier is not None and gate_applies(msg_lower, intents):
+        with metrics.timer("topic_classifier"):
+            off_topic = topic_classifier.is_off_topic(query_embedding)
+        if off_topic:
+            metrics.inc("turns_total", path="topic_classifier")
+            save_message(user_id, "assistant", OFF_TOPIC_RESPONSE)
+            return OFF_TOPIC_RESPONSE, None
+
+    # One of the precomputed FAQ questions?
+    with metrics.timer("faq"):
+        faq_answer = faq_service.lookup(message, query_embedding)
+    if faq_answer is not None:
+        metrics.inc("turns_total", path="faq")
+        _finish_turn(message, user_id, faq_answer)
+        return faq_answer, None
+
+    # Near-duplicate of a question we already answered?
+    with metrics.timer("response_cache"):
+        cached_answer, cache_ticket = response_cache.lookup(query_embedding)
+    if cached_answer is not None:
+        metrics.inc("turns_total", path="response_cache")
+        _finish_turn(message, user_id, cached_answer)
+        return cached_answer, None
+
+    # Retrieve relevant context from PDF (dense + BM25, fused, or BM25
+    # alone for exact terms)
+    with metrics.timer("retrieve"):
+        retrieved_nodes = _retrieve(message, query_embedding)
+
+    system_prompt, prompt_tokens = _rag_prompt(message, intents, query_embedding, retrieved_nodes)
+    return None, RagTurn(system_prompt, cache_ticket, prompt_tokens)
+
+
+@metrics.timed("finish")
+def _finish_turn(message, user_id, llm_answer, turn=None):
+    """Persistence once the LLM answer is complete."""
+    if turn is not None and turn.cache_ticket is not None:
+        response_cache.store(turn.cache_ticket, llm_answer)
 
-QUERY: "{message}"
+    save_message(user_id, "assistant", llm_answer)
+    summary_worker.request(user_id)
 
-YOUR TASK:
-1. If this is a GREETING (hi, hello, thanks, bye) → Respond warmly
-2. If this is about SCCSE (teams, events, members, activities) → Answer using the data below
-3. If this is OFF-TOPIC (Python, NASA, DSA, coding, math, general knowledge) → Respond ONLY: "I'm sorry, but I can only help with SCCSE-related information."
 
-AVAILABLE INFORMATION:
+@metrics.timed("turn")
+def get_chat_response(message: str, user_name=None, user_id=None):
+    reply, turn = _prepare_turn(message, user_name, user_id)
+    if reply is not None:
+        return reply
 
-NOTES (Most Recent & Important - Use This FIRST for events):
-{notes_text}
+    # Call LLM directly with our strict prompt
+    with metrics.timer("llm"):
+        response, shared = llm_flights.do(
+            prompt_key(turn.prompt), lambda: llm.complete(turn.prompt)
+        )
+    llm_answer = response.text.strip()
+    _record_chat_llm(turn, llm_answer, response.raw, shared)
 
-PDF (General SCCSE Information):
-{pdf_context}
+    _finish_turn(message, user_id, llm_answer, turn)
+    return llm_answer
 
-CRITICAL RULES FOR EVENTS:
-• If the query is about events/schedules, ONLY use information from the NOTES section above
-• If NOTES section is empty or doesn't have event info, say: "There are no upcoming events at the moment."
-• NEVER use old event information from the PDF for current event queries
-• Events are time-sensitive - only trust the NOTES section
 
-OTHER RULES:
-• Answer directly and naturally - do NOT explain your reasoning
-• NEVER mention "notes", "PDF", "data", or "according to"
-• Just state the information as if you naturally know it
-• For non-event queries, you can use PDF information
-• If no information available: "I'm not sure about that. I only provide information related to SCCSE members, teams, events, and activities."
+def stream_chat_response(message: str, user_name=None, user_id=None):
+    """
+    Same turn as get_chat_response, but yields the answer as text
+    deltas while Groq generates it. Memory and DB updates run once the
+    stream has finished.
+    """
+    reply, turn = _prepare_turn(message, user_name, user_id)
+    if reply is not None:
+        yield reply
+        return
 
-RESPONSE:"""
-    
-    # Call LLM directly with our strict prompt
-    response = llm.complete(system_prompt)
-    llm_answer = response.text.strip()
+    stream, shared = llm_flights.stream(
+        prompt_key(turn.prompt), lambda: llm.stream_complete(turn.prompt)
+    )
+    chunks, raw = [], None
+    with metrics.timer("llm"):
+        for chunk in stream:
+            raw = chunk.raw
+            if chunk.delta:
+                chunks.append(chunk.delta)
+                yield chunk.delta
 
-    # Save to memory + DB
-    memory.put(ChatMessage(role="user", content=message))
-    memory.put(ChatMessage(role="assistant", content=llm_answer))
+    llm_answer = "".join(chunks).strip()
+    _record_chat_llm(turn, llm_answer, raw, shared)
+    _finish_turn(message, user_id, llm_answer, turn)
+
+
+# ---------------------------------------------------------------
+# Runtime stats (served on /stats)
+# ---------------------------------------------------------------
+def service_stats():
+    """Component stats (also exported as gauges on /metrics)."""
+    return {
+        "response_cache": response_cache.stats(),
+        "query_embeddings": query_embeddings.stats() if query_embeddings else None,
+        "embedding_batcher": embedding_batcher.stats() if embedding_batcher else None,
+        "summaries": summary_worker.stats(),
+        "faq": faq_service.stats(),
+        "chat_db": write_behind_stats(),
+        "llm_singleflight": llm_flights.stats(),
+        "llm_singleflight_async": llm_aflights.stats(),
+    }
+
+
+# ---------------------------------------------------------------
+# ASYNC CHAT (used by asgi_app.py)
+# ---------------------------------------------------------------
+# SQLite, embedding and vector search stay blocking; they run on a
+# bounded pool so the event loop only ever awaits the network call.
+BLOCKING_WORKERS = int(os.getenv("BLOCKING_WORKERS", "8"))
+_blocking_pool = ThreadPoolExecutor(
+    max_workers=BLOCKING_WORKERS, thread_name_prefix="chat-blocking"
+)
 
-    save_message(user_id, "assistant", llm_answer)
-    generate_summary_if_needed(user_id)
 
+async def run_blocking(fn, *args, **kwargs):
+    # In a copy of the caller's context, so per-request metrics follow
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        _blocking_pool, functools.partial(context.run, fn, *args, **kwargs)
+    )
+
+
+@metrics.timed("turn")
+async def aget_chat_response(message: str, user_name=None, user_id=None):
+    reply, turn = await run_blocking(_prepare_turn, message, user_name, user_id)
+    if reply is not None:
+        return reply
+
+    with metrics.timer("llm"):
+        response, shared = await llm_aflights.do(
+            prompt_key(turn.prompt), lambda: llm.acomplete(turn.prompt)
+        )
+    llm_answer = response.text.strip()
+    _record_chat_llm(turn, llm_answer, response.raw, shared)
+
+    await run_blocking(_finish_turn, message, user_id, llm_answer, turn)
     return llm_answer
 
 
+async def _astream_complete(prompt):
+    async for chunk in await llm.astream_complete(prompt):
+        yield chunk
+
+
+async def astream_chat_response(message: str, user_name=None, user_id=None):
+    reply, turn = await run_blocking(_prepare_turn, message, user_name, user_id)
+    if reply is not None:
+        yield reply
+        return
+
+    stream, shared = llm_aflights.stream(
+        prompt_key(turn.prompt), lambda: _astream_complete(turn.prompt)
+    )
+    chunks, raw = [], None
+    with metrics.timer("llm"):
+        async for chunk in stream:
+            raw = chunk.raw
+            if chunk.delta:
+                chunks.append(chunk.delta)
+                yield chunk.delta
+
+    llm_answer = "".join(chunks).strip()
+    _record_chat_llm(turn, llm_answer, raw, shared)
+    await run_blocking(_finish_turn, message, user_id, llm_answer, turn)
+
+
 # ---------------------------------------------------------------
 # Debug mode
 # ---------------------------------------------------------------
 if __name__ == "__main__":
     print("🤖 Debug Mode ON")
+    start_warm_up()
     print("Testing off-topic detection...")
     
     test_queries = [
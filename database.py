@@ -1,68 +1,60 @@
-import sqlite3
 import os
+from storage import connect
 
 DB_PATH = os.path.join(os.path.dirname(__file__), "users.db")
 
 def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    with connect(DB_PATH) as conn:
+        c = conn.cursor()
+
+        # --- Users Table ---
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            email TEXT UNIQUE,
+            password TEXT
+        )
+        """)
+
+        # --- Notes Table ---
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS notes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            note TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
 
-    # --- Users Table ---
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT,
-        email TEXT UNIQUE,
-        password TEXT
-    )
-    """)
-
-    # --- Notes Table ---
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS notes (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER,
-        note TEXT,
-        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-    )
-    """)
+def add_user(name, email, password):
+    with connect(DB_PATH) as conn:
+        conn.execute(
+            "INSERT INTO users (name, email, password) VALUES (?, ?, ?)",
+            (name, email, password)
+        )
 
-    conn.commit()
-    conn.close()
 
-def add_user(name, email, password):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute(
-        "INSERT INTO users (name, email, password) VALUES (?, ?, ?)",
-        (name, email, password)
-    )
-    conn.commit()
-    conn.close()
+def user_exists(email):
+    with connect(DB_PATH) as conn:
+        row = conn.execute("SELECT 1 FROM users WHERE email=?", (email,)).fetchone()
+    return row is not None
 
 
 def get_user(email, password):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT id, name FROM users WHERE email=? AND password=?",
-              (email, password))
-    result = c.fetchone()
-    conn.close()
+    with connect(DB_PATH) as conn:
+        c = conn.execute("SELECT id, name FROM users WHERE email=? AND password=?",
+                         (email, password))
+        result = c.fetchone()
     return result  # returns (user_id, name)
 
 
 def save_note(user_id, note):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("INSERT INTO notes (user_id, note) VALUES (?, ?)", (user_id, note))
-    conn.commit()
-    conn.close()
+    with connect(DB_PATH) as conn:
+        conn.execute("INSERT INTO notes (user_id, note) VALUES (?, ?)", (user_id, note))
 
 def get_user_notes(user_id):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT note FROM notes WHERE user_id=?", (user_id,))
-    result = c.fetchall()
-    conn.close()
+    with connect(DB_PATH) as conn:
+        result = conn.execute("SELECT note FROM notes WHERE user_id=?", (user_id,)).fetchall()
 
     return " ".join([row[0] for row in result]) if result else ""
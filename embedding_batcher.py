@@ -0,0 +1,111 @@
+# ===============================================================
+# embedding_batcher.py – Micro-batching of concurrent query embeddings
+# ===============================================================
+#
+# Under burst load every /chat thread would run its own batch-of-one
+# forward pass through MiniLM. The batcher parks callers for at most
+# `max_wait_ms`, runs everything that arrived in that window as one
+# batched forward pass, and hands each caller its own vector.
+
+import os
+import time
+import queue
+import threading
+from concurrent.futures import Future
+
+EMBED_BATCH_MAX_SIZE = int(os.getenv("EMBED_BATCH_MAX_SIZE", "32"))
+EMBED_BATCH_MAX_WAIT_MS = float(os.getenv("EMBED_BATCH_MAX_WAIT_MS", "2"))
+
+
+class EmbeddingBatcher:
+    """Collects `embed(text)` calls from many threads into batched calls."""
+
+    def __init__(self, embed_batch_fn, max_batch=EMBED_BATCH_MAX_SIZE,
+                 max_wait_ms=EMBED_BATCH_MAX_WAIT_MS):
+        self.embed_batch_fn = embed_batch_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+
+        self._queue = queue.Queue()
+        # Guards _closed against enqueues: nothing is queued behind the
+        # close() sentinel, where the stopped thread would never see it
+        self._lock = threading.Lock()
+        self._closed = False
+        self.batches = 0
+        self.items = 0
+
+        self._thread = threading.Thread(
+            target=self._run, name="embedding-batcher", daemon=True
+        )
+        self._thread.start()
+
+    def embed(self, text):
+        future = Future()
+        with self._lock:
+            closed = self._closed
+            if not closed:
+                self._queue.put((text, future))
+        if closed:
+            return self.embed_batch_fn([text])[0]
+        return future.result()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _process(self, batch):
+        texts = [text for text, _ in batch]
+        try:
+            vectors = self.embed_batch_fn(texts)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for (_, future), vector in zip(batch, vectors):
+            future.set_result(vector)
+
+        self.batches += 1
+        self.items += len(batch)
+
+    def _run(self):
+        while True:
+            items = self._collect()
+            batch = [item for item in items if item is not None]
+            if batch:
+                self._process(batch)
+
+            if len(batch) < len(items):
+                # close() sentinel: serve any stragglers, then stop
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        return
+                    if item is not None:
+                        self._process([item])
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "queue_depth": self._queue.qsize(),
+        }
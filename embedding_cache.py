@@ -0,0 +1,117 @@
+# ===============================================================
+# embedding_cache.py – Memoized query embeddings
+# ===============================================================
+#
+# Embedding the query with MiniLM is the dominant local cost of a
+# turn on CPU-only hosts. Repeated questions reuse the vector instead.
+# all-MiniLM-L6-v2 is uncased and ignores whitespace, so keying on
+# lowercased, whitespace-collapsed text never changes the result.
+#
+# Vectors are kept in one float32 slab (rows reused on eviction), so
+# memory use is fixed and predictable.
+
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+
+EMBED_CACHE_MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "4096"))
+EMBED_CACHE_MAX_BYTES = int(os.getenv("EMBED_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+
+
+def normalize_query(text):
+    return " ".join(text.lower().split())
+
+
+class QueryEmbeddingCache:
+    """
+    LRU memoizer around a `text -> vector` function, bounded by entry
+    count and by bytes (vector slab + keys).
+    """
+
+    def __init__(self, embed_fn, max_entries=EMBED_CACHE_MAX_ENTRIES,
+                 max_bytes=EMBED_CACHE_MAX_BYTES):
+        self.embed_fn = embed_fn
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._slab = None                  # (capacity, dim) float32
+        self._row_bytes = 0
+        self._capacity = 0
+        self._slots = OrderedDict()        # key -> row
+        self._free = []
+        self._key_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def _allocate(self, dim):
+        self._row_bytes = dim * 4
+        self._capacity = max(1, min(self.max_entries, self.max_bytes // self._row_bytes))
+        self._slab = np.zeros((self._capacity, dim), dtype=np.float32)
+        self._free = list(range(self._capacity - 1, -1, -1))
+
+    def _bytes_locked(self):
+        return len(self._slots) * self._row_bytes + self._key_bytes
+
+    def _evict_oldest_locked(self):
+        key, row = self._slots.popitem(last=False)
+        self._key_bytes -= len(key.encode("utf-8"))
+        self._free.append(row)
+
+    def get(self, text):
+        """Returns the query embedding as a float32 array (a copy)."""
+        key = normalize_query(text)
+
+        with self._lock:
+            row = self._slots.get(key)
+            if row is not None:
+                self._slots.move_to_end(key)
+                self.hits += 1
+                return self._slab[row].copy()
+            self.misses += 1
+
+        vector = np.asarray(self.embed_fn(key), dtype=np.float32)
+        self.put(key, vector)
+        return vector
+
+    def put(self, key, vector):
+        with self._lock:
+            if self._slab is None:
+                self._allocate(vector.shape[0])
+            if key in self._slots:
+                return
+
+            key_bytes = len(key.encode("utf-8"))
+            while self._slots and (
+                not self._free
+                or self._bytes_locked() + self._row_bytes + key_bytes > self.max_bytes
+            ):
+                self._evict_oldest_locked()
+
+            row = self._free.pop()
+            self._slab[row] = vector
+            self._slots[key] = row
+            self._key_bytes += key_bytes
+
+    def clear(self):
+        with self._lock:
+            self._slots.clear()
+            self._key_bytes = 0
+            if self._slab is not None:
+                self._free = list(range(self._capacity - 1, -1, -1))
+
+    def stats(self):
+        with self._lock:
+            entries = len(self._slots)
+            used = self._bytes_locked()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "capacity": self._capacity,
+            "bytes": used,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,284 @@
+# ===============================================================
+# faq.py – Precomputed answers for the recurring SCCSE questions
+# ===============================================================
+#
+# Most traffic is the same few questions ("what teams are there",
+# "how do I join"...). The FAQ table answers them once, offline, with
+# the normal RAG pipeline and stores (question, answer, embedding). At
+# runtime a query that matches a question exactly (case, spacing and
+# punctuation aside) or by cosine similarity above FAQ_THRESHOLD is
+# answered straight from the table: no retrieval, no Groq call.
+#
+# Questions come from data/faq_questions.json (curated) plus the most
+# frequent user messages in the messages table (mined).
+#
+# The table records a fingerprint of the PDFs in data/ and of the
+# notes. A table whose fingerprint no longer matches is never
+# served; FaqService drops it and rebuilds in the background.
+#
+#   python faq.py                 # build (or rebuild) storage/faq
+#   python faq.py --mine 50 --min-count 2
+
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+import numpy as np
+from embedding_cache import normalize_query
+from util import file_sha256, unit_rows, unit_vector
+
+FAQ_DIR = os.path.join("storage", "faq")
+FAQ_THRESHOLD = float(os.getenv("FAQ_THRESHOLD", "0.9"))
+FAQ_MINE_LIMIT = int(os.getenv("FAQ_MINE_LIMIT", "30"))
+FAQ_MIN_COUNT = int(os.getenv("FAQ_MIN_COUNT", "3"))
+FAQ_AUTO_REBUILD = os.getenv("FAQ_AUTO_REBUILD", "1") == "1"
+FAQ_REBUILD_DELAY = float(os.getenv("FAQ_REBUILD_DELAY", "10"))
+
+_APOSTROPHE = re.compile(r"['’]")
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def faq_key(text):
+    """Lookup key: "What's SCCSE?" and "whats sccse" are one question."""
+    return normalize_query(_PUNCTUATION.sub(" ", _APOSTROPHE.sub("", text)))
+
+
+def corpus_fingerprint(data_dir, notes_digest):
+    """Changes whenever a PDF in `data_dir` or the notes (NotesStore.digest) change."""
+    h = hashlib.sha256()
+    for name in sorted(f for f in os.listdir(data_dir) if f.lower().endswith(".pdf")):
+        h.update(f"{name}:{file_sha256(os.path.join(data_dir, name))}\n".encode("utf-8"))
+    h.update(f"notes:{notes_digest}".encode("utf-8"))
+    return h.hexdigest()
+
+
+# ---------------------------------------------------------------
+# Table
+# ---------------------------------------------------------------
+class FaqTable:
+
+    def __init__(self, questions, answers, matrix, fingerprint, threshold=FAQ_THRESHOLD):
+        self.questions = questions
+        self.answers = answers
+        self.fingerprint = fingerprint
+        self.threshold = threshold
+
+        if not len(questions):
+            matrix = np.zeros((0, 1), dtype=np.float32)
+        self._matrix = unit_rows(matrix)
+        self._exact = {faq_key(q): i for i, q in enumerate(questions)}
+
+    def __len__(self):
+        return len(self.questions)
+
+    def lookup_text(self, text):
+        i = self._exact.get(faq_key(text))
+        return None if i is None else self.answers[i]
+
+    def lookup(self, vector):
+        if not len(self.questions):
+            return None
+        scores = self._matrix @ unit_vector(vector)
+        best = int(np.argmax(scores))
+        return self.answers[best] if scores[best] >= self.threshold else None
+
+    def save(self, faq_dir=FAQ_DIR):
+        os.makedirs(faq_dir, exist_ok=True)
+        with open(os.path.join(faq_dir, "faq.npy.tmp"), "wb") as f:
+            np.save(f, self._matrix)
+        with open(os.path.join(faq_dir, "faq.json.tmp"), "w", encoding="utf-8") as f:
+            json.dump({
+                "fingerprint": self.fingerprint,
+                "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "questions": self.questions,
+                "answers": self.answers,
+            }, f, indent=2, ensure_ascii=False)
+        os.replace(os.path.join(faq_dir, "faq.npy.tmp"), os.path.join(faq_dir, "faq.npy"))
+        os.replace(os.path.join(faq_dir, "faq.json.tmp"), os.path.join(faq_dir, "faq.json"))
+
+    @classmethod
+    def load(cls, faq_dir=FAQ_DIR):
+        try:
+            with open(os.path.join(faq_dir, "faq.json"), "r", encoding="utf-8") as f:
+                table = json.load(f)
+            matrix = np.load(os.path.join(faq_dir, "faq.npy"))
+        except (OSError, ValueError):
+            return None
+        return cls(table["questions"], table["answers"], matrix, table["fingerprint"])
+
+
+def collect_questions(curated_path, mine_fn=None, keep_fn=None,
+                      mine_limit=FAQ_MINE_LIMIT, min_count=FAQ_MIN_COUNT):
+    """Curated questions first, then mined ones, without duplicates."""
+    questions = []
+    if curated_path and os.path.exists(curated_path):
+        with open(curated_path, "r", encoding="utf-8") as f:
+            questions.extend(json.load(f))
+    if mine_fn is not None:
+        questions.extend(q for q, _ in mine_fn(mine_limit, min_count))
+
+    seen, result = set(), []
+    for q in questions:
+        key = faq_key(q)
+        if key and key not in seen and (keep_fn is None or keep_fn(q)):
+            seen.add(key)
+            result.append(q)
+    return result
+
+
+def build_table(questions, answer_fn, embed_batch_fn, fingerprint):
+    answers = []
+    for q in questions:
+        answers.append(answer_fn(q))
+        print(f"❓ {q}\n   → {answers[-1][:80]}")
+    matrix = embed_batch_fn(questions) if questions else None
+    return FaqTable(questions, answers, matrix, fingerprint)
+
+
+# ---------------------------------------------------------------
+# Runtime
+# ---------------------------------------------------------------
+class FaqService:
+    """
+    Serves the current table and keeps it in step with the corpus.
+
+    `rebuild_fn(fingerprint)` builds and returns a new FaqTable; it
+    runs on a background thread, FAQ_REBUILD_DELAY seconds after the
+    last change (notes often change several times in a row).
+    `embed_fn(text)` embeds a query whose text matched no question and
+    came without a vector.
+    """
+
+    def __init__(self, data_dir, notes, rebuild_fn, embed_fn=None, faq_dir=FAQ_DIR,
+                 auto_rebuild=FAQ_AUTO_REBUILD, rebuild_delay=FAQ_REBUILD_DELAY):
+        self.data_dir = data_dir
+        self.notes = notes              # NotesStore: version() and digest()
+        self.rebuild_fn = rebuild_fn
+        self.embed_fn = embed_fn
+        self.faq_dir = faq_dir
+        self.auto_rebuild = auto_rebuild
+        self.rebuild_delay = rebuild_delay
+
+        self._lock = threading.Lock()
+        self._table = None
+        self._notes_version = notes.version()
+        self._rebuild_at = None
+        self._rebuilding = False
+
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+
+    def load(self):
+        """Called at warm-up: serve the saved table if it is still current."""
+        table = FaqTable.load(self.faq_dir)
+        self._notes_version = self.notes.version()
+        fingerprint = corpus_fingerprint(self.data_dir, self.notes.digest())
+        with self._lock:
+            if table is not None and table.fingerprint == fingerprint:
+                self._table = table
+                print(f"📋 FAQ table loaded: {len(table)} questions")
+                return
+            self._table = None
+        self.schedule_rebuild(delay=0)
+
+    def invalidate(self):
+        """The notes changed through the app."""
+        with self._lock:
+            self._table = None
+            self._notes_version = self.notes.version()
+        self.schedule_rebuild()
+
+    def _current(self):
+        # A note added or cleared by another worker changes the version
+        if self.notes.version() != self._notes_version:
+            self.invalidate()
+        return self._table
+
+    def lookup(self, text, vector=None):
+        table = self._current()
+        answer = None
+        if table is not None:
+            answer = table.lookup_text(text)
+            if answer is None and vector is None and self.embed_fn is not None:
+                vector = self.embed_fn(text)
+            if answer is None and vector is not None:
+                answer = table.lookup(vector)
+        if answer is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return answer
+
+    # -----------------------------------------------------------
+    # Background rebuild
+    # -----------------------------------------------------------
+    def schedule_rebuild(self, delay=None):
+        if not self.auto_rebuild:
+            return
+        delay = self.rebuild_delay if delay is None else delay
+        with self._lock:
+            self._rebuild_at = time.monotonic() + delay
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._rebuild_loop, name="faq-rebuild", daemon=True).start()
+
+    def _rebuild_loop(self):
+        while True:
+            with self._lock:
+                wait = self._rebuild_at - time.monotonic()
+                if wait <= 0:
+                    self._rebuild_at = None
+            if wait > 0:
+                time.sleep(wait)
+                continue
+
+            try:
+                fingerprint = corpus_fingerprint(self.data_dir, self.notes.digest())
+                table = self.rebuild_fn(fingerprint)
+                table.save(self.faq_dir)
+                print(f"📋 FAQ table rebuilt: {len(table)} questions")
+            except Exception as e:
+                table = None
+                print(f"❌ FAQ rebuild failed: {e}")
+
+            with self._lock:
+                if self._rebuild_at is not None:
+                    continue            # changed again while building
+                self.rebuilds += 1
+                if table is not None and table.fingerprint == corpus_fingerprint(
+                        self.data_dir, self.notes.digest()):
+                    self._table = table
+                self._rebuilding = False
+                return
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        table = self._table
+        return {
+            "questions": len(table) if table is not None else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "rebuilds": self.rebuilds,
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+    os.environ.setdefault("FAQ_AUTO_REBUILD", "0")
+
+    parser = argparse.ArgumentParser(description="Build the FAQ answer table")
+    parser.add_argument("--mine", type=int, default=FAQ_MINE_LIMIT,
+                        help="how many frequent user questions to mine (0 = curated only)")
+    parser.add_argument("--min-count", type=int, default=FAQ_MIN_COUNT)
+    args = parser.parse_args()
+
+    import chatbot_backend
+    chatbot_backend.warm_up()
+    table = chatbot_backend.build_faq_table(mine_limit=args.mine, min_count=args.min_count)
+    table.save()
+    print(f"✅ FAQ table saved to {FAQ_DIR}: {len(table)} questions")
@@ -25,22 +25,55 @@ function Chat() {
     const userMsg = { sender: "user", text: input };
     setMessages((prev) => [...prev, userMsg]);
 
-    const res = await fetch("http://127.0.0.1:5000/chat", {
+    setInput("");
+
+    // Empty bot bubble that fills in as tokens stream from /chat/stream
+    setMessages((prev) => [...prev, { sender: "bot", text: "" }]);
+    const appendToBot = (chunk) =>
+      setMessages((prev) => {
+        const next = [...prev];
+        const last = next[next.length - 1];
+        next[next.length - 1] = { ...last, text: last.text + chunk };
+        return next;
+      });
+
+    const res = await fetch("http://127.0.0.1:5000/chat/stream", {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify({
         user_id: user_id,
         name: user_name,     // ✅ sending name to backend
-        message: input
+        message: userMsg.text
       }),
     });
 
-    const data = await res.json();
+    if (!res.ok || !res.body) {
+      const data = await res.json();
+      appendToBot(data.error || "Something went wrong.");
+      return;
+    }
 
-    const botMsg = { sender: "bot", text: data.reply || data.error };
-    setMessages((prev) => [...prev, botMsg]);
+    // Parse Server-Sent Events: blank-line separated "event:"/"data:" blocks
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
 
-    setInput("");
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      const events = buffer.split("\n\n");
+      buffer = events.pop();
+
+      for (const evt of events) {
+        const type = evt.match(/^event: (.*)$/m)?.[1] || "message";
+        const payload = JSON.parse(evt.match(/^data: (.*)$/m)?.[1] || "{}");
+
+        if (type === "message" && payload.token) appendToBot(payload.token);
+        if (type === "error") appendToBot(payload.error);
+      }
+    }
   };
 
   return (
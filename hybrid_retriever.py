@@ -0,0 +1,197 @@
+# ===============================================================
+# hybrid_retriever.py – BM25 + dense retrieval with rank fusion
+# ===============================================================
+#
+# Dense retrieval is good at paraphrases but weak at exact names
+# ("who is antara dhar?"). The hybrid retriever keeps a small BM25
+# inverted index over the same nodes pdf.get_index stored, runs both
+# searches and merges the two rankings with reciprocal rank fusion:
+#
+#     score(node) = sum over lists of 1 / (RRF_K + rank in that list)
+#
+# When every content word of the query occurs in the best BM25 node
+# and at least one of them is rare in the corpus (a name, an email...),
+# keyword_only() says the BM25 ranking can stand on its own and the
+# caller can skip the dense search. Rarity is counted over lines, not
+# nodes: a PDF split into two nodes has every word in at most two, but
+# a name still sits on one line where "team" sits on five. Below
+# KEYWORD_MIN_PASSAGES lines even that can't tell them apart, so tiny
+# corpora always fuse.
+
+import os
+import re
+import math
+from collections import Counter, defaultdict
+import numpy as np
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.schema import NodeWithScore, QueryBundle
+
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")      # hybrid | dense | sparse
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "3"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+# Share of lines a term may occur on and still count as rare
+KEYWORD_MAX_DF_RATIO = float(os.getenv("KEYWORD_MAX_DF_RATIO", "0.02"))
+KEYWORD_MIN_PASSAGES = int(os.getenv("KEYWORD_MIN_PASSAGES", "20"))
+# Set to 0 to always run the dense search as well
+KEYWORD_SHORTCUT = os.getenv("KEYWORD_SHORTCUT", "1") == "1"
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:[.@'][a-z0-9]+)*")
+
+STOPWORDS = frozenset("""
+a an and are as at be but by can do does for from has have how i in is it
+its me my of on or our so tell that the their them there they this to us
+was we what when where which who whom why will with you your about any
+""".split())
+
+
+def tokenize(text):
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """Inverted index over a fixed list of nodes, Okapi BM25 scoring."""
+
+    def __init__(self, nodes, k1=1.5, b=0.75):
+        self.nodes = list(nodes)
+        self.k1 = k1
+        self.b = b
+
+        postings = defaultdict(lambda: ([], []))
+        lengths = []
+        # For keyword_only(): each node's terms, and on how many lines
+        # (passages) of the whole corpus each term occurs
+        self.node_terms = []
+        self._passage_df = Counter()
+        self.passages = 0
+        for i, node in enumerate(self.nodes):
+            content = node.get_content()
+            terms = Counter(tokenize(content))
+            lengths.append(sum(terms.values()))
+            self.node_terms.append(frozenset(terms))
+            for term, tf in terms.items():
+                ids, tfs = postings[term]
+                ids.append(i)
+                tfs.append(tf)
+            for line in content.splitlines():
+                line_terms = set(tokenize(line))
+                if line_terms:
+                    self.passages += 1
+                    self._passage_df.update(line_terms)
+
+        n = len(self.nodes)
+        self._doc_len = np.asarray(lengths, dtype=np.float32)
+        self._avg_len = float(self._doc_len.mean()) if n else 0.0
+        # term -> (node ids int32, term freqs float32, idf)
+        self._postings = {
+            term: (np.asarray(ids, dtype=np.int32), np.asarray(tfs, dtype=np.float32),
+                   math.log((n - len(ids) + 0.5) / (len(ids) + 0.5) + 1.0))
+            for term, (ids, tfs) in postings.items()
+        }
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def document_frequency(self, term):
+        entry = self._postings.get(term)
+        return len(entry[0]) if entry else 0
+
+    def passage_frequency(self, term):
+        return self._passage_df.get(term, 0)
+
+    def search(self, query, top_k, terms=None):
+        """
+        [(node index, score), ...] best first; only nodes sharing a term.
+        `terms`: the query already tokenized, if the caller has it.
+        """
+        if not self.nodes:
+            return []
+        scores = np.zeros(len(self.nodes), dtype=np.float32)
+        norm = self.k1 * (1 - self.b + self.b * self._doc_len / (self._avg_len or 1.0))
+        for term in terms if terms is not None else set(tokenize(query)):
+            entry = self._postings.get(term)
+            if entry is None:
+                continue
+            ids, tfs, idf = entry
+            scores[ids] += idf * tfs * (self.k1 + 1) / (tfs + norm[ids])
+
+        hits = np.flatnonzero(scores)
+        if not len(hits):
+            return []
+        order = hits[np.argsort(-scores[hits], kind="stable")][:top_k]
+        return [(int(i), float(scores[i])) for i in order]
+
+
+class HybridRetriever(BaseRetriever):
+
+    def __init__(self, index, top_k=RETRIEVAL_TOP_K, mode=RETRIEVAL_MODE, rrf_k=RRF_K,
+                 keyword_max_df_ratio=KEYWORD_MAX_DF_RATIO, keyword_min_passages=KEYWORD_MIN_PASSAGES,
+                 keyword_shortcut=KEYWORD_SHORTCUT):
+        if mode not in ("hybrid", "dense", "sparse"):
+            raise ValueError(f"Unknown RETRIEVAL_MODE: {mode}")
+        self.top_k = top_k
+        self.mode = mode
+        self.rrf_k = rrf_k
+        self.keyword_max_df_ratio = keyword_max_df_ratio
+        self.keyword_min_passages = keyword_min_passages
+        self.keyword_shortcut = keyword_shortcut
+
+        self._dense = index.as_retriever(similarity_top_k=top_k)
+        self.bm25 = BM25Index(index.docstore.docs.values())
+        super().__init__()
+
+    # -----------------------------------------------------------
+    # Individual rankings
+    # -----------------------------------------------------------
+    def sparse(self, query_str, top_k=None):
+        hits = self.bm25.search(query_str, top_k or self.top_k)
+        return [NodeWithScore(node=self.bm25.nodes[i], score=s) for i, s in hits]
+
+    def dense(self, query_bundle):
+        return self._dense.retrieve(query_bundle)
+
+    def keyword_only(self, query_str):
+        """
+        (BM25 ranking, confident). When `confident` the query is a
+        keyword lookup the ranking answers on its own; otherwise pass
+        the ranking to retrieve_with() so BM25 does not run twice. The
+        ranking is empty in dense mode, which never uses it.
+        """
+        if self.mode == "dense":
+            return [], False
+        terms = set(tokenize(query_str))
+        hits = self.bm25.search(query_str, self.top_k, terms)
+        ranking = [NodeWithScore(node=self.bm25.nodes[i], score=s) for i, s in hits]
+        if (not self.keyword_shortcut or not terms or not hits
+                or self.bm25.passages < max(1, self.keyword_min_passages)):
+            return ranking, False
+
+        covered = terms <= self.bm25.node_terms[hits[0][0]]
+        max_df = max(1, int(self.keyword_max_df_ratio * self.bm25.passages))
+        rare = any(self.bm25.passage_frequency(t) <= max_df for t in terms)
+        return ranking, covered and rare
+
+    # -----------------------------------------------------------
+    # Fusion
+    # -----------------------------------------------------------
+    def fuse(self, *rankings):
+        scores, nodes = defaultdict(float), {}
+        for ranking in rankings:
+            for rank, hit in enumerate(ranking):
+                node_id = hit.node.node_id
+                scores[node_id] += 1.0 / (self.rrf_k + rank + 1)
+                nodes[node_id] = hit.node
+        best = sorted(scores, key=scores.get, reverse=True)[:self.top_k]
+        return [NodeWithScore(node=nodes[node_id], score=scores[node_id]) for node_id in best]
+
+    def retrieve_with(self, query_bundle: QueryBundle, sparse_hits):
+        """retrieve(), reusing the BM25 ranking keyword_only() returned."""
+        if self.mode == "sparse":
+            return sparse_hits
+        if self.mode == "dense":
+            return self.dense(query_bundle)
+        return self.fuse(self.dense(query_bundle), sparse_hits)
+
+    def _retrieve(self, query_bundle: QueryBundle):
+        if self.mode == "dense":
+            return self.dense(query_bundle)
+        return self.retrieve_with(query_bundle, self.sparse(query_bundle.query_str))
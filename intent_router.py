@@ -0,0 +1,178 @@
+# ===============================================================
+# intent_router.py – One-pass, table-driven intent classification
+# ===============================================================
+#
+# Every keyword list the chatbot routes on (greetings, SCCSE words,
+# off-topic patterns, notes commands, event and team triggers...) is
+# compiled once into a single Aho–Corasick automaton. One scan over the
+# lowercased message returns every intent whose trigger occurs in it,
+# so adding a trigger never adds another linear scan.
+
+from collections import deque
+
+# How a trigger has to sit in the message to count
+CONTAINS = "contains"        # anywhere                     (x in msg)
+PREFIX = "prefix"            # at the start                 (msg.startswith(x))
+WORD_PREFIX = "word_prefix"  # whole message or first words (msg == x or msg.startswith(x + " "))
+
+
+class AhoCorasick:
+    """Multi-pattern substring matcher (all overlapping matches)."""
+
+    def __init__(self, patterns):
+        # patterns: iterable of (pattern, payload)
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+
+        for pattern, payload in patterns:
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append((len(pattern), payload))
+
+        # Breadth-first failure links; each state inherits the outputs of
+        # its failure state so a scan never has to walk the chain.
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def iter_matches(self, text):
+        """Yields (start, end, payload) for every occurrence."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length, payload in out[state]:
+                yield i + 1 - length, i + 1, payload
+
+
+class IntentRouter:
+    """
+    Built from a table of (intent, mode, triggers). route(text) returns
+    the set of intents triggered by `text` (already lowercased/stripped).
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self._automaton = AhoCorasick(
+            (trigger, (intent, mode))
+            for intent, mode, triggers in table
+            for trigger in triggers
+        )
+
+    def route(self, text):
+        intents = set()
+        n = len(text)
+        for start, end, (intent, mode) in self._automaton.iter_matches(text):
+            if intent in intents:
+                continue
+            if mode == CONTAINS:
+                intents.add(intent)
+            elif start == 0 and (mode == PREFIX or end == n or text[end] == " "):
+                intents.add(intent)
+        return intents
+
+
+# ---------------------------------------------------------------
+# SCCSE routing table
+# ---------------------------------------------------------------
+GREETINGS = ['hi', 'hello', 'hey', 'good morning', 'good afternoon', 'good evening',
+             'how are you', 'what\'s up', 'whats up', 'sup', 'yo', 'greetings',
+             'thank you', 'thanks', 'bye', 'goodbye', 'see you', 'ok', 'okay',
+             'yes', 'no', 'sure', 'alright', 'cool', 'nice', 'great']
+
+SCCSE_KEYWORDS = ['sccse', 'team', 'teams', 'event', 'events', 'member', 'members',
+                  'join', 'chapter', 'activity', 'activities', 'club']
+
+OFF_TOPIC_PATTERNS = [
+    'what is python', 'what is dsa', 'what is java', 'what is ai',
+    'how to learn', 'explain', 'who is the founder', 'who founded',
+    'what is nasa', 'what is machine learning', 'what is programming',
+    'how do i code', 'teach me', 'tutorial', 'solve this problem',
+    'what is 2+2', 'calculate', 'what is the capital', 'who is president',
+    'what is variable', 'what is function', 'what is algorithm',
+    'debug this', 'fix my code', 'what is recursion', 'what is oop',
+    'write a program', 'write code', 'help me code'
+]
+
+SINGLE_WORD_TECH = ['python', 'java', 'dsa', 'nasa', 'algorithm', 'variable',
+                    'recursion', 'oop', 'debugging', 'malloc', 'pointer', 'coding']
+
+EVENT_KEYWORDS = ['event', 'evnt', 'upcoming', 'schedule', 'when is', 'tournament', 'competition']
+
+TEAM_TRIGGERS = [
+    "which team should i join",
+    "what team should i join",
+    "suggest a team",
+    "which sccse team",
+    "best team for me",
+    "where should i join",
+    "team should i join",  # Catches typos like "wchisch team should i join"
+    "recommend a team",
+    "which team",
+    "what team"
+]
+
+SCCSE_INTENTS = [
+    ("greeting",       WORD_PREFIX, GREETINGS),
+    ("sccse",          CONTAINS,    SCCSE_KEYWORDS),
+    ("off_topic",      CONTAINS,    OFF_TOPIC_PATTERNS),
+    ("tech_word",      CONTAINS,    SINGLE_WORD_TECH),
+    ("ask_name",       CONTAINS,    ["what is my name"]),
+    ("save_note",      PREFIX,      ["note that"]),
+    ("delete_notes",   CONTAINS,    ["delete notes.txt", "clear notes"]),
+    ("skill_origin",   CONTAINS,    ["how do you know", "how did you know"]),
+    ("event",          CONTAINS,    EVENT_KEYWORDS),
+    ("team_recommend", CONTAINS,    TEAM_TRIGGERS),
+]
+
+
+def build_sccse_router():
+    return IntentRouter(SCCSE_INTENTS)
+
+
+def off_topic_by_rules(query_lower, intents):
+    """
+    The code-level off-topic rules over one message's intents. The chat
+    path refuses what this flags before it counts skills, and chat_db's
+    skill backfill skips the same messages.
+    """
+    # Allow greetings and casual chat
+    if "greeting" in intents:
+        return False
+
+    # Allow very short queries (likely greetings or follow-ups)
+    if len(query_lower) <= 10 and '?' not in query_lower:
+        return False
+
+    # Whitelist: If query mentions SCCSE, it's on-topic
+    if "sccse" in intents:
+        return False
+
+    # Blacklist: Common off-topic patterns
+    if "off_topic" in intents:
+        return True
+
+    # Additional check: Single-word technical queries (but not greetings)
+    words = query_lower.split()
+    if len(words) <= 2 and "tech_word" in intents:
+        return True
+
+    return False
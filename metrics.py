@@ -0,0 +1,269 @@
+# ===============================================================
+# metrics.py – Per-stage latency, counters and the /metrics page
+# ===============================================================
+#
+# A slow /chat can be spent in SQLite, the off-topic filter, embedding,
+# retrieval, the notes, or Groq. Each of those stages is wrapped in
+#
+#     with metrics.timer("retrieve"):
+#         ...
+#
+# (or @metrics.timed("db.save_message") on a helper). Every stage keeps
+# a count, a running sum and a window of its last METRICS_WINDOW
+# durations, from which p50/p95/p99 are computed when /metrics is read.
+# Counters (LLM tokens, turn outcomes, errors) are plain labelled sums.
+#
+# With METRICS_ENABLED=0 timer() hands back one shared no-op object and
+# timed() returns the function unchanged, so the hot path pays nothing.
+#
+# METRICS_TIMING_HEADER=1 also collects the stages of each request and
+# returns them in a Server-Timing header (see track_request()).
+
+import os
+import re
+import time
+import inspect
+import threading
+import functools
+import contextvars
+from collections import deque
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+METRICS_WINDOW = int(os.getenv("METRICS_WINDOW", "2048"))
+METRICS_TIMING_HEADER = os.getenv("METRICS_TIMING_HEADER", "0") == "1"
+
+PREFIX = "sccse"
+QUANTILES = (0.5, 0.95, 0.99)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_NAME_INVALID = re.compile(r"[^a-zA-Z0-9_]")
+
+# Stage durations of the request being served, when it is tracked
+_request_timings = contextvars.ContextVar("sccse_request_timings", default=None)
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_TIMER = _NoopTimer()
+
+
+class _Timer:
+    __slots__ = ("registry", "stage", "start")
+
+    def __init__(self, registry, stage):
+        self.registry = registry
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class StageSummary:
+    """Count, sum and a sliding window of durations for one stage."""
+    __slots__ = ("count", "total", "window")
+
+    def __init__(self, window=METRICS_WINDOW):
+        self.count = 0
+        self.total = 0.0
+        self.window = deque(maxlen=window)
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.window.append(seconds)
+
+    def quantiles(self, qs=QUANTILES):
+        values = sorted(self.window)
+        if not values:
+            return {q: 0.0 for q in qs}
+        # Nearest rank
+        return {q: values[min(len(values) - 1, int(q * len(values)))] for q in qs}
+
+
+class MetricsRegistry:
+
+    def __init__(self, enabled=METRICS_ENABLED, window=METRICS_WINDOW):
+        self.enabled = enabled
+        self.window = window
+        self._lock = threading.Lock()
+        self._stages = {}       # stage -> StageSummary
+        self._counters = {}     # (name, sorted label items) -> value
+
+    # -----------------------------------------------------------
+    # Recording (hot path)
+    # -----------------------------------------------------------
+    def observe(self, stage, seconds):
+        with self._lock:
+            summary = self._stages.get(stage)
+            if summary is None:
+                summary = self._stages[stage] = StageSummary(self.window)
+            summary.observe(seconds)
+
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + seconds
+
+    def timer(self, stage):
+        return _Timer(self, stage) if self.enabled else _NOOP_TIMER
+
+    def timed(self, stage):
+        """Decorator for functions and coroutines; returns `fn` itself when disabled."""
+        def decorator(fn):
+            if not self.enabled:
+                return fn
+
+            if inspect.iscoroutinefunction(fn):
+                @functools.wraps(fn)
+                async def async_wrapper(*args, **kwargs):
+                    start = time.perf_counter()
+                    try:
+                        return await fn(*args, **kwargs)
+                    finally:
+                        self.observe(stage, time.perf_counter() - start)
+                return async_wrapper
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.observe(stage, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    # -----------------------------------------------------------
+    # Reading
+    # -----------------------------------------------------------
+    def snapshot(self):
+        """{stage: {count, sum, p50, p95, p99}} in seconds."""
+        with self._lock:
+            stages = {
+                stage: (s.count, s.total, s.quantiles())
+                for stage, s in self._stages.items()
+            }
+        return {
+            stage: {"count": count, "sum": total,
+                    **{f"p{int(q * 100)}": v for q, v in quantiles.items()}}
+            for stage, (count, total, quantiles) in stages.items()
+        }
+
+    def render(self, gauges=None):
+        """
+        The Prometheus text exposition. `gauges` is a (nested) dict of
+        extra numbers, e.g. service_stats(); each numeric leaf becomes
+        a gauge named after its path.
+        """
+        with self._lock:
+            stages = [(stage, s.count, s.total, s.quantiles()) for stage, s in self._stages.items()]
+            counters = sorted(self._counters.items())
+
+        lines = []
+        name = f"{PREFIX}_stage_seconds"
+        lines.append(f"# HELP {name} Time spent per chat stage.")
+        lines.append(f"# TYPE {name} summary")
+        for stage, count, total, quantiles in sorted(stages):
+            label = _escape(stage)
+            for q, value in quantiles.items():
+                lines.append(f'{name}{{stage="{label}",quantile="{q}"}} {value:.6f}')
+            lines.append(f'{name}_sum{{stage="{label}"}} {total:.6f}')
+            lines.append(f'{name}_count{{stage="{label}"}} {count}')
+
+        declared = set()
+        for (counter, labels), value in counters:
+            full = f"{PREFIX}_{counter}"
+            if full not in declared:
+                declared.add(full)
+                lines.append(f"# TYPE {full} counter")
+            lines.append(f"{full}{_labels(labels)} {value}")
+
+        for path, value in _flatten(gauges or {}):
+            full = _NAME_INVALID.sub("_", f"{PREFIX}_{path}")
+            lines.append(f"# TYPE {full} gauge")
+            lines.append(f"{full} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(items):
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def _flatten(values, prefix=""):
+    for key, value in values.items():
+        path = f"{prefix}_{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            yield from _flatten(value, path)
+        elif isinstance(value, (int, float)):
+            yield path, float(value)
+
+
+# ---------------------------------------------------------------
+# Process-wide registry
+# ---------------------------------------------------------------
+registry = MetricsRegistry()
+
+timer = registry.timer
+timed = registry.timed
+inc = registry.inc
+observe = registry.observe
+
+
+# ---------------------------------------------------------------
+# Per-request timings (Server-Timing header)
+# ---------------------------------------------------------------
+def track_request():
+    """
+    Starts collecting the stages of the current request; returns a
+    token for end_request(). A no-op (None) unless METRICS_TIMING_HEADER
+    is on. Work handed to another thread only shows up if it runs in a
+    copy of this context (see chatbot_backend.run_blocking).
+    """
+    if not (registry.enabled and METRICS_TIMING_HEADER):
+        return None
+    return _request_timings.set({"_start": time.perf_counter()})
+
+
+def end_request(token):
+    """The Server-Timing header value for the request, or None."""
+    if token is None:
+        return None
+    timings = _request_timings.get()
+    try:
+        _request_timings.reset(token)
+    except ValueError:
+        # Ended from a different context than it was started in
+        _request_timings.set(None)
+    if not timings:
+        return None
+
+    total = time.perf_counter() - timings.pop("_start")
+    parts = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in timings.items()]
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
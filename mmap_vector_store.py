@@ -0,0 +1,166 @@
+# ===============================================================
+# mmap_vector_store.py – Memory-mapped NumPy vector store
+# ===============================================================
+#
+# Drop-in replacement for LlamaIndex's SimpleVectorStore (which
+# persists every float as JSON text and searches with a Python loop).
+# Embeddings are saved as one contiguous, L2-normalised float32 .npy
+# file opened with mmap, so loading is near-instant and zero-copy and
+# every worker process shares the same page cache. Node ids live in a
+# small JSON side table; node text stays in the docstore.
+#
+# Top-k search is one matrix-vector product plus argpartition.
+
+import os
+import json
+from typing import Any, List, Sequence
+import numpy as np
+from pydantic import PrivateAttr
+from util import unit_rows, unit_vector
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    VectorStoreQuery,
+    VectorStoreQueryResult,
+)
+
+DEFAULT_NAMESPACE = "default"
+
+
+def _paths(base):
+    return base + ".npy", base + ".ids.json"
+
+
+class MmapVectorStore(BasePydanticVectorStore):
+    """Vector store backed by a memory-mapped float32 matrix."""
+
+    stores_text: bool = False
+    is_embedding_query: bool = True
+
+    _matrix: Any = PrivateAttr(default=None)     # (n, dim), unit rows
+    _alive: Any = PrivateAttr(default=None)      # (n,) bool
+    _ids: List[str] = PrivateAttr(default_factory=list)
+    _ref_doc_ids: List[str] = PrivateAttr(default_factory=list)
+    _pending: List[Any] = PrivateAttr(default_factory=list)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "MmapVectorStore"
+
+    @property
+    def client(self) -> Any:
+        return None
+
+    # -----------------------------------------------------------
+    # Load / persist
+    # -----------------------------------------------------------
+    @classmethod
+    def from_persist_dir(cls, persist_dir, namespace=DEFAULT_NAMESPACE):
+        store = cls()
+        base = os.path.join(persist_dir, f"{namespace}__vector_store")
+        npy_path, ids_path = _paths(base)
+        if os.path.exists(npy_path) and os.path.exists(ids_path):
+            store._load(npy_path, ids_path)
+        return store
+
+    def _load(self, npy_path, ids_path):
+        with open(ids_path, "r", encoding="utf-8") as f:
+            table = json.load(f)
+        # An empty .npy can't be memory-mapped
+        self._matrix = np.load(npy_path, mmap_mode="r") if table["ids"] else None
+        self._alive = np.ones(len(table["ids"]), dtype=bool)
+        self._ids = table["ids"]
+        self._ref_doc_ids = table["ref_doc_ids"]
+        self._pending = []
+
+    def persist(self, persist_path: str, fs: Any = None) -> None:
+        """
+        `persist_path` is the "<namespace>__vector_store.json" path
+        StorageContext hands every store; we write .npy + .ids.json
+        next to it instead. Deleted rows are compacted away.
+        """
+        base = os.path.splitext(persist_path)[0]
+        npy_path, ids_path = _paths(base)
+
+        matrix = self._full_matrix()
+        keep = np.flatnonzero(self._alive) if self._alive is not None else np.arange(0)
+        dim = matrix.shape[1] if matrix is not None else 0
+        rows = (np.ascontiguousarray(matrix[keep], dtype=np.float32)
+                if matrix is not None else np.zeros((0, dim), dtype=np.float32))
+        table = {
+            "dim": dim,
+            "ids": [self._ids[i] for i in keep],
+            "ref_doc_ids": [self._ref_doc_ids[i] for i in keep],
+        }
+
+        with open(npy_path + ".tmp", "wb") as f:
+            np.save(f, rows)
+        with open(ids_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(table, f)
+        os.replace(npy_path + ".tmp", npy_path)
+        os.replace(ids_path + ".tmp", ids_path)
+
+        # Re-open the compacted file so we serve from the page cache again
+        self._load(npy_path, ids_path)
+
+    # -----------------------------------------------------------
+    # Writes
+    # -----------------------------------------------------------
+    def _full_matrix(self):
+        if self._pending:
+            parts = ([self._matrix] if self._matrix is not None else []) + self._pending
+            self._matrix = np.vstack(parts).astype(np.float32, copy=False)
+            self._pending = []
+        return self._matrix
+
+    def add(self, nodes: Sequence[BaseNode], **kwargs: Any) -> List[str]:
+        if not nodes:
+            return []
+
+        self._pending.append(unit_rows([node.get_embedding() for node in nodes]))
+
+        added = np.ones(len(nodes), dtype=bool)
+        self._alive = added if self._alive is None else np.concatenate([self._alive, added])
+        self._ids.extend(node.node_id for node in nodes)
+        self._ref_doc_ids.extend(node.ref_doc_id or "" for node in nodes)
+        return [node.node_id for node in nodes]
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        if self._alive is None:
+            return
+        for row, ref in enumerate(self._ref_doc_ids):
+            if ref == ref_doc_id:
+                self._alive[row] = False
+
+    # -----------------------------------------------------------
+    # Search
+    # -----------------------------------------------------------
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        if query.filters is not None:
+            raise NotImplementedError("MmapVectorStore does not support metadata filters")
+
+        matrix = self._full_matrix()
+        if matrix is None or not len(self._ids) or query.query_embedding is None:
+            return VectorStoreQueryResult(nodes=None, similarities=[], ids=[])
+
+        scores = matrix @ unit_vector(query.query_embedding)
+        mask = self._alive.copy()
+        if query.node_ids:
+            wanted = set(query.node_ids)
+            mask &= np.fromiter((i in wanted for i in self._ids), bool, len(self._ids))
+        if query.doc_ids:
+            wanted = set(query.doc_ids)
+            mask &= np.fromiter((r in wanted for r in self._ref_doc_ids), bool, len(self._ids))
+        scores = np.where(mask, scores, -np.inf)
+
+        k = min(query.similarity_top_k, int(mask.sum()))
+        if k <= 0:
+            return VectorStoreQueryResult(nodes=None, similarities=[], ids=[])
+
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return VectorStoreQueryResult(
+            nodes=None,
+            similarities=scores[top].tolist(),
+            ids=[self._ids[i] for i in top],
+        )
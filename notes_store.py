@@ -0,0 +1,135 @@
+# ===============================================================
+# notes_store.py – Cached, change-aware view of the notes table
+# ===============================================================
+#
+# notes.txt used to be re-read on every event query and pasted whole
+# into every RAG prompt, so each note ever added made every later
+# prompt longer. Notes are now rows of chat_db's notes table (who added
+# them, when, and the text). The store keeps them in memory and only
+# re-reads the table when its version (row count, newest id) changes,
+# whichever worker wrote. Checking the version is one small query.
+#
+# select() picks the notes for one prompt: top-k by embedding
+# similarity to the query (or newest first) within a token budget.
+
+import os
+import hashlib
+import threading
+import numpy as np
+from llama_index.core import Settings
+from chat_db import save_note, get_notes, get_notes_version, delete_notes
+from util import unit_rows, unit_vector
+
+NOTES_TOP_K = int(os.getenv("NOTES_TOP_K", "5"))
+NOTES_TOKEN_BUDGET = int(os.getenv("NOTES_TOKEN_BUDGET", "300"))
+
+
+class Note:
+    __slots__ = ("id", "user_id", "text", "created_at")
+
+    def __init__(self, id, user_id, text, created_at):
+        self.id = id
+        self.user_id = user_id
+        self.text = text
+        self.created_at = created_at    # "YYYY-MM-DD HH:MM:SS" UTC, None for some imported notes
+
+
+class NotesStore:
+
+    def __init__(self, embed_batch_fn=None, count_tokens=None):
+        self.embed_batch_fn = embed_batch_fn
+        self.count_tokens = count_tokens or (lambda text: len(Settings.tokenizer(text)))
+
+        self._lock = threading.Lock()
+        self._version = None
+        self._notes = []
+        self._vectors = {}      # note text -> unit float32 vector
+        self._matrix = None     # stacked vectors of self._notes, built on demand
+        self.reloads = 0
+
+    # -----------------------------------------------------------
+    # Reading
+    # -----------------------------------------------------------
+    def version(self):
+        """Changes whenever a note is added or the notes are cleared."""
+        return get_notes_version()
+
+    def _refresh_locked(self):
+        version = get_notes_version()
+        if version == self._version:
+            return
+        self._notes = [Note(*row) for row in get_notes()]
+        self._matrix = None
+        self._version = version
+        self.reloads += 1
+
+        # Only keep vectors for notes that still exist
+        alive = {note.text for note in self._notes}
+        self._vectors = {t: v for t, v in self._vectors.items() if t in alive}
+
+    def entries(self):
+        with self._lock:
+            self._refresh_locked()
+            return list(self._notes)
+
+    def digest(self):
+        """SHA-256 of the note texts, for fingerprints of what answers depend on."""
+        h = hashlib.sha256()
+        for note in self.entries():
+            h.update(note.text.encode("utf-8") + b"\n")
+        return h.hexdigest()
+
+    # -----------------------------------------------------------
+    # Writing
+    # -----------------------------------------------------------
+    def append(self, text, user_id=None):
+        save_note(user_id, " ".join(text.split()))
+
+    def clear(self):
+        delete_notes()
+
+    # -----------------------------------------------------------
+    # Prompt selection
+    # -----------------------------------------------------------
+    def _embed_missing_locked(self, notes):
+        missing = [note.text for note in notes if note.text not in self._vectors]
+        if missing:
+            for text, vector in zip(missing, unit_rows(self.embed_batch_fn(missing))):
+                self._vectors[text] = vector
+
+    def select(self, query_embedding=None, k=NOTES_TOP_K, token_budget=NOTES_TOKEN_BUDGET,
+               by="similarity"):
+        """
+        Up to `k` notes for one prompt, oldest first. Ranked by cosine
+        similarity to `query_embedding` when both it and an embedder are
+        available (and `by` is "similarity"), otherwise newest first.
+        """
+        with self._lock:
+            self._refresh_locked()
+            notes = list(self._notes)
+            if not notes:
+                return []
+
+            if by == "similarity" and query_embedding is not None and self.embed_batch_fn:
+                if self._matrix is None:
+                    self._embed_missing_locked(notes)
+                    self._matrix = np.vstack([self._vectors[note.text] for note in notes])
+                q = unit_vector(query_embedding)
+                order = np.argsort(-(self._matrix @ q), kind="stable")
+                ranked = [notes[i] for i in order]
+            else:
+                ranked = notes[::-1]
+
+        chosen, used = [], 0
+        for note in ranked:
+            if len(chosen) == k:
+                break
+            tokens = self.count_tokens(note.text)
+            if used + tokens > token_budget:
+                continue
+            chosen.append(note)
+            used += tokens
+        return sorted(chosen, key=lambda note: note.id)
+
+    def render(self, notes):
+        return "\n".join(f"- {note.text}" for note in notes)
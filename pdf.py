@@ -1,27 +1,160 @@
 import os
+import json
+import hashlib
+from pathlib import Path
 from llama_index.core import VectorStoreIndex, StorageContext, load_index_from_storage
+from llama_index.readers.file import PDFReader
+from mmap_vector_store import MmapVectorStore
+from util import file_sha256
 
-def get_index(pages, name, embed_model=None):
+MANIFEST_FILE = "manifest.json"
+
+# "mmap" (memory-mapped float32 .npy) or "simple" (LlamaIndex JSON store)
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "mmap")
+
+
+# ---------------------------------------------------------------
+# Content hashing
+# ---------------------------------------------------------------
+def load_pdf_pages(path):
     """
-    Creates or loads a vector index for the given PDF pages.
-    Automatically uses the provided embedding model (HuggingFace, etc.).
+    Parses one PDF into per-page Documents with content-addressed ids
+    ("<file>:<sha256 of page text>"), so an unchanged page keeps its id
+    wherever it moves and a changed page gets a new one.
+    """
+    file_name = os.path.basename(path)
+    pages, seen = [], set()
+    for page in PDFReader().load_data(file=Path(path)):
+        digest = hashlib.sha256(page.text.encode("utf-8")).hexdigest()[:32]
+        page.id_ = f"{file_name}:{digest}"
+        if page.id_ not in seen:
+            seen.add(page.id_)
+            pages.append(page)
+    return pages
+
+
+def _read_manifest(storage_dir):
+    try:
+        with open(os.path.join(storage_dir, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"files": {}}
+
+
+def _write_manifest(storage_dir, manifest):
+    tmp = os.path.join(storage_dir, MANIFEST_FILE + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(storage_dir, MANIFEST_FILE))
+
+
+# ---------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------
+def _storage_context(storage_dir, persisted):
+    vector_store = None
+    if VECTOR_STORE_BACKEND == "mmap":
+        vector_store = MmapVectorStore.from_persist_dir(storage_dir)
+
+    if persisted:
+        return StorageContext.from_defaults(persist_dir=storage_dir, vector_store=vector_store)
+    return StorageContext.from_defaults(vector_store=vector_store)
+
+
+def get_index(data_dir, name, embed_model=None):
+    """
+    Creates, loads or incrementally updates the vector index for every
+    PDF in `data_dir`. Automatically uses the provided embedding model
+    (HuggingFace, etc.).
+
+    Each page is stored as a document whose id is its content hash. On
+    load only added or changed pages are embedded and upserted, and
+    pages that disappeared are deleted from the docstore and vector
+    store. PDFs whose size/mtime (or, failing that, sha256) match the
+    manifest are not parsed at all.
     """
     try:
         storage_dir = f"./storage/{name}"
         os.makedirs(storage_dir, exist_ok=True)
 
-        if os.path.exists(os.path.join(storage_dir, "docstore.json")):
+        manifest = _read_manifest(storage_dir)
+        old_files = manifest.get("files", {})
+        pdf_paths = sorted(
+            os.path.join(data_dir, f) for f in os.listdir(data_dir)
+            if f.lower().endswith(".pdf")
+        )
+
+        has_index = os.path.exists(os.path.join(storage_dir, "docstore.json"))
+
+        # Vectors saved by another backend can't be reused: rebuild once
+        if has_index and manifest.get("vector_store", "simple") != VECTOR_STORE_BACKEND:
+            print(f"🔁 Vector store backend is now '{VECTOR_STORE_BACKEND}', rebuilding: {name}")
+            has_index = False
+            for stale in ("default__vector_store.json", "default__vector_store.npy",
+                          "default__vector_store.ids.json"):
+                if os.path.exists(os.path.join(storage_dir, stale)):
+                    os.remove(os.path.join(storage_dir, stale))
+
+        if has_index:
+            storage_context = _storage_context(storage_dir, persisted=True)
+            index = load_index_from_storage(storage_context, embed_model=embed_model)
+            existing_ids = set(index.ref_doc_info.keys())
+        else:
+            index = None
+            existing_ids = set()
+
+        # Work out which files need parsing
+        files, new_pages = {}, []
+        for path in pdf_paths:
+            file_name = os.path.basename(path)
+            st = os.stat(path)
+            entry = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+            old = old_files.get(file_name)
+
+            if old and (old["size"], old["mtime_ns"]) == (entry["size"], entry["mtime_ns"]):
+                entry["sha256"] = old["sha256"]
+            else:
+                entry["sha256"] = file_sha256(path)
+
+            unchanged = (
+                old is not None
+                and old["sha256"] == entry["sha256"]
+                and existing_ids.issuperset(old["doc_ids"])
+            )
+            if unchanged:
+                entry["doc_ids"] = old["doc_ids"]
+            else:
+                print(f"📄 Parsing {file_name}")
+                pages = load_pdf_pages(path)
+                entry["doc_ids"] = [p.id_ for p in pages]
+                new_pages.extend(p for p in pages if p.id_ not in existing_ids)
+            files[file_name] = entry
+
+        wanted_ids = {doc_id for entry in files.values() for doc_id in entry["doc_ids"]}
+        stale_ids = existing_ids - wanted_ids
+
+        if index is not None and not new_pages and not stale_ids:
             print(f"📦 Loading existing index: {name}")
-            storage_context = StorageContext.from_defaults(persist_dir=storage_dir)
-            return load_index_from_storage(storage_context)
+            if files != old_files:
+                _write_manifest(storage_dir, {"vector_store": VECTOR_STORE_BACKEND, "files": files})
+            return index
+
+        if index is None:
+            print(f"⚙️ Creating new index for: {name}")
+            index = VectorStoreIndex.from_documents(
+                new_pages, embed_model=embed_model,
+                storage_context=_storage_context(storage_dir, persisted=False),
+            )
+        else:
+            print(f"🔄 Updating index {name}: +{len(new_pages)} pages, -{len(stale_ids)} pages")
+            for doc_id in stale_ids:
+                index.delete_ref_doc(doc_id, delete_from_docstore=True)
+            for page in new_pages:
+                index.insert(page)
 
-        print(f"⚙️ Creating new index for: {name}")
-        index = VectorStoreIndex.from_documents(
-            pages, embed_model=embed_model
-        )
-        
         index.storage_context.persist(persist_dir=storage_dir)
-        print(f"✅ Index created and saved for: {name}")
+        _write_manifest(storage_dir, {"vector_store": VECTOR_STORE_BACKEND, "files": files})
+        print(f"✅ Index saved for: {name}")
         return index
 
     except Exception as e:
@@ -0,0 +1,121 @@
+# ===============================================================
+# prompt_builder.py – Token-budgeted RAG prompt assembly
+# ===============================================================
+#
+# The RAG prompt used to paste `node.text[:500]` from every retrieved
+# chunk: cuts landed mid-sentence, the chunk overlap from the splitter
+# was sent twice, and nothing bounded the total. The builder instead
+#
+#   * splits chunks into sentences/lines and drops ones already used,
+#   * takes chunks in retrieval-score order, whole sentences only,
+#     each chunk capped at `chunk_tokens`,
+#   * stops at `context_tokens`, or earlier if the whole prompt would
+#     exceed `max_tokens`,
+#
+# counting with the same tokenizer LlamaIndex uses (Settings.tokenizer).
+# The template is parsed and its static text tokenized once.
+
+import os
+import re
+import logging
+from string import Formatter
+from llama_index.core import Settings
+
+PROMPT_MAX_TOKENS = int(os.getenv("PROMPT_MAX_TOKENS", "1500"))
+PROMPT_CONTEXT_TOKENS = int(os.getenv("PROMPT_CONTEXT_TOKENS", "300"))
+PROMPT_CHUNK_TOKENS = int(os.getenv("PROMPT_CHUNK_TOKENS", "150"))
+
+logger = logging.getLogger("sccse")
+
+# Sentence ends, or a line break before something that starts a new
+# line of its own (capital, digit, bullet, heading rule). PDF text is
+# hard-wrapped, so other line breaks are just spaces.
+_UNIT_SPLIT = re.compile(r"(?<=[.!?:])(?<!\d\.)\s+|\n(?=[A-Z0-9\-•*=#])")
+_HAS_WORD = re.compile(r"\w")
+
+# Short units ("Convenor:", "2023-2024:") repeat legitimately; only
+# longer ones are treated as chunk overlap
+_MIN_DEDUP_WORDS = 4
+
+
+def split_units(text):
+    units = []
+    for unit in _UNIT_SPLIT.split(text):
+        unit = " ".join(unit.split())
+        if _HAS_WORD.search(unit):
+            units.append(unit)
+    return units
+
+
+class PromptBuilder:
+
+    def __init__(self, template, count_tokens=None, max_tokens=PROMPT_MAX_TOKENS,
+                 context_tokens=PROMPT_CONTEXT_TOKENS, chunk_tokens=PROMPT_CHUNK_TOKENS):
+        self.template = template
+        self.count_tokens = count_tokens or (lambda text: len(Settings.tokenizer(text)))
+        self.max_tokens = max_tokens
+        self.context_tokens = context_tokens
+        self.chunk_tokens = chunk_tokens
+
+        # Literal segments + field names, parsed once
+        self._parts = [(literal, field) for literal, field, _, _ in Formatter().parse(template)]
+        self._static_tokens = self.count_tokens("".join(literal for literal, _ in self._parts))
+
+    def _render(self, values):
+        return "".join(literal + (values[field] if field else "") for literal, field in self._parts)
+
+    def select_context(self, nodes, budget):
+        """
+        Text from `nodes` (NodeWithScore, best first by score) within
+        `budget` tokens. Returns (text, tokens used, units dropped).
+        """
+        ranked = sorted(nodes, key=lambda n: n.score if n.score is not None else 0.0, reverse=True)
+        seen, blocks = set(), []
+        used = dropped = 0
+
+        for node in ranked:
+            lines, chunk_used = [], 0
+            units = split_units(node.get_content())
+            for i, unit in enumerate(units):
+                key = unit.lower() if len(unit.split()) >= _MIN_DEDUP_WORDS else None
+                if key in seen:
+                    continue
+                tokens = self.count_tokens(unit)
+                if chunk_used + tokens > self.chunk_tokens or used + tokens > budget:
+                    # Trim the chunk here, at a sentence boundary
+                    dropped += len(units) - i
+                    break
+                if key:
+                    seen.add(key)
+                lines.append(unit)
+                chunk_used += tokens
+                used += tokens
+            if lines:
+                blocks.append("\n".join(lines))
+
+        return "\n\n".join(blocks), used, dropped
+
+    def build(self, nodes, context_field="pdf_context", **fields):
+        """
+        Fill the template and return (prompt, token report). `fields` are
+        the fixed values (query, notes...); `context_field` gets the
+        retrieved context.
+        """
+        fixed_tokens = self._static_tokens + sum(self.count_tokens(v) for v in fields.values())
+        budget = max(0, min(self.context_tokens, self.max_tokens - fixed_tokens))
+
+        context, context_used, dropped = self.select_context(nodes, budget)
+        prompt = self._render({**fields, context_field: context})
+
+        report = {
+            "total": self.count_tokens(prompt),
+            "static": self._static_tokens,
+            "fixed": fixed_tokens - self._static_tokens,
+            "context": context_used,
+            "dropped_units": dropped,
+        }
+        logger.info(
+            "🧮 Prompt tokens: {total} (static {static}, query+notes {fixed}, "
+            "context {context}, dropped {dropped_units} units)".format(**report)
+        )
+        return prompt, report
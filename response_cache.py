@@ -0,0 +1,144 @@
+# ===============================================================
+# response_cache.py – Semantic cache for RAG answers
+# ===============================================================
+#
+# Students ask the same SCCSE questions with slightly different
+# wording. Answers from the RAG branch are cached against the query
+# embedding; a new query whose cosine similarity to a cached one is
+# above the threshold is answered from the cache.
+#
+# Event answers depend on the notes, so the whole cache is dropped
+# whenever the watched version (see NotesStore.version) changes.
+
+import os
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+from util import unit_vector
+
+CACHE_THRESHOLD = float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.92"))
+CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512"))
+CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+
+
+class SemanticResponseCache:
+    """
+    LRU + TTL cache of (query embedding -> answer).
+
+    Vectors live in one preallocated float32 matrix so a lookup is a
+    single matrix-vector product over every slot.
+    """
+
+    def __init__(self, threshold=CACHE_THRESHOLD, max_entries=CACHE_MAX_ENTRIES,
+                 ttl=CACHE_TTL_SECONDS, watch_fn=None):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.watch_fn = watch_fn
+
+        self._lock = threading.Lock()
+        self._matrix = None                 # (max_entries, dim), unit rows
+        self._valid = np.zeros(max_entries, dtype=bool)
+        self._entries = OrderedDict()       # slot -> (answer, created_at)
+        self._free = list(range(max_entries - 1, -1, -1))
+        self._generation = 0
+        self._watch_sig = watch_fn() if watch_fn else None
+
+        self.hits = 0
+        self.misses = 0
+
+    # -----------------------------------------------------------
+    # Invalidation
+    # -----------------------------------------------------------
+    def invalidate(self):
+        with self._lock:
+            self._clear_locked()
+
+    def _clear_locked(self):
+        self._valid[:] = False
+        self._entries.clear()
+        self._free = list(range(self.max_entries - 1, -1, -1))
+        self._generation += 1
+
+    def _check_watch_locked(self):
+        if not self.watch_fn:
+            return
+        sig = self.watch_fn()
+        if sig != self._watch_sig:
+            self._watch_sig = sig
+            self._clear_locked()
+
+    def _drop_slot_locked(self, slot):
+        self._valid[slot] = False
+        del self._entries[slot]
+        self._free.append(slot)
+
+    # -----------------------------------------------------------
+    # Lookup / store
+    # -----------------------------------------------------------
+    def lookup(self, vector):
+        """
+        Returns (answer, ticket). `answer` is None on a miss; pass the
+        ticket to store() once the answer has been generated.
+        """
+        q = unit_vector(vector)
+
+        with self._lock:
+            self._check_watch_locked()
+            ticket = (q, self._generation)
+
+            if self._matrix is None or not self._entries:
+                self.misses += 1
+                return None, ticket
+
+            now = time.time()
+            scores = self._matrix @ q
+            scores[~self._valid] = -1.0
+
+            while True:
+                slot = int(np.argmax(scores))
+                if scores[slot] < self.threshold:
+                    self.misses += 1
+                    return None, ticket
+
+                answer, created_at = self._entries[slot]
+                if now - created_at > self.ttl:
+                    self._drop_slot_locked(slot)
+                    scores[slot] = -1.0
+                    continue
+
+                self._entries.move_to_end(slot)
+                self.hits += 1
+                return answer, ticket
+
+    def store(self, ticket, answer):
+        q, generation = ticket
+
+        with self._lock:
+            # Notes changed while this answer was being generated
+            if generation != self._generation:
+                return
+
+            if self._matrix is None:
+                self._matrix = np.zeros((self.max_entries, q.shape[0]), dtype=np.float32)
+
+            if not self._free:
+                oldest = next(iter(self._entries))
+                self._drop_slot_locked(oldest)
+
+            slot = self._free.pop()
+            self._matrix[slot] = q
+            self._valid[slot] = True
+            self._entries[slot] = (answer, time.time())
+
+    def stats(self):
+        with self._lock:
+            size = len(self._entries)
+        lookups = self.hits + self.misses
+        return {
+            "entries": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
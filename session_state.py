@@ -0,0 +1,176 @@
+# ===============================================================
+# session_state.py – Per-user conversation state (pending actions)
+# ===============================================================
+#
+# "note that ..." and "delete notes" park an action until the user
+# sends the passkey. That state belongs to one user, must survive the
+# next request landing on another thread or worker, and must be
+# consumed exactly once. Values are stored per (user_id, key) with an
+# expiry, and every transition is a compare-and-set so two concurrent
+# requests can never both act on the same pending action.
+#
+# Backends:
+#   memory – dict + lock, one process only (default)
+#   sqlite – session_state table next to the chat history, shared by
+#            every worker on the host
+
+import os
+import json
+import time
+import threading
+import chat_db
+from storage import connect
+
+SESSION_STATE_BACKEND = os.getenv("SESSION_STATE_BACKEND", "memory")
+SESSION_STATE_TTL = float(os.getenv("SESSION_STATE_TTL", "600"))
+
+
+def _encode(value):
+    return None if value is None else json.dumps(value, sort_keys=True)
+
+
+def _decode(raw):
+    return None if raw is None else json.loads(raw)
+
+
+class MemorySessionState:
+
+    def __init__(self, ttl=SESSION_STATE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._values = {}       # (user_id, key) -> (encoded value, expires_at)
+
+    def _get_locked(self, item, now):
+        entry = self._values.get(item)
+        if entry is None:
+            return None
+        if entry[1] <= now:
+            del self._values[item]
+            return None
+        return entry[0]
+
+    def _purge_locked(self, now):
+        # Like the sqlite PURGE: users who never come back to confirm
+        # would otherwise keep their parked action forever
+        expired = [item for item, (_, expires_at) in self._values.items() if expires_at <= now]
+        for item in expired:
+            del self._values[item]
+
+    def get(self, user_id, key):
+        with self._lock:
+            return _decode(self._get_locked((user_id, key), time.time()))
+
+    def set(self, user_id, key, value, ttl=None):
+        now = time.time()
+        with self._lock:
+            self._purge_locked(now)
+            if value is None:
+                self._values.pop((user_id, key), None)
+            else:
+                self._values[(user_id, key)] = (_encode(value), now + (ttl or self.ttl))
+
+    def compare_and_set(self, user_id, key, expected, value, ttl=None):
+        """Set `value` (None deletes) only if the current value is `expected`."""
+        now = time.time()
+        item = (user_id, key)
+        with self._lock:
+            if self._get_locked(item, now) != _encode(expected):
+                return False
+            self._purge_locked(now)
+            if value is None:
+                self._values.pop(item, None)
+            else:
+                self._values[item] = (_encode(value), now + (ttl or self.ttl))
+            return True
+
+
+class SQLiteSessionState:
+
+    CREATE_TABLE = """
+        CREATE TABLE IF NOT EXISTS session_state (
+            user_id TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            PRIMARY KEY (user_id, key)
+        )
+    """
+    SELECT = """
+        SELECT value FROM session_state
+        WHERE user_id = ? AND key = ? AND expires_at > ?
+    """
+    UPSERT = """
+        INSERT INTO session_state (user_id, key, value, expires_at) VALUES (?, ?, ?, ?)
+        ON CONFLICT (user_id, key) DO UPDATE
+        SET value = excluded.value, expires_at = excluded.expires_at
+    """
+    DELETE = "DELETE FROM session_state WHERE user_id = ? AND key = ?"
+    # Insert only if absent (or expired)
+    CAS_CREATE = """
+        INSERT INTO session_state (user_id, key, value, expires_at) VALUES (?, ?, ?, ?)
+        ON CONFLICT (user_id, key) DO UPDATE
+        SET value = excluded.value, expires_at = excluded.expires_at
+        WHERE session_state.expires_at <= ?
+    """
+    CAS_UPDATE = """
+        UPDATE session_state SET value = ?, expires_at = ?
+        WHERE user_id = ? AND key = ? AND value = ? AND expires_at > ?
+    """
+    CAS_DELETE = """
+        DELETE FROM session_state
+        WHERE user_id = ? AND key = ? AND value = ? AND expires_at > ?
+    """
+    PURGE = "DELETE FROM session_state WHERE expires_at <= ?"
+
+    def __init__(self, ttl=SESSION_STATE_TTL, db_path=None):
+        self.ttl = ttl
+        self.db_path = db_path
+        self._ready_for = None
+
+    def _connect(self):
+        # Resolved per call so tests can point chat_db.DB_PATH elsewhere
+        path = self.db_path or chat_db.DB_PATH
+        if self._ready_for != path:
+            with connect(path) as conn:
+                conn.execute(self.CREATE_TABLE)
+            self._ready_for = path
+        return connect(path)
+
+    def get(self, user_id, key):
+        with self._connect() as conn:
+            row = conn.execute(self.SELECT, (user_id, key, time.time())).fetchone()
+        return _decode(row[0]) if row else None
+
+    def set(self, user_id, key, value, ttl=None):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(self.PURGE, (now,))
+            if value is None:
+                conn.execute(self.DELETE, (user_id, key))
+            else:
+                conn.execute(self.UPSERT, (user_id, key, _encode(value), now + (ttl or self.ttl)))
+
+    def compare_and_set(self, user_id, key, expected, value, ttl=None):
+        """Set `value` (None deletes) only if the current value is `expected`."""
+        if expected is None and value is None:
+            return self.get(user_id, key) is None
+
+        now = time.time()
+        expires_at = now + (ttl or self.ttl)
+        with self._connect() as conn:
+            if expected is None:
+                cur = conn.execute(self.CAS_CREATE, (user_id, key, _encode(value), expires_at, now))
+            elif value is None:
+                cur = conn.execute(self.CAS_DELETE, (user_id, key, _encode(expected), now))
+            else:
+                cur = conn.execute(self.CAS_UPDATE, (_encode(value), expires_at, user_id, key,
+                                                     _encode(expected), now))
+            return cur.rowcount == 1
+
+
+def make_session_state(backend=SESSION_STATE_BACKEND):
+    if backend == "sqlite":
+        return SQLiteSessionState()
+    if backend == "memory":
+        return MemorySessionState()
+    raise ValueError(f"Unknown SESSION_STATE_BACKEND: {backend}")
@@ -0,0 +1,283 @@
+# ===============================================================
+# singleflight.py – One upstream call per identical in-flight prompt
+# ===============================================================
+#
+# After an announcement dozens of students ask the same question within
+# seconds. Each turn builds the same RAG prompt and, before this, sent
+# its own completion to Groq. Calls are now keyed by a hash of the
+# prompt: the first caller (the leader) makes the upstream call and
+# every caller that arrives while it is in flight waits for and shares
+# its result, or its exception. Nothing is kept once the call lands;
+# that is the response cache's job.
+#
+# Streams are shared too: followers replay the chunks published so far
+# and then follow the live stream. If the leader's client disconnects,
+# the stream keeps draining for any followers.
+
+import os
+import asyncio
+import hashlib
+import threading
+
+LLM_SINGLEFLIGHT = os.getenv("LLM_SINGLEFLIGHT", "1") == "1"
+
+
+def prompt_key(prompt):
+    """Whitespace-insensitive hash of a prompt."""
+    return hashlib.sha256(" ".join(prompt.split()).encode("utf-8")).hexdigest()
+
+
+class _Abandoned(RuntimeError):
+    """The leader's caller stopped reading and nobody else was waiting."""
+
+
+# ---------------------------------------------------------------
+# Threads (Flask path)
+# ---------------------------------------------------------------
+class _Flight:
+    __slots__ = ("cond", "chunks", "result", "error", "done", "followers")
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.chunks = []
+        self.result = None
+        self.error = None
+        self.done = False
+        self.followers = 0
+
+    def publish(self, chunk):
+        with self.cond:
+            self.chunks.append(chunk)
+            self.cond.notify_all()
+
+    def finish(self, result=None, error=None):
+        with self.cond:
+            self.result = result
+            self.error = error
+            self.done = True
+            self.cond.notify_all()
+
+    def wait(self):
+        with self.cond:
+            while not self.done:
+                self.cond.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+    def follow(self):
+        i = 0
+        while True:
+            with self.cond:
+                while i == len(self.chunks) and not self.done:
+                    self.cond.wait()
+                new, done = self.chunks[i:], self.done
+            i += len(new)
+            yield from new
+            if done:
+                if self.error is not None:
+                    raise self.error
+                return
+
+
+class SingleFlight:
+
+    def __init__(self, enabled=LLM_SINGLEFLIGHT):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.leaders = 0
+        self.shared = 0
+        self.errors = 0
+
+    def _join(self, key):
+        """(flight, is_leader)"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                self.leaders += 1
+                return flight, True
+            flight.followers += 1
+            self.shared += 1
+            return flight, False
+
+    def _land(self, key, flight, result=None, error=None):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            if error is not None:
+                self.errors += 1
+        flight.finish(result, error)
+
+    def do(self, key, fn):
+        """(fn() or the in-flight result for `key`, whether it was shared)."""
+        if not self.enabled:
+            return fn(), False
+
+        flight, leader = self._join(key)
+        if not leader:
+            return flight.wait(), True
+
+        try:
+            result = fn()
+        except BaseException as e:
+            self._land(key, flight, error=e)
+            raise
+        self._land(key, flight, result)
+        return result, False
+
+    def stream(self, key, stream_fn):
+        """
+        (iterator of chunks, whether it was shared). `stream_fn()` returns
+        an iterator of chunks; it is only called by the leader.
+        """
+        if not self.enabled:
+            return stream_fn(), False
+
+        flight, leader = self._join(key)
+        if not leader:
+            return flight.follow(), True
+        return self._lead_stream(key, flight, stream_fn), False
+
+    def _lead_stream(self, key, flight, stream_fn):
+        try:
+            # Inside the try: a stream_fn() that fails before its first
+            # chunk must still land the flight, or followers wait forever
+            upstream = iter(stream_fn())
+            for chunk in upstream:
+                flight.publish(chunk)
+                yield chunk
+        except GeneratorExit:
+            # Our caller went away mid-stream
+            with self._lock:
+                followed = flight.followers > 0
+                if not followed and self._flights.get(key) is flight:
+                    del self._flights[key]
+            if followed:
+                threading.Thread(
+                    target=self._drain, args=(key, flight, upstream),
+                    name="singleflight-drain", daemon=True,
+                ).start()
+            else:
+                flight.finish(error=_Abandoned("stream abandoned"))
+            raise
+        except BaseException as e:
+            self._land(key, flight, error=e)
+            raise
+        self._land(key, flight)
+
+    def _drain(self, key, flight, upstream):
+        try:
+            for chunk in upstream:
+                flight.publish(chunk)
+        except BaseException as e:
+            self._land(key, flight, error=e)
+            return
+        self._land(key, flight)
+
+    def stats(self):
+        with self._lock:
+            in_flight = len(self._flights)
+        return {"leaders": self.leaders, "shared": self.shared,
+                "errors": self.errors, "in_flight": in_flight}
+
+
+# ---------------------------------------------------------------
+# Event loop (ASGI path)
+# ---------------------------------------------------------------
+class _AsyncFlight:
+    __slots__ = ("cond", "chunks", "error", "done", "task")
+
+    def __init__(self):
+        self.cond = asyncio.Condition()
+        self.chunks = []
+        self.error = None
+        self.done = False
+        self.task = None
+
+    async def follow(self):
+        i = 0
+        while True:
+            async with self.cond:
+                await self.cond.wait_for(lambda: i < len(self.chunks) or self.done)
+                new, done = self.chunks[i:], self.done
+            i += len(new)
+            for chunk in new:
+                yield chunk
+            if done:
+                if self.error is not None:
+                    raise self.error
+                return
+
+
+class AsyncSingleFlight:
+    """
+    SingleFlight for one event loop. The upstream call runs as its own
+    task, so a cancelled leader does not cancel it for the others.
+    """
+
+    def __init__(self, enabled=LLM_SINGLEFLIGHT):
+        self.enabled = enabled
+        self._tasks = {}
+        self._streams = {}
+        self.leaders = 0
+        self.shared = 0
+        self.errors = 0
+
+    async def do(self, key, coro_fn):
+        """(await coro_fn() or the in-flight result for `key`, whether it was shared)."""
+        if not self.enabled:
+            return await coro_fn(), False
+
+        task = self._tasks.get(key)
+        shared = task is not None
+        if shared:
+            self.shared += 1
+        else:
+            self.leaders += 1
+            task = self._tasks[key] = asyncio.ensure_future(coro_fn())
+            task.add_done_callback(lambda t: self._landed(self._tasks, key, t))
+        return await asyncio.shield(task), shared
+
+    def stream(self, key, agen_fn):
+        """
+        (async iterator of chunks, whether it was shared). `agen_fn()`
+        returns an async iterator of chunks; it is only called once.
+        """
+        if not self.enabled:
+            return agen_fn(), False
+
+        flight = self._streams.get(key)
+        shared = flight is not None
+        if shared:
+            self.shared += 1
+        else:
+            self.leaders += 1
+            flight = self._streams[key] = _AsyncFlight()
+            flight.task = asyncio.ensure_future(self._pump(flight, agen_fn))
+            flight.task.add_done_callback(lambda t: self._landed(self._streams, key, flight))
+        return flight.follow(), shared
+
+    async def _pump(self, flight, agen_fn):
+        try:
+            async for chunk in agen_fn():
+                async with flight.cond:
+                    flight.chunks.append(chunk)
+                    flight.cond.notify_all()
+        except BaseException as e:
+            flight.error = e
+            self.errors += 1
+        async with flight.cond:
+            flight.done = True
+            flight.cond.notify_all()
+
+    def _landed(self, flights, key, value):
+        if flights.get(key) is value:
+            del flights[key]
+        if isinstance(value, asyncio.Future) and not value.cancelled() and value.exception():
+            self.errors += 1
+
+    def stats(self):
+        return {"leaders": self.leaders, "shared": self.shared,
+                "errors": self.errors, "in_flight": len(self._tasks) + len(self._streams)}
@@ -0,0 +1,97 @@
+# ===============================================================
+# skill_profile.py – Per-user team evidence, matched at write time
+# ===============================================================
+#
+# Team recommendations used to join every remembered user message into
+# one string and substring-scan it for every skill in the map, then do
+# the same over the SQLite summary, on every "which team" question.
+#
+# Now each user message (and each new summary) is matched once, when it
+# is saved, by one Aho–Corasick pass over all skills. The per-team
+# counts go to chat_db's skill_profiles table, split by where they came
+# from ("memory": the user's own messages, "summary": the latest
+# conversation summary), and a recommendation is one indexed lookup.
+#
+# Skills only count as whole words ("ml" is not in "html", "ai" is not
+# in "email"), and overlapping skills count once, longest first ("web
+# development", not also "web dev").
+
+import os
+from intent_router import AhoCorasick
+
+MEMORY = "memory"
+SUMMARY = "summary"
+
+# A summary names a skill once where messages repeat it, so one
+# mention there is worth a little more
+SKILL_MEMORY_WEIGHT = float(os.getenv("SKILL_MEMORY_WEIGHT", "1.0"))
+SKILL_SUMMARY_WEIGHT = float(os.getenv("SKILL_SUMMARY_WEIGHT", "2.0"))
+
+SKILL_MAP = {
+    "tech": [
+        "python", "java", "c++", "coding", "programming",
+        "machine learning", "ml", "ai", "deeplearning",
+        "web dev", "web development", "backend", "frontend",
+        "data analysis", "data science", "algorithms",
+        "dsa", "problem solving", "cloud", "docker",
+    ],
+
+    "design": [
+        "figma", "ui", "ux", "graphic design", "illustration",
+        "photoshop", "canva", "poster", "banner", "logo",
+        "video editing", "editing", "premiere pro", "after effects",
+    ],
+
+    "pr": [
+        "communication", "public speaking", "convincing",
+        "talking to strangers", "teamwork", "leadership",
+        "event management", "content writing", "storytelling",
+        "social media", "marketing", "negotiation",
+        "presentation", "anchoring", "community building"
+    ]
+}
+
+
+class SkillMatcher:
+
+    def __init__(self, skill_map=SKILL_MAP):
+        self.teams = list(skill_map)
+        self._automaton = AhoCorasick(
+            (skill, team) for team, skills in skill_map.items() for skill in skills
+        )
+
+    def count(self, text):
+        """{team: number of skill mentions} in `text` (lowercased)."""
+        n = len(text)
+        matches = [
+            (start, end, team) for start, end, team in self._automaton.iter_matches(text)
+            if (start == 0 or not text[start - 1].isalnum())
+            and (end == n or not text[end].isalnum())
+        ]
+
+        # Leftmost-longest, non-overlapping
+        counts, covered_to = {}, 0
+        for start, end, team in sorted(matches, key=lambda m: (m[0], -m[1])):
+            if start >= covered_to:
+                counts[team] = counts.get(team, 0) + 1
+                covered_to = end
+        return counts
+
+
+def best_team(profile, teams=SKILL_MAP, memory_weight=SKILL_MEMORY_WEIGHT,
+              summary_weight=SKILL_SUMMARY_WEIGHT):
+    """
+    (origin, team) for the team with the most weighted evidence in
+    `profile` ({team: {source: count}}), or (None, None). Ties go to
+    the team listed first; origin is "memory" if the user said it
+    themselves, else "summary".
+    """
+    best_score, result = 0.0, (None, None)
+    for team in teams:
+        sources = profile.get(team, {})
+        score = (sources.get(MEMORY, 0) * memory_weight
+                 + sources.get(SUMMARY, 0) * summary_weight)
+        if score > best_score:
+            best_score = score
+            result = (MEMORY if sources.get(MEMORY) else SUMMARY, team)
+    return result
@@ -0,0 +1,130 @@
+# ===============================================================
+# storage.py – Pooled SQLite access shared by every module
+# ===============================================================
+
+import os
+import atexit
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# ---------------------------------------------------------------
+# Tunables (override through .env)
+# ---------------------------------------------------------------
+POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", "8"))
+BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "8192"))
+STATEMENT_CACHE_SIZE = int(os.getenv("SQLITE_STATEMENT_CACHE", "128"))
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of long-lived connections to one SQLite file.
+
+    Connections are opened lazily up to `size`, configured once with
+    WAL journaling and the pragmas above, and handed out one thread at
+    a time. Because they stay open, sqlite3's per-connection statement
+    cache (`cached_statements`) keeps every SQL string compiled.
+    """
+
+    def __init__(self, path, size=POOL_SIZE, busy_timeout_ms=BUSY_TIMEOUT_MS):
+        self.path = path
+        self.size = size
+        self.busy_timeout_ms = busy_timeout_ms
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _open(self):
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={SYNCHRONOUS}")
+        conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+        conn.execute(f"PRAGMA busy_timeout={self.busy_timeout_ms}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return self._open()
+                except Exception:
+                    self._created -= 1
+                    raise
+
+        try:
+            return self._idle.get(timeout=self.busy_timeout_ms / 1000)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"connection pool exhausted for {self.path}"
+            )
+
+    def release(self, conn):
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; commit on success, roll back on error."""
+        conn = self.acquire()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self.release(conn)
+
+    def close(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+
+# ---------------------------------------------------------------
+# One pool per database file
+# ---------------------------------------------------------------
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path):
+    key = os.path.abspath(path)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = ConnectionPool(key)
+    return pool
+
+
+def connect(path):
+    """Shortcut: `with connect(DB_PATH) as conn: ...`"""
+    return get_pool(path).connection()
+
+
+@atexit.register
+def close_all():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
@@ -0,0 +1,149 @@
+# ===============================================================
+# summarizer.py – Background, debounced per-user summary jobs
+# ===============================================================
+#
+# Summarizing a conversation is a second LLM call. Doing it at the end
+# of a chat turn made that turn cost double, so turns now only call
+# request(user_id) and the summary is produced on a small worker pool.
+#
+# Requests are debounced per user: the first request schedules a job
+# `debounce` seconds later and every request until then is folded into
+# it. A request that arrives while that user's job is running schedules
+# one more run afterwards, so nothing is lost and a user never has two
+# jobs at once.
+
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", "2"))
+SUMMARY_DEBOUNCE_SECONDS = float(os.getenv("SUMMARY_DEBOUNCE_SECONDS", "5"))
+
+
+class SummaryWorker:
+    """Runs `job_fn(user_id)` off the request path, at most once per user at a time."""
+
+    def __init__(self, job_fn, debounce=SUMMARY_DEBOUNCE_SECONDS, workers=SUMMARY_WORKERS):
+        self.job_fn = job_fn
+        self.debounce = debounce
+
+        self._cond = threading.Condition()
+        self._due = {}              # user_id -> (run_at, first requested_at)
+        self._running = set()
+        self._rerun = {}            # user_id -> requested_at, for requests during a run
+        self._stop = False
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="summarizer")
+
+        self._stats = {
+            "requested": 0,
+            "coalesced": 0,
+            "completed": 0,
+            "failed": 0,
+            "last_job_ms": 0.0,
+            "max_job_ms": 0.0,
+            "total_job_ms": 0.0,
+            "max_wait_ms": 0.0,
+            "total_wait_ms": 0.0,
+        }
+
+        self._thread = threading.Thread(
+            target=self._schedule, name="summary-scheduler", daemon=True
+        )
+        self._thread.start()
+
+    # -----------------------------------------------------------
+    # Producer side (request path: never blocks on a job)
+    # -----------------------------------------------------------
+    def request(self, user_id):
+        now = time.monotonic()
+        with self._cond:
+            self._stats["requested"] += 1
+            if user_id in self._running:
+                if user_id in self._rerun:
+                    self._stats["coalesced"] += 1
+                else:
+                    self._rerun[user_id] = now
+            elif user_id in self._due:
+                self._stats["coalesced"] += 1
+            else:
+                self._due[user_id] = (now + self.debounce, now)
+                self._cond.notify_all()
+
+    # -----------------------------------------------------------
+    # Scheduler + workers
+    # -----------------------------------------------------------
+    def _schedule(self):
+        with self._cond:
+            while not self._stop:
+                now = time.monotonic()
+                ready = [u for u, (run_at, _) in self._due.items() if run_at <= now]
+                for user_id in ready:
+                    _, requested_at = self._due.pop(user_id)
+                    self._running.add(user_id)
+                    self._pool.submit(self._run_job, user_id, requested_at)
+
+                if self._due:
+                    next_run = min(run_at for run_at, _ in self._due.values())
+                    self._cond.wait(max(0.0, next_run - now))
+                else:
+                    self._cond.wait()
+
+    def _run_job(self, user_id, requested_at):
+        start = time.monotonic()
+        ok = True
+        try:
+            self.job_fn(user_id)
+        except Exception as e:
+            ok = False
+            print(f"❌ Summary job failed for {user_id}: {e}")
+        end = time.monotonic()
+
+        with self._cond:
+            stats = self._stats
+            job_ms = (end - start) * 1000
+            wait_ms = (start - requested_at) * 1000
+            stats["completed" if ok else "failed"] += 1
+            stats["last_job_ms"] = job_ms
+            stats["max_job_ms"] = max(stats["max_job_ms"], job_ms)
+            stats["total_job_ms"] += job_ms
+            stats["max_wait_ms"] = max(stats["max_wait_ms"], wait_ms)
+            stats["total_wait_ms"] += wait_ms
+
+            self._running.discard(user_id)
+            if user_id in self._rerun:
+                self._due[user_id] = (end + self.debounce, self._rerun.pop(user_id))
+            self._cond.notify_all()
+
+    # -----------------------------------------------------------
+    # Control
+    # -----------------------------------------------------------
+    def flush(self, timeout=None):
+        """Run every scheduled job now (skipping the debounce) and wait for them."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._due or self._running:
+                self._due = {u: (0.0, requested_at) for u, (_, requested_at) in self._due.items()}
+                self._cond.notify_all()
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        self._thread.join()
+        self._pool.shutdown(wait=True)
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats["queue_depth"] = len(self._due)
+            stats["running"] = len(self._running)
+        jobs = stats["completed"] + stats["failed"]
+        stats["avg_job_ms"] = stats["total_job_ms"] / jobs if jobs else 0.0
+        stats["avg_wait_ms"] = stats["total_wait_ms"] / jobs if jobs else 0.0
+        return stats
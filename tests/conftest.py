@@ -0,0 +1,20 @@
+# ===============================================================
+# conftest.py – One offline chatbot_backend for the whole test run
+# ===============================================================
+#
+# chatbot_backend configures itself at import time, so it is imported
+# once, by the `backend` fixture, wired to benchmarks/stubs.py (StubLLM,
+# HashEmbedding) with chat history, notes and the index in a temp dir.
+
+import pytest
+from stubs import offline_backend
+
+
+@pytest.fixture(scope="session")
+def work_dir(tmp_path_factory):
+    return tmp_path_factory.mktemp("sccse")
+
+
+@pytest.fixture(scope="session")
+def backend(work_dir):
+    return offline_backend(str(work_dir))
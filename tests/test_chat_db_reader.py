@@ -0,0 +1,21 @@
+# The reader opens the database read-only and cannot migrate it, so it
+# has to export whatever columns an older database actually has.
+
+import json
+import sqlite3
+
+import chat_db_reader
+
+
+def test_export_reads_summaries_from_before_last_message_id(tmp_path, capsys):
+    path = str(tmp_path / "old.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE summaries (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                     "user_id TEXT, summary TEXT, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)")
+        conn.execute("INSERT INTO summaries (user_id, summary) VALUES ('u1', 'likes design')")
+
+    assert chat_db_reader.export("summaries", "jsonl", "-", db_path=path) == 1
+
+    row = json.loads(capsys.readouterr().out)
+    assert list(row) == ["id", "user_id", "summary", "timestamp"]
+    assert row["summary"] == "likes design"
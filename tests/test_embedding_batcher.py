@@ -0,0 +1,49 @@
+# Every embed() call is answered, including one racing close(): by the
+# batch thread if it was queued in time, directly if not.
+
+import time
+import queue
+import threading
+from types import SimpleNamespace
+
+import embedding_batcher
+from embedding_batcher import EmbeddingBatcher
+
+
+def embed_batch(texts):
+    return [[float(len(text))] for text in texts]
+
+
+class SlowPutQueue(queue.Queue):
+    """Signals when a caller starts queueing a text, then stalls it."""
+
+    def __init__(self):
+        super().__init__()
+        self.putting = threading.Event()
+
+    def put(self, item, *args, **kwargs):
+        if item is not None:
+            self.putting.set()
+            time.sleep(0.1)
+        super().put(item, *args, **kwargs)
+
+
+def test_an_embed_that_races_close_is_still_answered(monkeypatch):
+    monkeypatch.setattr(embedding_batcher, "queue",
+                        SimpleNamespace(Queue=SlowPutQueue, Empty=queue.Empty))
+    batcher = EmbeddingBatcher(embed_batch)
+
+    vectors = []
+    caller = threading.Thread(target=lambda: vectors.append(batcher.embed("racing")), daemon=True)
+    caller.start()
+    batcher._queue.putting.wait(1)
+    batcher.close()
+    caller.join(2)
+    assert vectors == [[6.0]]
+
+
+def test_embed_after_close_runs_directly():
+    batcher = EmbeddingBatcher(embed_batch)
+    batcher.close()
+    batcher.close()
+    assert batcher.embed("after") == [5.0]
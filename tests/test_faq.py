@@ -0,0 +1,54 @@
+# FAQ lookups: the exact-text key ignores case, spacing and
+# punctuation, and a text miss falls back to the embedding.
+
+import numpy as np
+from faq import FaqTable, FaqService, faq_key
+
+QUESTIONS = ["What does the design team do?", "Where can I find SCCSE's upcoming events?"]
+ANSWERS = ["UI/UX, swags, captions.", "https://www.sccseaot.in/events"]
+
+
+class FixedNotes:
+    def version(self):
+        return 0
+
+    def digest(self):
+        return ""
+
+
+def table():
+    return FaqTable(QUESTIONS, ANSWERS, np.eye(2, 4, dtype=np.float32), "fp", threshold=0.9)
+
+
+def service(embed_fn=None):
+    faq = FaqService(".", FixedNotes(), rebuild_fn=None, embed_fn=embed_fn, auto_rebuild=False)
+    faq._table = table()
+    return faq
+
+
+def test_the_text_key_ignores_case_spacing_and_punctuation():
+    assert faq_key("  What does the DESIGN team do ?!") == "what does the design team do"
+    for variant in ["what does the design team do", "What does the design team do??",
+                    "what does the design team do.", "WHAT  DOES THE DESIGN TEAM DO"]:
+        assert table().lookup_text(variant) == ANSWERS[0]
+    assert table().lookup_text("where can i find sccses upcoming events") == ANSWERS[1]
+
+
+def test_a_text_miss_is_matched_by_its_embedding():
+    embedded = []
+
+    def embed(text):
+        embedded.append(text)
+        return [0.0, 1.0, 0.1, 0.0]
+
+    faq = service(embed)
+    assert faq.lookup("any events coming up") == ANSWERS[1]
+    assert faq.lookup("what does the design team do") == ANSWERS[0]
+    assert embedded == ["any events coming up"]
+    assert faq.stats()["hits"] == 2
+
+
+def test_a_vector_passed_in_is_used_without_embedding_again():
+    faq = service(embed_fn=lambda text: 1 / 0)
+    assert faq.lookup("anything", vector=[1.0, 0.0, 0.0, 0.0]) == ANSWERS[0]
+    assert faq.lookup("nothing like it", vector=[0.0, 0.0, 0.0, 1.0]) is None
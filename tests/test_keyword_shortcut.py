@@ -0,0 +1,62 @@
+# A keyword lookup BM25 answers on its own ("who is antara dhar") only
+# skips the dense search: the turn is still embedded, so it is cached
+# and served from the response cache like any other RAG turn.
+
+import pytest
+from stubs import StubLLM
+
+QUESTION = "who is antara dhar"
+
+
+@pytest.fixture
+def llm(backend, monkeypatch):
+    """A fresh counting LLM and an empty response cache."""
+    llm = StubLLM(latency=0.0)
+    monkeypatch.setattr(backend, "llm", llm)
+    backend.response_cache.invalidate()
+    return llm
+
+
+@pytest.fixture
+def bm25_searches(backend, monkeypatch):
+    """Counts BM25 searches."""
+    calls = []
+    search = backend.sccse_retriever.bm25.search
+    monkeypatch.setattr(backend.sccse_retriever.bm25, "search",
+                        lambda *args: calls.append(1) or search(*args))
+    return calls
+
+
+def test_names_are_keyword_lookups_on_the_shipped_corpus_and_team_words_are_not(backend):
+    retriever = backend.sccse_retriever
+    assert len(retriever.bm25) < 20         # two nodes: node-level frequency can't tell
+
+    hits, confident = retriever.keyword_only(QUESTION)
+    assert confident
+    assert "Antara Dhar" in hits[0].node.get_content()
+    assert retriever.keyword_only("what does the design team do")[1] is False
+
+
+def test_the_shortcut_is_never_taken_below_keyword_min_passages(backend, monkeypatch):
+    retriever = backend.sccse_retriever
+    monkeypatch.setattr(retriever, "keyword_min_passages", retriever.bm25.passages + 1)
+    hits, confident = retriever.keyword_only(QUESTION)
+    assert hits and not confident
+
+
+@pytest.mark.parametrize("question", [QUESTION, "what does the design team do"])
+def test_a_rag_turn_runs_bm25_once(backend, llm, bm25_searches, question):
+    backend.get_chat_response(question, user_id="kw-bm25")
+    assert llm.calls == 1
+    assert len(bm25_searches) == 1
+
+
+def test_a_repeated_keyword_question_is_answered_from_the_response_cache(backend, llm):
+    hits = backend.response_cache.stats()["hits"]
+
+    first = backend.get_chat_response(QUESTION, user_id="kw-1")
+    second = backend.get_chat_response(QUESTION, user_id="kw-2")
+
+    assert first == second
+    assert llm.calls == 1
+    assert backend.response_cache.stats()["hits"] == hits + 1
@@ -0,0 +1,50 @@
+# The per-user history queries must stay index SEARCHes on
+# (user_id, id): no full SCAN of messages/summaries and no temp B-tree
+# for ORDER BY, so their cost does not grow with total traffic.
+
+import os
+import re
+import random
+
+import pytest
+import chat_db
+from storage import connect
+from bench_history_queries import hot_queries
+
+ROWS = 50000
+USERS = 500
+
+_FULL_SCAN = re.compile(r"\bSCAN (TABLE )?(messages|summaries)\b")
+_TEMP_SORT = re.compile(r"USE TEMP B-TREE")
+
+
+@pytest.fixture(scope="module")
+def history_db(tmp_path_factory):
+    """A migrated chat database with ROWS messages over USERS users, analyzed."""
+    path = str(tmp_path_factory.mktemp("plans") / "plans.db")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(chat_db, "DB_PATH", path)
+        mp.setattr(chat_db, "NOTES_LEGACY_FILE", os.devnull)
+        chat_db.init_db()
+
+    random.seed(0)
+    messages = [
+        (f"user-{random.randrange(USERS)}", "user" if i % 2 == 0 else "assistant", f"message {i}")
+        for i in range(ROWS)
+    ]
+    summaries = [(f"user-{u}", f"summary of user {u}", ROWS) for u in range(USERS)]
+    with connect(path) as conn:
+        conn.executemany(chat_db.INSERT_MESSAGE, messages)
+        conn.executemany(chat_db.INSERT_SUMMARY, summaries)
+        conn.execute("ANALYZE")
+    return path
+
+
+@pytest.mark.parametrize("name, sql, params", hot_queries("user-7", ROWS // 2),
+                         ids=[q[0] for q in hot_queries("user-7", 0)])
+def test_history_query_is_an_index_search(history_db, name, sql, params):
+    with connect(history_db) as conn:
+        details = [row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+    assert not [d for d in details if _FULL_SCAN.search(d) or _TEMP_SORT.search(d)], details
+    assert any("USING" in d and "INDEX" in d for d in details), details
@@ -0,0 +1,131 @@
+# Passkey flow under interleaved users: every thread (and, with the
+# sqlite backend, every worker process) plays one user doing
+#   "note that <unique text>" -> a wrong passkey -> the right passkey
+# while all the others do the same.
+
+import threading
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import chat_db
+from session_state import make_session_state, MemorySessionState
+
+PROMPT = "🔐 This action requires the admin passkey. Please provide the passkey."
+WRONG = "🚫 Incorrect passkey. Try again."
+ANONYMOUS = "🔐 Please log in to save or delete notes."
+
+
+def play_user(cb, user_id, rounds):
+    errors = []
+    for i in range(rounds):
+        text = f"{user_id}-round-{i}"
+        steps = [
+            (f"note that {text}", PROMPT),
+            ("not the passkey", WRONG),
+            (cb.PASS_KEY, f"✅ Note saved: '{text}'"),
+        ]
+        for message, expected in steps:
+            reply = cb.get_chat_response(message, user_id=user_id)
+            if reply != expected:
+                errors.append(f"{user_id}: {message!r} -> {reply!r}, expected {expected!r}")
+    return errors
+
+
+def play_users(cb, users, rounds):
+    with ThreadPoolExecutor(max_workers=len(users)) as pool:
+        results = pool.map(lambda u: play_user(cb, u, rounds), users)
+    return [e for errors in results for e in errors]
+
+
+def play_worker(args):
+    """One spawned worker process; shares nothing but the database."""
+    from stubs import offline_backend
+    work_dir, process_id, threads, rounds = args
+    cb = offline_backend(work_dir, warm=False)
+    cb.session_state = make_session_state("sqlite")
+    return play_users(cb, [f"proc{process_id}-u{t}" for t in range(threads)], rounds)
+
+
+def saved_notes(prefix):
+    return Counter(text for _, _, text, _ in chat_db.get_notes() if text.startswith(prefix))
+
+
+@pytest.mark.parametrize("backend_name", ["memory", "sqlite"])
+def test_interleaved_users_only_see_their_own_pending_action(backend, monkeypatch, backend_name):
+    monkeypatch.setattr(backend, "session_state", make_session_state(backend_name))
+    users = [f"{backend_name}-u{t}" for t in range(16)]
+
+    assert play_users(backend, users, rounds=10) == []
+
+    # Every note saved exactly once, none from another user's flow
+    saved = saved_notes(f"{backend_name}-u")
+    assert set(saved) == {f"{u}-round-{i}" for u in users for i in range(10)}
+    assert set(saved.values()) == {1}
+
+
+def test_worker_processes_share_pending_actions_through_sqlite(backend, work_dir):
+    jobs = [(str(work_dir), p, 4, 3) for p in range(2)]
+    with multiprocessing.get_context("spawn").Pool(len(jobs)) as pool:
+        errors = [e for errs in pool.map(play_worker, jobs) for e in errs]
+
+    assert errors == []
+    saved = saved_notes("proc")
+    assert set(saved) == {f"proc{p}-u{t}-round-{i}"
+                          for p in range(2) for t in range(4) for i in range(3)}
+    assert set(saved.values()) == {1}
+
+
+@pytest.mark.parametrize("backend_name", ["memory", "sqlite"])
+def test_compare_and_set_consumes_a_parked_value_exactly_once(backend, backend_name):
+    state = make_session_state(backend_name)
+    threads, rounds = 16, 20
+    wins = Counter()
+    barrier = threading.Barrier(threads + 1)
+
+    def contender():
+        for i in range(rounds):
+            barrier.wait()
+            if state.compare_and_set("racer", "pending_action", {"round": i}, None):
+                wins[i] += 1
+            barrier.wait()
+
+    pool = [threading.Thread(target=contender) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for i in range(rounds):
+        state.set("racer", "pending_action", {"round": i})
+        barrier.wait()
+        barrier.wait()
+    for t in pool:
+        t.join()
+
+    assert [wins[i] for i in range(rounds)] == [1] * rounds
+
+
+def test_memory_backend_drops_expired_actions_on_write():
+    state = MemorySessionState()
+    for i in range(100):
+        state.set(f"gone-{i}", "pending_action", {"round": i}, ttl=1e-9)
+    state.set("stays", "pending_action", {"round": 0})
+    assert list(state._values) == [("stays", "pending_action")]
+
+    state.set("gone", "pending_action", {"round": 1}, ttl=1e-9)
+    assert state.compare_and_set("stays", "pending_action", {"round": 0}, {"round": 1})
+    assert list(state._values) == [("stays", "pending_action")]
+
+
+@pytest.mark.parametrize("backend_name", ["memory", "sqlite"])
+def test_anonymous_users_cannot_park_or_confirm_an_action(backend, monkeypatch, backend_name):
+    monkeypatch.setattr(backend, "session_state", make_session_state(backend_name))
+    notes = len(chat_db.get_notes())
+
+    for message in ("note that anonymous note", "clear notes"):
+        assert backend.get_chat_response(message, user_id=None) == ANONYMOUS
+    assert backend.session_state.get(None, backend.PENDING_ACTION) is None
+
+    # The passkey from another anonymous client confirms nothing
+    assert backend.get_chat_response(backend.PASS_KEY, user_id=None) not in (
+        "✅ Note saved: 'anonymous note'", "🗑️ All notes have been deleted successfully.")
+    assert len(chat_db.get_notes()) == notes
@@ -0,0 +1,229 @@
+# Identical in-flight prompts share one upstream call: the SingleFlight
+# primitives on their own, then every chat entry point end to end with
+# a StubLLM that counts calls.
+
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from singleflight import SingleFlight, AsyncSingleFlight
+from stubs import StubLLM
+
+CLIENTS = 10
+LATENCY = 0.2
+QUESTION = "tell me about the design team"
+
+
+class FailingLLM(StubLLM):
+
+    def complete(self, prompt, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        raise ConnectionError("groq unavailable")
+
+
+# ---------------------------------------------------------------
+# SingleFlight on its own
+# ---------------------------------------------------------------
+def test_do_makes_one_upstream_call_for_concurrent_callers():
+    flights = SingleFlight(enabled=True)
+    calls = []
+
+    def upstream():
+        calls.append(1)
+        time.sleep(LATENCY)
+        return "answer"
+
+    with ThreadPoolExecutor(CLIENTS) as pool:
+        results = list(pool.map(lambda _: flights.do("k", upstream), range(CLIENTS)))
+
+    assert len(calls) == 1
+    assert [result for result, _ in results] == ["answer"] * CLIENTS
+    assert sum(shared for _, shared in results) == CLIENTS - 1
+
+
+def test_do_raises_an_upstream_error_in_every_caller_and_forgets_it():
+    flights = SingleFlight(enabled=True)
+    calls = []
+
+    def broken():
+        calls.append(1)
+        time.sleep(LATENCY)
+        raise ValueError("boom")
+
+    def call_broken(_):
+        with pytest.raises(ValueError, match="boom"):
+            flights.do("e", broken)
+
+    with ThreadPoolExecutor(CLIENTS) as pool:
+        list(pool.map(call_broken, range(CLIENTS)))
+    assert len(calls) == 1
+
+    assert flights.do("e", lambda: "answer") == ("answer", False)
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_stream_follower_gets_every_chunk_after_the_leader_disconnects():
+    flights = SingleFlight(enabled=True)
+    calls = []
+
+    def chunks():
+        calls.append(1)
+        for i in range(5):
+            time.sleep(LATENCY / 5)
+            yield i
+
+    leader, _ = flights.stream("s", chunks)
+    assert next(leader) == 0
+    follower, shared = flights.stream("s", chunks)
+    leader.close()
+
+    assert shared
+    assert list(follower) == [0, 1, 2, 3, 4]
+    assert len(calls) == 1
+
+
+def test_stream_that_fails_to_start_lands_for_followers_and_later_callers():
+    flights = SingleFlight(enabled=True)
+
+    def broken():
+        raise ConnectionError("groq unavailable")
+
+    leader, _ = flights.stream("f", broken)
+    follower, shared = flights.stream("f", broken)
+    with pytest.raises(ConnectionError):
+        next(leader)
+
+    assert shared
+    with pytest.raises(ConnectionError):
+        list(follower)
+    retry, shared = flights.stream("f", lambda: iter(["answer"]))
+    assert not shared
+    assert list(retry) == ["answer"]
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_async_do_shares_results_and_errors():
+    async def run():
+        flights = AsyncSingleFlight(enabled=True)
+        calls = []
+
+        async def upstream():
+            calls.append(1)
+            await asyncio.sleep(LATENCY)
+            return "answer"
+
+        async def broken():
+            calls.append(1)
+            await asyncio.sleep(LATENCY)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(*(flights.do("k", upstream) for _ in range(CLIENTS)))
+        assert len(calls) == 1
+        assert [result for result, _ in results] == ["answer"] * CLIENTS
+
+        calls.clear()
+        results = await asyncio.gather(*(flights.do("e", broken) for _ in range(CLIENTS)),
+                                       return_exceptions=True)
+        assert len(calls) == 1
+        assert all(isinstance(r, ValueError) for r in results)
+
+    asyncio.run(run())
+
+
+def test_async_follower_is_answered_after_the_leader_is_cancelled():
+    async def run():
+        flights = AsyncSingleFlight(enabled=True)
+        calls = []
+
+        async def upstream():
+            calls.append(1)
+            await asyncio.sleep(LATENCY)
+            return "answer"
+
+        leader = asyncio.ensure_future(flights.do("c", upstream))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flights.do("c", upstream))
+        await asyncio.sleep(LATENCY / 2)
+        leader.cancel()
+
+        assert await follower == ("answer", True)
+        assert len(calls) == 1
+
+    asyncio.run(run())
+
+
+# ---------------------------------------------------------------
+# The chat entry points, end to end
+# ---------------------------------------------------------------
+def sync_turns(cb, stream):
+    barrier = threading.Barrier(CLIENTS)
+
+    def ask(i):
+        user_id = f"sf-{time.monotonic_ns()}-{i}"
+        barrier.wait()
+        if stream:
+            return "".join(cb.stream_chat_response(QUESTION, user_id=user_id)).strip()
+        return cb.get_chat_response(QUESTION, user_id=user_id)
+
+    with ThreadPoolExecutor(CLIENTS) as pool:
+        return list(pool.map(ask, range(CLIENTS)))
+
+
+def async_turns(cb, stream):
+    async def ask(i):
+        user_id = f"sf-{time.monotonic_ns()}-{i}"
+        if stream:
+            chunks = [c async for c in cb.astream_chat_response(QUESTION, user_id=user_id)]
+            return "".join(chunks).strip()
+        return await cb.aget_chat_response(QUESTION, user_id=user_id)
+
+    async def run():
+        return await asyncio.gather(*(ask(i) for i in range(CLIENTS)))
+
+    return asyncio.run(run())
+
+
+ENTRY_POINTS = {
+    "get_chat_response": lambda cb: sync_turns(cb, stream=False),
+    "stream_chat_response": lambda cb: sync_turns(cb, stream=True),
+    "aget_chat_response": lambda cb: async_turns(cb, stream=False),
+    "astream_chat_response": lambda cb: async_turns(cb, stream=True),
+}
+
+
+@pytest.fixture
+def flights(backend, monkeypatch):
+    """Sets single-flight on or off for both entry paths, with a fresh counting LLM."""
+    def configure(enabled, llm):
+        monkeypatch.setattr(backend.llm_flights, "enabled", enabled)
+        monkeypatch.setattr(backend.llm_aflights, "enabled", enabled)
+        monkeypatch.setattr(backend, "llm", llm)
+        backend.response_cache.invalidate()
+        return llm
+    return configure
+
+
+@pytest.mark.parametrize("enabled", [True, False], ids=["on", "off"])
+@pytest.mark.parametrize("entry_point", list(ENTRY_POINTS))
+def test_identical_concurrent_turns_share_one_groq_call(backend, flights, entry_point, enabled):
+    llm = flights(enabled, StubLLM(latency=LATENCY))
+
+    answers = ENTRY_POINTS[entry_point](backend)
+
+    assert llm.calls == (1 if enabled else CLIENTS)
+    assert len(set(answers)) == 1
+
+
+def test_a_groq_error_fails_every_coalesced_turn(backend, flights):
+    llm = flights(True, FailingLLM(latency=LATENCY))
+
+    def ask(i):
+        with pytest.raises(ConnectionError):
+            backend.get_chat_response(QUESTION, user_id=f"sf-error-{i}")
+
+    with ThreadPoolExecutor(CLIENTS) as pool:
+        list(pool.map(ask, range(CLIENTS)))
+    assert llm.calls == 1
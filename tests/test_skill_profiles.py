@@ -0,0 +1,117 @@
+# Skill counts go through the same write path as the messages they
+# come from, a profile read sees its own unflushed counts, and the
+# backfill counts only what the chat path would have counted.
+
+import os
+import sqlite3
+import threading
+
+import pytest
+import chat_db
+from skill_profile import MEMORY, SUMMARY
+
+
+@pytest.fixture
+def skills_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(chat_db, "DB_PATH", str(tmp_path / "skills.db"))
+    monkeypatch.setattr(chat_db, "NOTES_LEGACY_FILE", os.devnull)
+    monkeypatch.setattr(chat_db, "WRITE_BEHIND", False)
+    chat_db.init_db()
+    yield
+    chat_db.disable_write_behind()
+
+
+def committed_profile(user_id):
+    return {(team, source): n for team, source, n in chat_db._read_skill_profile(user_id)}
+
+
+def test_write_behind_defers_skill_counts_and_reads_them_back(skills_db, monkeypatch):
+    # The writer thread waits at the gate, so everything stays pending
+    gate = threading.Event()
+    collect = chat_db.WriteBehindQueue._collect
+    monkeypatch.setattr(chat_db.WriteBehindQueue, "_collect",
+                        lambda self: gate.wait() and collect(self))
+    chat_db.enable_write_behind(flush_interval=0.01)
+    chat_db.record_skills("u1", "i know python and figma")
+    chat_db.record_skills("u1", "python again")
+    chat_db.record_skills("u1", "the user is into figma and canva", source=SUMMARY)
+
+    # Nothing committed yet, but the reader merges the pending counts
+    assert committed_profile("u1") == {}
+    expected = {"tech": {MEMORY: 2}, "design": {MEMORY: 1, SUMMARY: 2}}
+    assert chat_db.get_skill_profile("u1") == expected
+
+    gate.set()
+    chat_db.flush()
+    assert committed_profile("u1") == {("tech", MEMORY): 2, ("design", MEMORY): 1,
+                                       ("design", SUMMARY): 2}
+    assert chat_db.get_skill_profile("u1") == expected
+
+    # A newer summary replaces the previous summary counts
+    chat_db.record_skills("u1", "they enjoy public speaking", source=SUMMARY)
+    expected = {"tech": {MEMORY: 2}, "design": {MEMORY: 1}, "pr": {SUMMARY: 1}}
+    assert chat_db.get_skill_profile("u1") == expected
+    chat_db.flush()
+    assert chat_db.get_skill_profile("u1") == expected
+
+
+def test_synchronous_record_skills_commits_immediately(skills_db):
+    chat_db.record_skills("u2", "docker and cloud")
+    assert committed_profile("u2") == {("tech", MEMORY): 2}
+
+
+def old_database(tmp_path, monkeypatch, messages, summaries=()):
+    """A database from before migrations, with some history in it."""
+    path = str(tmp_path / "old.db")
+    monkeypatch.setattr(chat_db, "DB_PATH", path)
+    monkeypatch.setattr(chat_db, "NOTES_LEGACY_FILE", os.devnull)
+    monkeypatch.setattr(chat_db, "WRITE_BEHIND", False)
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE messages (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT, "
+                     "role TEXT, message TEXT, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)")
+        conn.execute("CREATE TABLE summaries (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT, "
+                     "summary TEXT, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)")
+        conn.executemany("INSERT INTO messages (user_id, role, message) VALUES (?, ?, ?)", messages)
+        conn.executemany("INSERT INTO summaries (user_id, summary) VALUES (?, ?)", summaries)
+    return path
+
+
+def test_backfill_skips_messages_the_chat_path_refuses_as_off_topic(tmp_path, monkeypatch):
+    old_database(tmp_path, monkeypatch, [
+        ("u3", "user", "what is python"),
+        ("u3", "user", "explain machine learning"),
+        ("u3", "user", "I like figma and ui work, which team?"),
+        ("u3", "assistant", "python python python"),
+    ])
+
+    chat_db.init_db()
+
+    assert committed_profile("u3") == {("design", MEMORY): 2}
+
+
+def test_backfill_runs_after_the_migration_in_chunks_without_double_counting(tmp_path, monkeypatch):
+    path = old_database(tmp_path, monkeypatch, [
+        ("u4", "user", "I like figma"),
+        ("u4", "user", "and canva, which team?"),
+        ("u4", "user", "docker too"),
+        ("u5", "user", "public speaking is my thing"),
+    ], summaries=[("u4", "into figma"), ("u5", "into figma")])
+
+    # The migration only creates the table; the history is not read yet
+    with chat_db.connect(path) as conn:
+        chat_db.migrate(conn)
+    assert committed_profile("u4") == {}
+
+    # Saved after the migration: counted once, by the chat path
+    chat_db.save_message("u4", "user", "python please")
+    chat_db.record_skills("u4", "python please")
+    chat_db.save_summary("u5", "they enjoy public speaking", None)
+    chat_db.record_skills("u5", "they enjoy public speaking", source=SUMMARY)
+
+    chat_db.backfill_skill_profiles(chunk=1)
+
+    assert committed_profile("u4") == {("design", MEMORY): 2, ("tech", MEMORY): 2,
+                                       ("design", SUMMARY): 1}
+    assert committed_profile("u5") == {("pr", MEMORY): 1, ("pr", SUMMARY): 1}
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM skill_profiles_backfill").fetchone()[0] == 0
@@ -0,0 +1,52 @@
+# A backlog longer than SUMMARY_MAX_MESSAGES is folded into the summary
+# oldest first, one LLM call per chunk, and the cursor only moves past
+# messages that were actually summarized.
+
+import pytest
+import chat_db
+from stubs import StubLLM
+
+
+class PromptLLM(StubLLM):
+
+    def __init__(self):
+        super().__init__(latency=0.0)
+        self.prompts = []
+
+    def complete(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return super().complete(prompt, **kwargs)
+
+
+@pytest.fixture
+def llm(backend, monkeypatch):
+    llm = PromptLLM()
+    monkeypatch.setattr(backend, "llm", llm)
+    monkeypatch.setattr(backend, "SUMMARY_MIN_NEW_MESSAGES", 20)
+    monkeypatch.setattr(backend, "SUMMARY_MAX_MESSAGES", 50)
+    return llm
+
+
+def save_messages(user_id, n):
+    for i in range(n):
+        chat_db.save_message(user_id, "user", f"{user_id} message {i}")
+    return [row[0] for row in chat_db.get_messages_since(user_id, 0, n)]
+
+
+@pytest.mark.parametrize("backlog, calls, summarized", [(120, 3, 120), (110, 2, 100), (19, 0, 0)])
+def test_a_backlog_is_summarized_in_order_up_to_the_last_full_chunk(
+        backend, llm, backlog, calls, summarized):
+    user_id = f"summary-{backlog}"
+    ids = save_messages(user_id, backlog)
+
+    backend.summarize_user(user_id)
+
+    assert len(llm.prompts) == calls
+    for chunk, prompt in enumerate(llm.prompts):
+        assert f"{user_id} message {chunk * 50}\n" in prompt
+    _, cursor = chat_db.get_last_summary_record(user_id)
+    assert cursor == (ids[summarized - 1] if summarized else None)
+
+    # Nothing left that a later run would skip
+    rest = chat_db.get_messages_since(user_id, cursor, backlog)
+    assert [row[0] for row in rest] == ids[summarized:]
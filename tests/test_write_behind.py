@@ -0,0 +1,64 @@
+# A write-behind batch that keeps failing is dropped after its
+# retries, so the writer and the shutdown flush always finish.
+
+import time
+import sqlite3
+import threading
+
+import chat_db
+
+
+def test_a_persistently_failing_batch_is_dropped_and_close_returns(monkeypatch):
+    attempts = []
+
+    def broken_write(self, batch):
+        attempts.append(len(batch))
+        raise sqlite3.OperationalError("database or disk is full")
+
+    monkeypatch.setattr(chat_db.WriteBehindQueue, "_write", broken_write)
+    writer = chat_db.WriteBehindQueue(flush_interval=0.01, max_retries=2)
+    writer.put("message", "wb-user", "user", "hello")
+
+    closer = threading.Thread(target=writer.close)
+    start = time.monotonic()
+    closer.start()
+    closer.join(timeout=5)
+
+    assert not closer.is_alive()
+    assert time.monotonic() - start < 5
+    assert attempts == [1, 1, 1]
+
+    stats = writer.stats()
+    assert stats["flush_errors"] == 3
+    assert stats["dropped_batches"] == 1
+    assert stats["rows_dropped"] == 1
+    assert stats["flushes"] == 0
+    assert stats["pending_users"] == 0
+
+
+def test_rows_pending_during_shutdown_stay_readable(backend, monkeypatch):
+    writer = chat_db.enable_write_behind(flush_interval=1.0)
+    closing = threading.Event()
+    seen_while_closing = []
+    close = writer.close
+
+    def slow_close():
+        closing.set()
+        time.sleep(0.2)
+        close()
+
+    monkeypatch.setattr(writer, "close", slow_close)
+    chat_db.save_summary("wb-reader", "still pending", 7)
+
+    def read_during_shutdown():
+        closing.wait()
+        seen_while_closing.append(chat_db.get_last_summary_record("wb-reader"))
+
+    reader = threading.Thread(target=read_during_shutdown)
+    reader.start()
+    chat_db.disable_write_behind()
+    reader.join()
+
+    assert chat_db._writer is None
+    assert seen_while_closing == [("still pending", 7)]
+    assert chat_db.get_last_summary_record("wb-reader") == ("still pending", 7)
@@ -0,0 +1,75 @@
+# ===============================================================
+# topic_classifier.py – Embedding-based on/off-topic gate
+# ===============================================================
+#
+# is_off_topic() only knows the phrases on its blacklist; anything it
+# misses ("who invented the telephone") costs a retrieval and a full
+# Groq completion just for the LLM to refuse. This classifier reuses
+# the query embedding we already compute and rejects such queries
+# locally.
+#
+# It is a nearest-centroid model: labelled examples (grouped by
+# sub-topic in data/topic_examples.json) are embedded once at warm-up
+# and averaged into one unit centroid per group. A query's score is
+#
+#     max cos(query, on-topic centroids) - max cos(query, off-topic centroids)
+#
+# and it is rejected when the score falls below the threshold, so
+# classifying is one small matrix-vector product.
+#
+# Every RAG turn that passed the keyword filter is embedded, and the
+# gate runs on all of them except greetings, messages naming SCCSE and
+# short follow-ups (gate_applies), which the keyword filter already
+# whitelists.
+
+import os
+import json
+import numpy as np
+from util import unit_rows, unit_vector
+
+TOPIC_CLASSIFIER_THRESHOLD = float(os.getenv("TOPIC_CLASSIFIER_THRESHOLD", "-0.05"))
+
+GATE_EXEMPT_INTENTS = frozenset({"greeting", "sccse"})
+GATE_MIN_LENGTH = 10
+
+
+def gate_applies(msg_lower, intents):
+    """Whether /chat asks the classifier about this (lowercased, routed) message."""
+    return not intents & GATE_EXEMPT_INTENTS and len(msg_lower) > GATE_MIN_LENGTH
+
+
+def load_examples(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class TopicClassifier:
+
+    def __init__(self, on_centroids, off_centroids, threshold=TOPIC_CLASSIFIER_THRESHOLD):
+        self.threshold = threshold
+        self._n_on = len(on_centroids)
+        self._centroids = unit_rows(np.vstack([on_centroids, off_centroids]))
+
+    @classmethod
+    def train(cls, embed_batch_fn, examples, threshold=TOPIC_CLASSIFIER_THRESHOLD):
+        """`examples` is {"on_topic": {group: [text, ...]}, "off_topic": {...}}."""
+        def centroids(groups):
+            return [
+                unit_rows(embed_batch_fn(texts)).mean(axis=0)
+                for texts in groups.values()
+            ]
+
+        return cls(
+            centroids(examples["on_topic"]),
+            centroids(examples["off_topic"]),
+            threshold=threshold,
+        )
+
+    def score(self, vector):
+        """Positive leans on-topic, negative leans off-topic."""
+        sims = self._centroids @ unit_vector(vector)
+        return float(sims[:self._n_on].max() - sims[self._n_on:].max())
+
+    def is_off_topic(self, vector, threshold=None):
+        threshold = self.threshold if threshold is None else threshold
+        return self.score(vector) < threshold
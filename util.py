@@ -0,0 +1,35 @@
+# ===============================================================
+# util.py – Small helpers shared by the stores, caches and indexes
+# ===============================================================
+
+import hashlib
+import numpy as np
+
+
+# ---------------------------------------------------------------
+# Files
+# ---------------------------------------------------------------
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+# ---------------------------------------------------------------
+# Vectors
+# ---------------------------------------------------------------
+def unit_vector(vector):
+    """`vector` as float32 with L2 norm 1 (a zero vector is returned as is)."""
+    v = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(v)
+    return v / norm if norm else v
+
+
+def unit_rows(matrix):
+    """Every row of `matrix` as float32 with L2 norm 1 (zero rows stay zero)."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms